@@ -0,0 +1,185 @@
+"""Measure the end-to-end latency of the main tutum commands against a synthetic fleet
+
+The commands run in a fresh interpreter, ``--runs`` times each, against the fake Tutum API of the tests, which
+serves a fleet of ``--services`` services of ``--containers`` containers each (5,000 containers by default) from a
+local port. For every scenario, the median wall time, the number of requests, the bytes transferred both ways and the
+peak RSS of the command are reported, along with the number of items (objects listed or log lines streamed) it went
+through per second.
+
+The results can be saved as a baseline, and later runs compared with it. With ``--max-regression``, the exit status is
+non-zero when any metric grew by more than that percentage, so that regressions fail the build. The requests and the
+bytes are the same on every machine, but the wall times of ``benchmarks/baseline.json`` are only comparable with runs
+on a similar one: save a baseline of your own before measuring a change.
+
+    $ python benchmarks/run.py --save-baseline benchmarks/baseline.json
+    $ python benchmarks/run.py --baseline benchmarks/baseline.json --max-regression 20
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tests.fakeapi import FakeTutumAPI
+
+TUTUM = [sys.executable, os.path.join(ROOT, "bin", "tutum")]
+METRICS = ["wall_ms", "requests", "bytes", "rss_mb"]
+STOP_SERVICES = 20
+LOG_SERVICES = 5
+
+STACKFILE = """\
+web:
+  image: tutum/hello-world
+  target_num_containers: 4
+lb:
+  image: tutum/haproxy
+  links:
+    - web
+"""
+
+
+def get_scenarios(args, workdir):
+    """Return the ``(name, command, items)`` of the scenarios, ``items`` being the number of objects or lines"""
+    stackfile = os.path.join(workdir, "tutum.yml")
+    with open(stackfile, "w") as f:
+        f.write(STACKFILE)
+    containers = args.services * args.containers
+    services = ["web-%d" % i for i in range(min(STOP_SERVICES, args.services))]
+    followed = ["web-%d" % i for i in range(min(LOG_SERVICES, args.services))]
+    return [
+        ("service ps", ["service", "ps"], args.services),
+        ("container ps", ["container", "ps"], containers),
+        ("node list", ["node", "list"], args.nodes),
+        ("nodecluster list", ["nodecluster", "list"], 1),
+        ("stack up", ["stack", "up", "-n", "bench", "-f", stackfile], 1),
+        ("service stop", ["service", "stop", "--parallel", "10"] + services, len(services)),
+        ("service stop --sync", ["service", "stop", "--sync", "--parallel", "10"] + services, len(services)),
+        ("service logs -f", ["service", "logs", "-f"] + followed,
+         len(followed) * args.containers * args.log_lines),
+    ]
+
+
+def run_command(api, command):
+    """Run ``tutum command`` against ``api``, and return its wall time, requests, bytes and peak RSS"""
+    cache_dir = tempfile.mkdtemp(prefix="tutum-bench-")
+    env = dict(os.environ, TUTUM_BASE_URL="%s/api/v1/" % api.url,
+               TUTUM_STREAM_URL="%s/v1/" % api.url.replace("http://", "ws://"),
+               TUTUM_USER="bench", TUTUM_APIKEY="bench", TUTUM_CACHE_DIR=cache_dir,
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    requests, traffic = len(api.requests), api.bytes_received + api.bytes_sent
+    try:
+        with open(os.devnull, "w") as devnull:
+            start = time.time()
+            process = subprocess.Popen(TUTUM + command, stdout=devnull, stderr=subprocess.PIPE, env=env)
+            stderr = process.stderr.read()
+            # wait4 rather than wait, for the resource usage of the command
+            _, status, usage = os.wait4(process.pid, 0)
+            wall_ms = (time.time() - start) * 1000
+            process.returncode = status
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if status:
+        raise RuntimeError("tutum %s failed: %s" % (" ".join(command), stderr.strip()))
+    # ru_maxrss is in kilobytes on Linux, in bytes on OS X
+    rss_mb = usage.ru_maxrss / (1024.0 * 1024 if sys.platform == "darwin" else 1024.0)
+    return {"wall_ms": wall_ms, "requests": len(api.requests) - requests,
+            "bytes": api.bytes_received + api.bytes_sent - traffic, "rss_mb": rss_mb}
+
+
+def measure(api, command, runs):
+    results = [run_command(api, command) for _ in range(runs)]
+    walls = sorted(result["wall_ms"] for result in results)
+    return {"wall_ms": walls[len(walls) // 2], "requests": max(result["requests"] for result in results),
+            "bytes": max(result["bytes"] for result in results),
+            "rss_mb": max(result["rss_mb"] for result in results)}
+
+
+def compare(result, baseline):
+    """Return the relative change of every metric of ``result`` from ``baseline``, in percent"""
+    changes = {}
+    for metric in METRICS:
+        if baseline.get(metric):
+            changes[metric] = (result[metric] - baseline[metric]) * 100.0 / baseline[metric]
+    return changes
+
+
+def format_change(changes, metric):
+    return "(%+.0f%%)" % changes[metric] if metric in changes else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the end-to-end latency of the tutum CLI at fleet scale")
+    parser.add_argument("-n", "--runs", help="number of runs of every scenario (default: 3)", type=int, default=3)
+    parser.add_argument("--services", help="number of services in the fleet (default: 100)", type=int, default=100)
+    parser.add_argument("--containers", help="number of containers of every service (default: 50)", type=int,
+                        default=50)
+    parser.add_argument("--nodes", help="number of nodes in the fleet (default: 50)", type=int, default=50)
+    parser.add_argument("--log-lines", help="number of log lines of every container (default: 100)", type=int,
+                        default=100)
+    parser.add_argument("--latency", help="seconds added to every request by the fake API (default: 0)", type=float,
+                        default=0)
+    parser.add_argument("-s", "--scenario", help="run only the scenarios starting with this name", action="append")
+    parser.add_argument("--baseline", help="compare the results with this baseline file")
+    parser.add_argument("--save-baseline", help="save the results as a baseline to this file")
+    parser.add_argument("--max-regression", help="fail if any metric grew by more than this percentage from the "
+                                                 "baseline", type=float)
+    args = parser.parse_args()
+
+    fleet = {"services": args.services, "containers": args.containers, "nodes": args.nodes,
+             "log_lines": args.log_lines, "latency": args.latency}
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            content = json.load(f)
+        baseline = content.get("scenarios", {})
+        if content.get("fleet") != fleet:
+            print("The baseline was measured on another fleet: %s" % json.dumps(content.get("fleet"), sort_keys=True),
+                  file=sys.stderr)
+    workdir = tempfile.mkdtemp(prefix="tutum-bench-")
+    api = FakeTutumAPI(stacks=max(1, args.services // 10), services=args.services,
+                       containers_per_service=args.containers, nodes=args.nodes, latency=args.latency,
+                       log_lines=args.log_lines, log_follow_end=True).start()
+    results = {}
+    regressions = []
+    try:
+        print("%-20s %10s %9s %12s %9s %12s" % ("SCENARIO", "WALL (ms)", "REQUESTS", "BYTES", "RSS (MB)",
+                                                 "ITEMS/s"))
+        for name, command, items in get_scenarios(args, workdir):
+            if args.scenario and not any(name.startswith(prefix) for prefix in args.scenario):
+                continue
+            result = results[name] = measure(api, command, args.runs)
+            changes = compare(result, baseline.get(name, {}))
+            print("%-20s %10.1f %9d %12d %9.1f %12.0f" % (name, result["wall_ms"], result["requests"],
+                                                          result["bytes"], result["rss_mb"],
+                                                          items * 1000 / result["wall_ms"]))
+            if changes:
+                print("%-20s %10s %9s %12s %9s" % ("", format_change(changes, "wall_ms"),
+                                                    format_change(changes, "requests"),
+                                                    format_change(changes, "bytes"),
+                                                    format_change(changes, "rss_mb")))
+            if args.max_regression is not None:
+                regressions.extend("%s: %s %+.0f%%" % (name, metric, change)
+                                   for metric, change in sorted(changes.items()) if change > args.max_regression)
+    finally:
+        api.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"fleet": fleet, "scenarios": results}, f, indent=2, sort_keys=True)
+    if regressions:
+        print("Regressions above %.1f%% from the baseline:" % args.max_regression, file=sys.stderr)
+        for regression in regressions:
+            print("  %s" % regression, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Measure the start-up time of the tutum CLI
+
+Every scenario runs in a fresh interpreter, ``--runs`` times, and the best and median wall times are reported. With
+``--max-ms``, the exit status is non-zero when any median is above it, so that start-up regressions fail the build.
+
+    $ python benchmarks/startup.py --runs 20 --max-ms 400
+"""
+from __future__ import print_function
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ("import tutumcli.tutum_cli", [sys.executable, "-c", "import tutumcli.tutum_cli"]),
+    ("tutum --version", [sys.executable, os.path.join(ROOT, "bin", "tutum"), "--version"]),
+    ("tutum service --help", [sys.executable, os.path.join(ROOT, "bin", "tutum"), "service", "--help"]),
+]
+
+
+def measure(cmd, runs):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    timings = []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(runs):
+            start = time.time()
+            subprocess.check_call(cmd, stdout=devnull, stderr=devnull, env=env)
+            timings.append((time.time() - start) * 1000)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the start-up time of the tutum CLI")
+    parser.add_argument("-n", "--runs", help="number of runs of every scenario (default: 10)", type=int, default=10)
+    parser.add_argument("--max-ms", help="fail if the median of any scenario is above this many milliseconds",
+                        type=float)
+    args = parser.parse_args()
+
+    failed = False
+    print("%-24s %10s %10s" % ("SCENARIO", "BEST (ms)", "MEDIAN (ms)"))
+    for name, cmd in SCENARIOS:
+        best, median = measure(cmd, args.runs)
+        print("%-24s %10.1f %10.1f" % (name, best, median))
+        if args.max_ms is not None and median > args.max_ms:
+            failed = True
+    if failed:
+        print("Start-up time is above %.1f ms" % args.max_ms, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,7 @@
 __author__ = 'fermayo'
+
+import os
+import tempfile
+
+# Keep the on-disk caches of the CLI away from the user's real cache directory
+os.environ['TUTUM_CACHE_DIR'] = tempfile.mkdtemp(prefix='tutum-cli-tests-')
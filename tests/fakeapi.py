@@ -0,0 +1,486 @@
+"""A stand-in for the Tutum REST and stream APIs, to test and benchmark the CLI over real HTTP and websockets
+
+The fake API keeps a fleet of stacks, services, containers, nodes and node clusters in memory, and serves both APIs
+from a single local port::
+
+    with FakeTutumAPI(services=50, containers_per_service=4, latency=0.02) as api:
+        # tutum.base_url and tutum.stream_url point at the fake API until the block exits
+        utils.iter_list(tutum.Container)
+        print(api.requests, api.connections)
+
+REST:
+    list (with ``limit``/``offset`` pagination and ``field``, ``field__startswith`` and ``relation__field``
+    filters), fetch, create, update, delete and the actions (``start``, ``stop``, ``redeploy``, ``scale``), which
+    return an ``X-Tutum-Action-URI`` header. Every change is published as an event.
+
+Streams:
+    ``events``, the ``logs`` of services and containers (``log_lines`` lines per container) and container
+    ``exec``, which sends the command line back, then echoes its input until EOT. ``exec_inputs`` lists the whole
+    input of every exec session.
+
+``latency`` seconds are added to every request and websocket handshake. ``requests`` lists the ``(method, path)``
+of the requests received, ``connections`` counts the TCP connections accepted, and ``bytes_received`` and
+``bytes_sent`` the traffic over all of them. Followed logs stay open until the client leaves, unless
+``log_follow_end`` is set, in which case they end like unfollowed ones once all the lines are sent.
+"""
+import BaseHTTPServer
+import base64
+import collections
+import datetime
+import hashlib
+import json
+import Queue
+import select
+import socket
+import SocketServer
+import struct
+import threading
+import time
+import urllib
+import urlparse
+import uuid
+
+import tutum
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION, OPCODE_TEXT, OPCODE_BINARY, OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG = 0, 1, 2, 8, 9, 10
+EXEC_BUFFER_SIZE = 64 * 1024
+
+ACTION_STATES = {
+    "start": "Running",
+    "stop": "Stopped",
+    "redeploy": "Running",
+    "scale": "Running",
+}
+
+
+class FakeTutumAPI(object):
+    def __init__(self, stacks=1, services=2, containers_per_service=2, nodes=1, latency=0, page_size=25,
+                 log_lines=10, log_follow_end=False):
+        self.latency = latency
+        self.page_size = page_size
+        self.log_lines = log_lines
+        self.log_follow_end = log_follow_end
+        self.objects = collections.defaultdict(collections.OrderedDict)
+        self.requests = []
+        self.connections = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.subscribers = []
+        self.exec_inputs = []
+        self.sockets = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.server = None
+        self._populate(stacks, services, containers_per_service, nodes)
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+    def add(self, resource_type, **attributes):
+        """Add an object of ``resource_type`` to the fleet and return it"""
+        obj_uuid = attributes.pop("uuid", None) or str(uuid.uuid4())
+        obj = {"uuid": obj_uuid, "resource_uri": "/api/v1/%s/%s/" % (resource_type, obj_uuid)}
+        obj.update(attributes)
+        with self.lock:
+            self.objects[resource_type][obj_uuid] = obj
+        return obj
+
+    def _populate(self, stacks, services, containers_per_service, nodes):
+        region = self.add("region", name="local", label="Local", resource_uri="/api/v1/region/fake/local/")
+        node_type = self.add("nodetype", name="small", label="Small", resource_uri="/api/v1/nodetype/fake/small/")
+        nodecluster = self.add("nodecluster", name="cluster", state="Deployed", region=region["resource_uri"],
+                               node_type=node_type["resource_uri"], nodes=[], tags=[],
+                               target_num_nodes=nodes, current_num_nodes=nodes, deployed_datetime=self._now())
+        node_list = []
+        for i in range(nodes):
+            node = self.add("node", state="Deployed", external_fqdn="node-%d.fake.local" % i,
+                            node_cluster=nodecluster["resource_uri"], tags=[], last_seen=self._now(),
+                            deployed_datetime=self._now(), region=nodecluster["region"], docker_version="1.9.1")
+            nodecluster["nodes"].append(node["resource_uri"])
+            node_list.append(node)
+
+        stack_list = [self.add("stack", name="stack-%d" % i, state="Running", services=[], synchronized=True,
+                               deployed_datetime=self._now()) for i in range(stacks)]
+        for i in range(services):
+            stack = stack_list[i % len(stack_list)] if stack_list else None
+            name = "web-%d" % i
+            service = self.add("service", name=name, state="Running", synchronized=True,
+                               image_name="tutum/hello-world:latest", stack=stack and stack["resource_uri"],
+                               current_num_containers=containers_per_service,
+                               target_num_containers=containers_per_service, containers=[], tags=[],
+                               public_dns="%s.fake.local" % name, deployed_datetime=self._now())
+            if stack:
+                stack["services"].append(service["resource_uri"])
+            for j in range(containers_per_service):
+                node = node_list[j % len(node_list)] if node_list else None
+                container = self.add("container", name="%s-%d" % (name, j + 1), state="Running",
+                                     service=service["resource_uri"], image_name=service["image_name"],
+                                     node=node and node["resource_uri"], run_command="/run.sh", exit_code=None,
+                                     public_dns="%s-%d.fake.local" % (name, j + 1), container_ports=[],
+                                     deployed_datetime=self._now())
+                service["containers"].append(container["resource_uri"])
+
+    def start(self):
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.server.api = self
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self._urls = tutum.base_url, tutum.stream_url
+        tutum.base_url = "%s/api/v1/" % self.url
+        tutum.stream_url = "%s/v1/" % self.url.replace("http://", "ws://")
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        tutum.base_url, tutum.stream_url = self._urls
+        self.server.shutdown()
+        self.server.server_close()
+        # end the keep-alive connections still open
+        with self.lock:
+            sockets = list(self.sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def publish(self, event):
+        """Send ``event`` to every client of the event stream"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+    def _publish_change(self, resource_type, action, obj):
+        parents = [obj.get(key) for key in ["service", "stack", "node", "node_cluster"] if obj.get(key)]
+        self.publish({"type": resource_type, "action": action, "state": obj.get("state"), "uuid": obj["uuid"],
+                      "resource_uri": obj["resource_uri"], "parents": parents, "datetime": self._now()})
+
+    def _resolve(self, value):
+        # follow a resource uri to the object it refers to
+        if isinstance(value, basestring) and value.startswith("/api/v1/"):
+            parts = value.strip("/").split("/")
+            if len(parts) == 4:
+                return self.objects.get(parts[2], {}).get(parts[3], value)
+        return value
+
+    def _match(self, obj, key, expected):
+        terms = key.split("__")
+        startswith = terms[-1] == "startswith"
+        if startswith:
+            terms.pop()
+        value = obj
+        for term in terms:
+            value = self._resolve(value)
+            if not isinstance(value, dict):
+                return False
+            value = value.get(term)
+        if isinstance(value, list):
+            # e.g. tags
+            return expected in [item.get("name") if isinstance(item, dict) else item for item in value]
+        value = "" if value is None else unicode(value)
+        return value.startswith(expected) if startswith else value == expected
+
+    def list_objects(self, resource_type, query):
+        limit = int(query.pop("limit", self.page_size))
+        offset = int(query.pop("offset", 0))
+        with self.lock:
+            objects = [obj for obj in self.objects[resource_type].values()
+                       if all(self._match(obj, key, value) for key, value in query.items())]
+        page = objects[offset:offset + limit]
+        next_url = None
+        if offset + limit < len(objects):
+            next_url = "/api/v1/%s/?%s" % (resource_type, urllib.urlencode(dict(query, limit=limit,
+                                                                                     offset=offset + limit)))
+        return {"meta": {"limit": limit, "offset": offset, "total_count": len(objects), "next": next_url,
+                         "previous": None},
+                "objects": page}
+
+    def create_object(self, resource_type, attributes):
+        attributes.setdefault("state", "Not running")
+        obj = self.add(resource_type, **attributes)
+        self._publish_change(resource_type, "create", obj)
+        return obj
+
+    def update_object(self, resource_type, obj, attributes):
+        with self.lock:
+            obj.update(attributes)
+        self._publish_change(resource_type, "update", obj)
+        return obj
+
+    def perform_action(self, resource_type, obj, action):
+        with self.lock:
+            obj["state"] = "Terminated" if action == "delete" else ACTION_STATES[action]
+        self._publish_change(resource_type, "delete" if action == "delete" else "update", obj)
+        return self.add("action", action=action, state="Success", method="POST", object=obj["resource_uri"],
+                        start_date=self._now(), end_date=self._now(), logs="")
+
+    def logs(self, resource_type, obj, tail):
+        if resource_type == "service":
+            containers = [self._resolve(uri) for uri in obj.get("containers", [])]
+        else:
+            containers = [obj]
+        lines = self.log_lines if tail is None else min(tail, self.log_lines)
+        for container in containers:
+            for i in range(lines):
+                yield {"type": "log", "streamType": "stdout", "source": container.get("name"),
+                       "log": "%s log line %d\n" % (container.get("name"), i)}
+
+
+class _CountingFile(object):
+    """Add the bytes read from or written to the file of a connection to a counter of the fake API"""
+
+    def __init__(self, f, api, counter):
+        self._file = f
+        self._api = api
+        self._counter = counter
+
+    def _count(self, data):
+        with self._api.lock:
+            setattr(self._api, self._counter, getattr(self._api, self._counter) + len(data))
+        return data
+
+    def read(self, *args):
+        return self._count(self._file.read(*args))
+
+    def readline(self, *args):
+        return self._count(self._file.readline(*args))
+
+    def write(self, data):
+        self._file.write(data)
+        self._count(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class _Server(SocketServer.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # connections are cut short on stop
+        if not self.api.stopped.is_set():
+            SocketServer.ThreadingTCPServer.handle_error(self, request, client_address)
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and the body are separate writes, which would otherwise wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.api = self.server.api
+        self.rfile = _CountingFile(self.rfile, self.api, "bytes_received")
+        self.wfile = _CountingFile(self.wfile, self.api, "bytes_sent")
+        with self.api.lock:
+            self.api.connections += 1
+            self.api.sockets.add(self.connection)
+
+    def finish(self):
+        with self.api.lock:
+            self.api.sockets.discard(self.connection)
+        BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data) if data is not None else ""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        self.api.requests.append((method, self.path.split("?")[0]))
+        time.sleep(self.api.latency)
+        url = urlparse.urlparse(self.path)
+        query = dict(urlparse.parse_qsl(url.query))
+        parts = url.path.strip("/").split("/")
+        if parts[:1] == ["v1"] and self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._stream(parts[1:], query)
+        if parts[:2] != ["api", "v1"] or len(parts) < 3:
+            return self._send_json(404, {"error": "Not found"})
+
+        resource_type = parts[2]
+        body = None
+        if method in ["POST", "PATCH"]:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or "{}") if length else {}
+        if len(parts) == 3:
+            if method == "GET":
+                return self._send_json(200, self.api.list_objects(resource_type, query))
+            if method == "POST":
+                return self._send_json(201, self.api.create_object(resource_type, body))
+            return self._send_json(405, {"error": "Method not allowed"})
+
+        obj = self.api.objects[resource_type].get(parts[3])
+        if obj is None:
+            return self._send_json(404, {"error": "Not found"})
+        if len(parts) == 4 and method == "GET":
+            return self._send_json(200, obj)
+        if len(parts) == 4 and method == "PATCH":
+            return self._send_json(200, self.api.update_object(resource_type, obj, body))
+        if len(parts) == 4 and method == "DELETE":
+            action = self.api.perform_action(resource_type, obj, "delete")
+            return self._send_json(202, obj, {"X-Tutum-Action-URI": action["resource_uri"]})
+        if len(parts) == 5 and method == "POST" and parts[4] in ACTION_STATES:
+            action = self.api.perform_action(resource_type, obj, parts[4])
+            return self._send_json(202, obj, {"X-Tutum-Action-URI": action["resource_uri"]})
+        return self._send_json(405, {"error": "Method not allowed"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    # websockets (RFC 6455), just enough for websocket-client
+
+    def _handshake(self):
+        accept = base64.b64encode(hashlib.sha1(self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).digest())
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = 1
+
+    def send_frame(self, payload, opcode=OPCODE_TEXT):
+        if isinstance(payload, unicode):
+            payload = payload.encode("utf-8")
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+
+    def send_message(self, message):
+        self.send_frame(json.dumps(message))
+
+    def recv_message(self):
+        """Return the next text or binary message, or None once the client closed the connection"""
+        message = ""
+        while True:
+            header = self.rfile.read(2)
+            if len(header) < 2:
+                return None
+            first, second = struct.unpack("!BB", header)
+            opcode = first & 0x0f
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack("!H", self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.rfile.read(8))[0]
+            mask = self.rfile.read(4) if second & 0x80 else "\0\0\0\0"
+            payload = self.rfile.read(length)
+            if length:
+                # as a single integer, as xoring megabytes of input a byte at a time takes seconds
+                masks = (mask * (length // 4 + 1))[:length]
+                payload = ("%x" % (int(payload.encode("hex"), 16) ^ int(masks.encode("hex"), 16))).zfill(length * 2)
+                payload = payload.decode("hex")
+            if opcode == OPCODE_CLOSE:
+                self.send_frame(payload[:2], OPCODE_CLOSE)
+                return None
+            if opcode == OPCODE_PING:
+                self.send_frame(payload, OPCODE_PONG)
+                continue
+            if opcode in [OPCODE_TEXT, OPCODE_BINARY, OPCODE_CONTINUATION]:
+                message += payload
+                if first & 0x80:
+                    return message
+
+    def _stream(self, parts, query):
+        self._handshake()
+        if parts == ["events"]:
+            return self._events()
+        if len(parts) == 3 and parts[0] in ["service", "container"] and parts[2] == "logs":
+            obj = self.api.objects[parts[0]].get(parts[1])
+            if obj is not None:
+                return self._logs(parts[0], obj, query)
+        if len(parts) == 3 and parts[0] == "container" and parts[2] == "exec":
+            if parts[1] in self.api.objects["container"]:
+                return self._exec(query.get("command", "sh"))
+        self.send_message({"type": "error", "data": {"errorMessage": "Not found"}})
+        self.send_frame("", OPCODE_CLOSE)
+
+    def _events(self):
+        subscriber = Queue.Queue()
+        with self.api.lock:
+            self.api.subscribers.append(subscriber)
+        try:
+            self.send_message({"type": "auth"})
+            while not self.api.stopped.is_set():
+                try:
+                    self.send_message(subscriber.get(timeout=0.05))
+                except Queue.Empty:
+                    pass
+                # answer the close handshake of the client
+                if select.select([self.connection], [], [], 0)[0] and self.recv_message() is None:
+                    return
+        except IOError:
+            pass
+        finally:
+            with self.api.lock:
+                self.api.subscribers.remove(subscriber)
+
+    def _logs(self, resource_type, obj, query):
+        tail = int(query["tail"]) if "tail" in query else None
+        for message in self.api.logs(resource_type, obj, tail):
+            self.send_message(message)
+        if query.get("follow") == "true" and not self.api.log_follow_end:
+            # until the client is gone
+            while self.recv_message() is not None:
+                pass
+        else:
+            self.send_frame("", OPCODE_CLOSE)
+
+    def _exec(self, command):
+        # with buffers as small as those of the terminal of a real session, which echoes the input as it reads it
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, EXEC_BUFFER_SIZE)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, EXEC_BUFFER_SIZE)
+        self.send_message({"type": "stdout", "streamType": "stdout", "output": command + "\n"})
+        received = []
+        while True:
+            message = self.recv_message()
+            if message is None:
+                return
+            end = message.endswith("\x04")
+            if end:
+                message = message[:-1]
+                with self.api.lock:
+                    self.api.exec_inputs.append("".join(received + [message]))
+            received.append(message)
+            if message:
+                self.send_message({"type": "stdout", "streamType": "stdout",
+                                   "output": message.decode("utf-8", "replace")})
+            if end:
+                self.send_frame("", OPCODE_CLOSE)
+                return
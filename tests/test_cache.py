@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+import tutum
+from tutumcli.cache import *
+
+
+class GetCacheDirTestCase(unittest.TestCase):
+    @mock.patch.dict(os.environ, {'TUTUM_CACHE_DIR': '/tmp/tutum-cache', 'XDG_CACHE_HOME': '/tmp/xdg'})
+    def test_get_cache_dir_from_tutum_cache_dir(self):
+        self.assertEqual('/tmp/tutum-cache', get_cache_dir())
+
+    @mock.patch.dict(os.environ, {'TUTUM_CACHE_DIR': '', 'XDG_CACHE_HOME': '/tmp/xdg'})
+    def test_get_cache_dir_from_xdg_cache_home(self):
+        self.assertEqual('/tmp/xdg/tutum', get_cache_dir())
+
+    @mock.patch.dict(os.environ, {'TUTUM_CACHE_DIR': '', 'XDG_CACHE_HOME': ''})
+    def test_get_cache_dir_default(self):
+        self.assertEqual(os.path.join(os.path.expanduser('~'), '.cache', 'tutum'), get_cache_dir())
+
+
+class LoadSaveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_save_and_load(self):
+        path = os.path.join(self.cache_dir, 'a', 'b.json')
+        save(path, [{'name': 'test'}])
+        self.assertEqual([{'name': 'test'}], load(path, 60))
+
+    def test_load_expired(self):
+        path = os.path.join(self.cache_dir, 'b.json')
+        save(path, [{'name': 'test'}])
+        with mock.patch('tutumcli.cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(load(path, 60))
+
+    def test_save_concurrently(self):
+        path = os.path.join(self.cache_dir, 'd.json')
+        threads = [threading.Thread(target=save, args=(path, [i] * 1000)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIn(load(path, 60), [[i] * 1000 for i in range(10)])
+        self.assertEqual(['d.json'], os.listdir(self.cache_dir))
+
+    def test_load_missing_or_corrupted(self):
+        path = os.path.join(self.cache_dir, 'c.json')
+        self.assertIsNone(load(path, 60))
+        with open(path, 'w') as f:
+            f.write('not json')
+        self.assertIsNone(load(path, 60))
+
+
+class ListReferenceDataTestCase(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(get_cache_dir(), ignore_errors=True)
+        region = tutum.Region()
+        region.name = 'nyc3'
+        region.label = 'New York 3'
+        region.resource_uri = '/api/v1/region/digitalocean/nyc3/'
+        self.regionlist = [region]
+
+    @mock.patch('tutumcli.cache.tutum.Region.list')
+    def test_list_reference_data(self, mock_list):
+        mock_list.return_value = self.regionlist
+
+        regions = list_reference_data(tutum.Region)
+        self.assertEqual(1, len(regions))
+        self.assertIsInstance(regions[0], tutum.Region)
+        self.assertEqual('New York 3', regions[0].label)
+        self.assertEqual('/api/v1/region/digitalocean/nyc3/', regions[0].resource_uri)
+
+        regions = list_reference_data(tutum.Region)
+        self.assertEqual('New York 3', regions[0].label)
+        self.assertEqual(1, mock_list.call_count)
+
+    @mock.patch('tutumcli.cache.tutum.Region.list')
+    def test_list_reference_data_refresh(self, mock_list):
+        mock_list.return_value = self.regionlist
+        list_reference_data(tutum.Region)
+        list_reference_data(tutum.Region, refresh=True)
+        self.assertEqual(2, mock_list.call_count)
+
+    @mock.patch('tutumcli.cache.tutum.Region.list')
+    def test_list_reference_data_expired(self, mock_list):
+        mock_list.return_value = self.regionlist
+        list_reference_data(tutum.Region)
+        with mock.patch('tutumcli.cache.time.time', return_value=time.time() + REFERENCE_DATA_TTL + 1):
+            list_reference_data(tutum.Region)
+        self.assertEqual(2, mock_list.call_count)
+
+
+class IdentifierIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(get_cache_dir(), ignore_errors=True)
+        self.services = []
+        for uuid, name, stack in [('7a4cfe51-03bb-42d6-825e-3b533888d8cd', 'web', 'prod'),
+                                  ('7a4c1111-2222-4333-8444-555555555555', 'web', 'staging'),
+                                  ('e3f5b2c1-0000-4000-8000-000000000000', 'db', 'prod')]:
+            service = tutum.Service()
+            service.uuid = uuid
+            service.name = name
+            service.stack = stack
+            service.resource_uri = '/api/v1/service/%s/' % uuid
+            self.services.append(service)
+
+    def tearDown(self):
+        shutil.rmtree(get_cache_dir(), ignore_errors=True)
+
+    def test_lookup_identifier(self):
+        index_objects('service', self.services, lambda service: service.stack, complete=True)
+        self.assertEqual(self.services[0].resource_uri, lookup_identifier('service', '7a4cfe'))
+        self.assertEqual(self.services[2].resource_uri, lookup_identifier('service', 'db'))
+        self.assertEqual(self.services[1].resource_uri, lookup_identifier('service', 'web.staging'))
+        self.assertIsNone(lookup_identifier('service', '7a4c'))
+        self.assertIsNone(lookup_identifier('service', 'web'))
+        self.assertIsNone(lookup_identifier('service', 'unknown'))
+
+    def test_lookup_identifier_partial_index(self):
+        index_objects('service', self.services)
+        self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_lookup_identifier_expired(self):
+        index_objects('service', self.services, complete=True)
+        with mock.patch('tutumcli.cache.time.time', return_value=time.time() + IDENTIFIER_INDEX_TTL['service'] + 1):
+            self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_complete_index_replaces_entries(self):
+        index_objects('service', self.services, complete=True)
+        index_objects('service', self.services[1:], complete=True)
+        self.assertEqual(self.services[1].resource_uri, lookup_identifier('service', '7a4c'))
+
+    def test_forget_object(self):
+        index_objects('service', self.services, complete=True)
+        forget_object('service', self.services[2].resource_uri)
+        self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_apply_event(self):
+        index_objects('service', self.services, complete=True)
+        apply_event({'type': 'service', 'action': 'update', 'state': 'Stopped',
+                     'resource_uri': self.services[0].resource_uri})
+        self.assertIsNone(lookup_identifier('service', 'web'))
+        self.assertEqual(self.services[2].resource_uri, lookup_identifier('service', 'db'))
+
+        apply_event({'type': 'container', 'action': 'create', 'resource_uri': '/api/v1/container/abc/'})
+        self.assertEqual(self.services[2].resource_uri, lookup_identifier('service', 'db'))
+
+        apply_event({'type': 'service', 'action': 'create', 'resource_uri': '/api/v1/service/abc/'})
+        self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_apply_event_delete(self):
+        index_objects('service', self.services, complete=True)
+        apply_event({'type': 'service', 'action': 'update', 'state': 'Terminated',
+                     'resource_uri': self.services[0].resource_uri})
+        self.assertIsNone(lookup_identifier('service', 'web'))
+        self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_apply_event_unknown_resource(self):
+        index_objects('service', self.services, complete=True)
+        apply_event({'type': 'service', 'action': 'update', 'resource_uri': '/api/v1/service/abc/'})
+        self.assertIsNone(lookup_identifier('service', 'db'))
+
+    def test_apply_event_keeps_index_in_memory(self):
+        index_objects('service', self.services, complete=True)
+        with mock.patch('tutumcli.cache.load') as mock_load, mock.patch('tutumcli.cache.save') as mock_save:
+            for _ in range(10):
+                apply_event({'type': 'service', 'action': 'update', 'resource_uri': self.services[0].resource_uri})
+        self.assertFalse(mock_load.called)
+        self.assertFalse(mock_save.called)
+
+    def test_index_changed_by_another_process(self):
+        index_objects('service', self.services, complete=True)
+        self.assertEqual(self.services[2].resource_uri, lookup_identifier('service', 'db'))
+        path = get_cache_path('index', 'service.json')
+        save(path, {'complete': None, 'entries': {}})
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertIsNone(lookup_identifier('service', 'db'))
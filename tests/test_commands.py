@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
+import collections
+import os
+import socket
 import unittest
 import __builtin__
 import StringIO
+import shutil
+import tempfile
+import time
+import threading
 import uuid
 
+import docker
 import mock
 from tutumcli.commands import *
 import tutumcli
@@ -92,6 +100,144 @@ class ServiceCreateTestCase(unittest.TestCase):
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
+class EventTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = self.buf = StringIO.StringIO()
+        self.directory = tempfile.mkdtemp()
+        self.events = [{'type': 'container', 'action': 'update', 'state': 'Running',
+                        'resource_uri': '/api/v1/container/1/', 'parents': ['/api/v1/service/2/']},
+                       {'type': 'service', 'action': 'update', 'state': 'Running',
+                        'resource_uri': '/api/v1/service/3/', 'parents': []}]
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _follow_events(self, on_event, on_connect):
+        on_connect(False)
+        for e in self.events:
+            on_event(e)
+
+    @mock.patch('tutumcli.commands.utils.follow_events')
+    def test_event_filtered(self, mock_follow_events):
+        mock_follow_events.side_effect = self._follow_events
+        event(['container'], None, None, None, None, 'ndjson', None, None, None)
+
+        self.assertEqual(json.dumps(self.events[0]), self.buf.getvalue().strip())
+
+    @mock.patch('tutumcli.commands.utils.resolve_event_resources',
+                return_value=({'/api/v1/service/2/'}, []))
+    @mock.patch('tutumcli.commands.utils.EventSocketServer')
+    @mock.patch('tutumcli.commands.utils.follow_events')
+    def test_event_resource_socket(self, mock_follow_events, mock_server, mock_resolve):
+        mock_follow_events.side_effect = self._follow_events
+        event(None, None, None, ['web'], None, None, '/tmp/tutum.sock', None, None)
+
+        mock_resolve.assert_called_with(['web'], [])
+        mock_server.assert_called_with('/tmp/tutum.sock')
+        mock_server.return_value.broadcast.assert_called_once_with(json.dumps(self.events[0]) + "\n")
+        self.assertTrue(mock_server.return_value.close.called)
+
+    @mock.patch('tutumcli.commands.utils.resolve_event_resources', side_effect=ObjectNotFound('not found'))
+    @mock.patch('tutumcli.commands.utils.follow_events')
+    def test_event_with_exception(self, mock_follow_events, mock_resolve):
+        self.assertRaises(SystemExit, event, None, None, None, ['unknown'], None, None, None, None, None)
+        self.assertFalse(mock_follow_events.called)
+
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    @mock.patch('tutumcli.commands.utils.follow_events')
+    def test_event_journal(self, mock_follow_events, mock_iter_list):
+        container = tutum.Container()
+        container.resource_uri = '/api/v1/container/1/'
+        container.state = 'Starting'
+        mock_iter_list.side_effect = lambda model, fields: [container] if model is tutum.Container else []
+        mock_follow_events.side_effect = self._follow_events
+        event(['container'], None, None, None, None, 'ndjson', None, self.directory, None)
+
+        self.assertEqual([json.dumps(dict(self.events[0], offset=0))], self.buf.getvalue().splitlines())
+        event_journal = journal.EventJournal(self.directory)
+        self.assertEqual([(0, self.events[0]), (1, self.events[1])], list(event_journal.read()))
+        # the service events made the services followed too
+        self.assertEqual({'container': {'/api/v1/container/1/': 'Running'}, 'service': {}},
+                         event_journal.load_state())
+
+        # after a restart, the journal is replayed and the missed events are worked out
+        self.buf.truncate(0)
+        container.state = 'Stopped'
+        mock_follow_events.side_effect = lambda on_event, on_connect: on_connect(False)
+        event(['container'], None, None, None, None, 'ndjson', None, self.directory, 0)
+
+        lines = [json.loads(line) for line in self.buf.getvalue().splitlines()]
+        self.assertEqual([0, 2], [line['offset'] for line in lines])
+        self.assertEqual({'type': 'container', 'action': 'update', 'state': 'Stopped', 'offset': 2,
+                          'resource_uri': '/api/v1/container/1/', 'parents': [], 'reconciled': True}, lines[1])
+
+
+class ServiceExecTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        sys.stdout = self.buf = StringIO.StringIO()
+        sys.stderr = self.error = StringIO.StringIO()
+        self.service = tutum.Service()
+        self.service.name = 'web'
+        self.service.resource_uri = '/api/v1/service/1/'
+        self.containers = []
+        for name, uuid in [('web-1', '7a4cfe51-03bb-42d6-825e-3b533888d8cd'),
+                           ('web-2', 'e3f5b2c1-0000-4000-8000-000000000000')]:
+            container = tutum.Container()
+            container.name = name
+            container.uuid = uuid
+            self.containers.append(container)
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+    @mock.patch('tutumcli.commands.utils.run_exec')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_service')
+    def test_service_exec(self, mock_fetch_remote_service, mock_iter_list, mock_run_exec):
+        mock_fetch_remote_service.return_value = self.service
+        mock_iter_list.return_value = iter(self.containers)
+
+        def _run_exec(container, command, output_handler):
+            output_handler('stdout', 'Linux\n%s' % container.name)
+            if container.name == 'web-2':
+                raise websocket.WebSocketException('Handshake status 500')
+
+        mock_run_exec.side_effect = _run_exec
+
+        self.assertRaises(SystemExit, service_exec, 'web', None, ['--', 'uname'], 10)
+        mock_iter_list.assert_called_with(tutum.Container, fields=['name', 'uuid'], service='/api/v1/service/1/',
+                                          state='Running')
+        self.assertEqual(['web-1 | Linux', 'web-1 | web-1', 'web-2 | Linux', 'web-2 | web-2'],
+                         sorted(self.buf.getvalue().splitlines()))
+        self.assertEqual('web-2: Handshake status 500\n', self.error.getvalue())
+        self.assertEqual([['uname'], ['uname']], [call[0][1] for call in mock_run_exec.call_args_list])
+
+    @mock.patch('tutumcli.commands.utils.run_exec')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_service')
+    def test_service_exec_containers(self, mock_fetch_remote_service, mock_iter_list, mock_run_exec):
+        mock_fetch_remote_service.return_value = self.service
+        mock_iter_list.side_effect = lambda *args, **kwargs: iter(self.containers)
+
+        service_exec('web', ['E3F5', 'web-2'], ['uname'], 10)
+        self.assertEqual([self.containers[1]], [call[0][0] for call in mock_run_exec.call_args_list])
+
+        self.assertRaises(SystemExit, service_exec, 'web', ['web-3'], ['uname'], 10)
+        self.assertEqual("Identifier 'web-3' does not match any running container of service web\n",
+                         self.error.getvalue())
+        self.assertEqual(1, mock_run_exec.call_count)
+
+    @mock.patch('tutumcli.commands.utils.fetch_remote_service')
+    def test_service_exec_without_command(self, mock_fetch_remote_service):
+        self.assertRaises(SystemExit, service_exec, 'web', None, [], 10)
+        self.assertFalse(mock_fetch_remote_service.called)
+
+
 class ServiceInspectTestCase(unittest.TestCase):
     def setUp(self):
         self.stdout = sys.stdout
@@ -116,7 +262,7 @@ class ServiceInspectTestCase(unittest.TestCase):
         service.uuid = uuid
         mock_fetch_remote_service.return_value = service
         mock_get_all_attributes.return_value = {'key': [{'name': 'test', 'id': '1'}]}
-        service_inspect(['test_id'])
+        service_inspect(['test_id'], None, 10)
 
         self.assertEqual(' '.join(output.split()), ' '.join(self.buf.getvalue().strip().split()))
         self.buf.truncate(0)
@@ -126,7 +272,7 @@ class ServiceInspectTestCase(unittest.TestCase):
     def test_service_inspect_with_exception(self, mock_fetch_remote_service, mock_exit):
         service = tutumcli.commands.tutum.Service()
         mock_fetch_remote_service.return_value = service
-        service_inspect(['test_id', 'test_id2'])
+        service_inspect(['test_id', 'test_id2'], None, 10)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -169,42 +315,94 @@ class ServicePsTestCase(unittest.TestCase):
 
     def tearDown(self):
         sys.stdout = self.stdout
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
 
     @mock.patch('tutumcli.commands.tutum.Stack.list')
-    @mock.patch('tutumcli.commands.tutum.Service.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_service_ps(self, mock_list, mock_stack):
         output = u'''NAME      UUID      STATUS       #CONTAINERS  IMAGE          DEPLOYED    PUBLIC DNS               STACK
 SERVICE1  7A4CFE51  \u25b6 Running              3  test/service1              www.myhello1service.com  service1
 SERVICE2  8B4CFE51  \u25fc Stopped              2  test/service2              www.myhello2service.com  service2'''
         mock_list.return_value = self.servicelist
         mock_stack.return_value = self.stacklist
-        service_ps(False, 'Running', None)
+        service_ps(False, 'Running', None, None, 'table', False)
 
-        mock_list.assert_called_with(state='Running', stack=None)
+        mock_list.assert_called_with(tutum.Service, fields=mock.ANY, filters=[], state='Running', stack=None)
         self.buf.getvalue().strip()
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.tutum.Stack.list')
-    @mock.patch('tutumcli.commands.tutum.Service.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_service_ps_quiet(self, mock_list, mock_stack):
         output = '''7A4CFE51-03BB-42D6-825E-3B533888D8CD
 8B4CFE51-03BB-42D6-825E-3B533888D8CD'''
         mock_stack.return_value = self.stacklist
         mock_list.return_value = self.servicelist
-        service_ps(True, None, None)
+        service_ps(True, None, None, None, 'table', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
+    @mock.patch('tutumcli.commands.tutum.Stack.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_service_ps_json(self, mock_list, mock_stack):
+        self.servicelist[0].synchronized = False
+        mock_list.return_value = self.servicelist
+        mock_stack.return_value = self.stacklist
+        service_ps(False, None, None, None, 'json', False)
+
+        records = json.loads(self.buf.getvalue(), object_pairs_hook=collections.OrderedDict)
+        self.assertEqual(['name', 'uuid', 'state', 'synchronized', 'current_num_containers', 'image_name',
+                          'deployed_datetime', 'public_dns', 'stack'], records[0].keys())
+        self.assertEqual({'name': 'SERVICE1', 'uuid': '7A4CFE51-03BB-42D6-825E-3B533888D8CD', 'state': 'Running',
+                          'synchronized': False, 'current_num_containers': 3, 'image_name': 'test/service1',
+                          'deployed_datetime': '', 'public_dns': 'www.myhello1service.com', 'stack': 'service1'},
+                         records[0])
+        self.assertEqual(2, len(records))
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.tutum.Utils.fetch_by_resource_uri')
+    @mock.patch('tutumcli.commands.utils.watch_table')
+    @mock.patch('tutumcli.commands.tutum.Stack.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_service_ps_watch(self, mock_list, mock_stack, mock_watch_table, mock_fetch):
+        mock_list.return_value = self.servicelist
+        mock_stack.return_value = self.stacklist
+        for service in self.servicelist:
+            service.resource_uri = '/api/v1/service/%s/' % service.uuid
+        service_ps(False, 'Running', None, None, 'table', True)
+
+        headers, resource_type, list_rows, fetch_row, may_match = mock_watch_table.call_args[0]
+        self.assertEqual('service', resource_type)
+        self.assertTrue(may_match({'action': 'update', 'state': 'Running'}))
+        self.assertFalse(may_match({'action': 'create', 'state': 'Starting'}))
+        self.assertEqual([self.servicelist[0].resource_uri, self.servicelist[1].resource_uri],
+                         [resource_uri for resource_uri, row in list_rows()])
+        mock_list.assert_called_with(tutum.Service, fields=mock.ANY, filters=[], state='Running', stack=None)
+
+        mock_fetch.return_value = self.servicelist[0]
+        self.assertEqual('SERVICE1', fetch_row(self.servicelist[0].resource_uri)[0])
+        mock_fetch.return_value = self.servicelist[1]
+        self.assertIsNone(fetch_row(self.servicelist[1].resource_uri))
+        self.assertEqual('', self.buf.getvalue())
+
     @mock.patch('tutumcli.commands.sys.exit')
-    @mock.patch('tutumcli.commands.tutum.Service.list', side_effect=TutumApiError)
+    @mock.patch('tutumcli.commands.utils.watch_table')
+    def test_service_ps_watch_quiet(self, mock_watch_table, mock_exit):
+        service_ps(True, None, None, None, 'table', True)
+
+        self.assertFalse(mock_watch_table.called)
+        mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
+
+    @mock.patch('tutumcli.commands.sys.exit')
+    @mock.patch('tutumcli.commands.utils.iter_list', side_effect=TutumApiError)
     def test_service_ps_with_exception(self, mock_list, mock_exit):
-        service_ps(False, None, None)
+        service_ps(False, None, None, None, 'table', False)
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
     @mock.patch('tutumcli.commands.tutum.Stack.list')
-    @mock.patch('tutumcli.commands.tutum.Service.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_service_ps_unsync(self, mock_list, mock_stack):
         output = u'''NAME      UUID      STATUS          #CONTAINERS  IMAGE          DEPLOYED    PUBLIC DNS               STACK
 SERVICE1  7A4CFE51  \u25b6 Running(*)              3  test/service1              www.myhello1service.com  service1
@@ -214,9 +412,9 @@ SERVICE2  8B4CFE51  \u25fc Stopped                 2  test/service2
         self.servicelist[0].synchronized = False
         mock_stack.return_value = self.stacklist
         mock_list.return_value = self.servicelist
-        service_ps(False, 'Running', None)
+        service_ps(False, 'Running', None, None, 'table', False)
 
-        mock_list.assert_called_with(state='Running', stack=None)
+        mock_list.assert_called_with(tutum.Service, fields=mock.ANY, filters=[], state='Running', stack=None)
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
@@ -323,7 +521,7 @@ class ServiceScaleTestCase(unittest.TestCase):
         service.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         service.is_dirty.side_effect = False
         mock_fetch_remote_service.return_value = service
-        service_scale(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], 3, False)
+        service_scale(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], 3, False, 1)
 
         mock_save.assert_called()
         self.assertEqual(3, service.target_num_containers)
@@ -333,7 +531,7 @@ class ServiceScaleTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service', side_effect=TutumApiError)
     def test_service_scale_with_exception(self, mock_fetch_remote_service, mock_exit):
-        service_scale(['test_id'], 3, False)
+        service_scale(['test_id'], 3, False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -417,7 +615,7 @@ class ServiceStartTestCase(unittest.TestCase):
         service.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_service.return_value = service
         mock_start.return_value = True
-        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(service.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -425,7 +623,7 @@ class ServiceStartTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service', side_effect=TutumApiError)
     def test_service_start_with_exception(self, mock_fetch_remote_service, mock_exit):
-        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -445,15 +643,74 @@ class ServiceStopTestCase(unittest.TestCase):
         service.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_service.return_value = service
         mock_stop.return_value = True
-        service_stop(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_stop(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(service.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
+    @mock.patch('tutumcli.commands.sys.exit')
+    @mock.patch('tutumcli.commands.tutum.Service.stop')
+    @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service')
+    def test_service_stop_parallel(self, mock_fetch_remote_service, mock_stop, mock_exit):
+        uuids = [str(uuid.uuid4()) for _ in range(6)]
+
+        def fetch_remote_service(identifier, raise_exceptions=True):
+            if identifier == uuids[2]:
+                raise ObjectNotFound("Cannot find a service with the identifier '%s'" % identifier)
+            service = tutumcli.commands.tutum.Service()
+            service.uuid = identifier
+            return service
+
+        mock_fetch_remote_service.side_effect = fetch_remote_service
+        mock_stop.return_value = True
+        service_stop(uuids, False, 3)
+
+        self.assertEqual(uuids[:2] + uuids[3:], self.buf.getvalue().strip().split())
+        mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.utils.sync_actions')
+    @mock.patch('tutumcli.commands.tutum.Service.stop')
+    @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service')
+    def test_service_stop_sync(self, mock_fetch_remote_service, mock_stop, mock_sync_actions):
+        services = []
+        for identifier in ['service-a', 'service-b']:
+            service = tutumcli.commands.tutum.Service()
+            service.uuid = identifier
+            services.append(service)
+        mock_fetch_remote_service.side_effect = services
+        mock_stop.return_value = True
+        service_stop(['service-a', 'service-b'], True, 1)
+
+        mock_sync_actions.assert_called_once_with(services, True)
+        self.assertEqual('service-a\nservice-b', self.buf.getvalue().strip())
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.utils.sync_actions')
+    @mock.patch('tutumcli.commands.tutum.Service.stop')
+    @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service')
+    def test_service_stop_sync_parallel(self, mock_fetch_remote_service, mock_stop, mock_sync_actions):
+        identifiers = ['service-a', 'service-b', 'service-c']
+
+        def fetch_remote_service(identifier, raise_exceptions=True):
+            # the first service is stopped last
+            time.sleep(0.05 * (2 - identifiers.index(identifier)))
+            service = tutumcli.commands.tutum.Service()
+            service.uuid = identifier
+            return service
+
+        mock_fetch_remote_service.side_effect = fetch_remote_service
+        mock_stop.return_value = True
+        service_stop(identifiers, True, 3)
+
+        self.assertEqual(identifiers, [service.uuid for service in mock_sync_actions.call_args[0][0]])
+        self.assertEqual(identifiers, self.buf.getvalue().strip().split())
+        self.buf.truncate(0)
+
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service', side_effect=TutumApiError)
     def test_service_stop_with_exception(self, mock_fetch_remote_service, mock_exit):
-        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -473,7 +730,7 @@ class ServiceTerminateTestCase(unittest.TestCase):
         service.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_service.return_value = service
         mock_delete.return_value = True
-        service_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(service.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -481,7 +738,7 @@ class ServiceTerminateTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service', side_effect=TutumApiError)
     def test_service_terminate_with_exception(self, mock_fetch_remote_service, mock_exit):
-        service_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        service_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -501,7 +758,7 @@ class ServiceRedeployTestCase(unittest.TestCase):
         service.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_service.return_value = service
         mock_redeploy.return_value = True
-        service_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False)
+        service_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False, 1)
 
         self.assertEqual(service.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -509,11 +766,119 @@ class ServiceRedeployTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_service', side_effect=TutumApiError)
     def test_service_redeploy_with_exception(self, mock_fetch_remote_service, mock_exit):
-        service_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False)
+        service_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
+class ContainerExecTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdin = sys.stdin
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        self.read_fd, write_fd = os.pipe()
+        os.write(write_fd, 'echo hello\nexit\n')
+        os.close(write_fd)
+        sys.stdin = os.fdopen(self.read_fd)
+        # output is written to the file descriptors
+        sys.stdout = tempfile.TemporaryFile()
+        sys.stderr = tempfile.TemporaryFile()
+        self.local_sock, self.remote_sock = socket.socketpair()
+        # always readable
+        self.remote_sock.send('x')
+        self.user_agent = mock.patch.object(tutum, 'user_agent', 'tutum-cli/test')
+        self.user_agent.start()
+
+    def tearDown(self):
+        self.user_agent.stop()
+        for f in [sys.stdin, sys.stdout, sys.stderr]:
+            f.close()
+        sys.stdin = self.stdin
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+        self.local_sock.close()
+        self.remote_sock.close()
+
+    @mock.patch('tutumcli.commands.websocket.create_connection')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_container')
+    def test_container_exec_piped_input(self, mock_fetch_remote_container, mock_create_connection):
+        container = tutum.Container()
+        container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
+        mock_fetch_remote_container.return_value = container
+        shell = mock_create_connection.return_value
+        shell.sock = self.local_sock
+        shell.recv.side_effect = [json.dumps({'streamType': 'stdout', 'output': u'h\xe9llo\n'}),
+                                  json.dumps({'streamType': 'stderr', 'output': 'warning\n'}),
+                                  '\x00\xff raw',
+                                  websocket.WebSocketConnectionClosedException()]
+
+        self.assertRaises(SystemExit, container_exec, container.uuid, ['sh'])
+        self.assertEqual([mock.call('echo hello\nexit\n'), mock.call(u'\u0004')], shell.send.call_args_list)
+        for f, output in [(sys.stdout, 'h\xc3\xa9llo\n\x00\xff raw'), (sys.stderr, 'warning\n')]:
+            f.seek(0)
+            self.assertEqual(output, f.read())
+        self.assertIn('container/7A4CFE51-03BB-42D6-825E-3B533888D8CD/exec/?&command=sh',
+                      mock_create_connection.call_args[0][0])
+
+    @mock.patch('tutumcli.commands.websocket.create_connection')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_container')
+    def test_container_exec_terminal(self, mock_fetch_remote_container, mock_create_connection):
+        import pty
+        import termios
+
+        master, slave = pty.openpty()
+        sys.stdin.close()
+        sys.stdin = os.fdopen(slave)
+        attributes = termios.tcgetattr(master)
+        container = tutum.Container()
+        container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
+        mock_fetch_remote_container.return_value = container
+        shell = mock_create_connection.return_value
+        shell.sock = self.local_sock
+        shell.recv.side_effect = [json.dumps({'streamType': 'stdout', 'output': 'hello'}),
+                                  websocket.WebSocketConnectionClosedException()]
+        try:
+            self.assertRaises(SystemExit, container_exec, container.uuid, None)
+            self.assertEqual(attributes, termios.tcgetattr(master))
+        finally:
+            os.close(master)
+
+        self.assertTrue(mock_create_connection.call_args[0][0].endswith('container/%s/exec/?' % container.uuid))
+        self.assertFalse(shell.send.called)
+
+
+class ContainerCpTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stderr = sys.stderr
+        sys.stderr = self.error = StringIO.StringIO()
+        self.container = tutum.Container()
+        self.container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    @mock.patch('tutumcli.commands.utils.copy_to_container')
+    @mock.patch('tutumcli.commands.utils.copy_from_container')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_container')
+    def test_container_cp(self, mock_fetch_remote_container, mock_copy_from_container, mock_copy_to_container):
+        mock_fetch_remote_container.return_value = self.container
+
+        container_cp('web-1:/tmp/heap.hprof', '.')
+        mock_fetch_remote_container.assert_called_with('web-1')
+        mock_copy_from_container.assert_called_with(self.container, '/tmp/heap.hprof', '.')
+
+        container_cp('./nginx.conf', '7a4c:/etc/nginx')
+        mock_fetch_remote_container.assert_called_with('7a4c')
+        mock_copy_to_container.assert_called_with(self.container, './nginx.conf', '/etc/nginx')
+
+    @mock.patch('tutumcli.commands.utils.fetch_remote_container')
+    def test_container_cp_with_exception(self, mock_fetch_remote_container):
+        self.assertRaises(SystemExit, container_cp, 'a:/tmp', 'b:/tmp')
+        self.assertRaises(SystemExit, container_cp, '/tmp/a', '/tmp/b')
+        self.assertFalse(mock_fetch_remote_container.called)
+        self.assertEqual(2, self.error.getvalue().count('CONTAINER:PATH'))
+
+
 class ContainerInspectTestCase(unittest.TestCase):
     def setUp(self):
         self.stdout = sys.stdout
@@ -538,7 +903,7 @@ class ContainerInspectTestCase(unittest.TestCase):
         container.uuid = uuid
         mock_fetch_remote_container.return_value = container
         mock_get_all_attributes.return_value = {'key': [{'name': 'test', 'id': '1'}]}
-        container_inspect(['test_id'])
+        container_inspect(['test_id'], None, 10)
 
         self.assertEqual(' '.join(output.split()), ' '.join(self.buf.getvalue().strip().split()))
         self.buf.truncate(0)
@@ -548,8 +913,31 @@ class ContainerInspectTestCase(unittest.TestCase):
     def test_container_inspect_with_exception(self, mock_fetch_remote_container, mock_exit):
         container = tutumcli.commands.tutum.Container()
         mock_fetch_remote_container.return_value = container
-        container_inspect(['test_id', 'test_id2'])
+        container_inspect(['test_id', 'test_id2'], None, 10)
+
+        mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
+
+
+class ContainerLogsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = self.buf = StringIO.StringIO()
 
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    @mock.patch('tutumcli.commands.sys.exit')
+    @mock.patch('tutumcli.commands.utils.stream_logs')
+    @mock.patch('tutumcli.commands.utils.fetch_remote_container')
+    def test_container_logs(self, mock_fetch_remote_container, mock_stream_logs, mock_exit):
+        container1 = tutumcli.commands.tutum.Container()
+        container2 = tutumcli.commands.tutum.Container()
+        mock_fetch_remote_container.side_effect = [container1, ObjectNotFound("not found"), container2]
+        mock_stream_logs.return_value = False
+        container_logs(['web-1', 'unknown', 'web-2'], 10, True)
+
+        mock_stream_logs.assert_called_with([container1, container2], 10, True,
+                                            utils.container_service_log_handler)
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
@@ -612,7 +1000,7 @@ class ContainerPsTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.tutum.Node.list')
     @mock.patch('tutumcli.commands.tutum.Stack.list')
     @mock.patch('tutumcli.commands.tutum.Service.list')
-    @mock.patch('tutumcli.commands.tutum.Container.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_container_ps_trunc(self, mock_list, mock_service, mock_stack, mock_node):
         output = u'''NAME        UUID      STATUS     IMAGE            RUN COMMAND      EXIT CODE  DEPLOYED    PORTS                 NODE      STACK
 CONTAINER1  7A4CFE51  \u25b6 Running  test/container1  /bin/bash                1              container1.io:808...  d20430ae  service1
@@ -622,16 +1010,17 @@ CONTAINER2  8B4CFE51  \u25fc Stopped  test/container2  /bin/sh
         mock_service.return_value = self.servicelist
         mock_list.return_value = self.containerlist
 
-        container_ps(False, 'Running', None, False)
+        container_ps(False, 'Running', None, False, None, 'table', False)
 
-        mock_list.assert_called_with(state='Running', service=None)
+        mock_list.assert_called_with(tutum.Container, fields=mock.ANY, filters=[], prefetch=True, state='Running',
+                                     service=None)
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.tutum.Node.list')
     @mock.patch('tutumcli.commands.tutum.Stack.list')
     @mock.patch('tutumcli.commands.tutum.Service.list')
-    @mock.patch('tutumcli.commands.tutum.Container.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_container_ps_notrunc(self, mock_list, mock_service, mock_stack, mock_node):
         output = u'''NAME        UUID                                  STATUS     IMAGE            RUN COMMAND      EXIT CODE  DEPLOYED    PORTS                         NODE                                  STACK
 CONTAINER1  7A4CFE51-03BB-42D6-825E-3B533888D8CD  \u25b6 Running  test/container1  /bin/bash                1              container1.io:8080->8080/tcp  d20430ae-da6d-4c13-bc91-ab15cf0b973d  service1
@@ -640,16 +1029,17 @@ CONTAINER2  8B4CFE51-03BB-42D6-825E-3B533888D8CD  \u25fc Stopped  test/container
         mock_stack.return_value = self.stacklist
         mock_service.return_value = self.servicelist
         mock_list.return_value = self.containerlist
-        container_ps(False, 'Running', None, True)
+        container_ps(False, 'Running', None, True, None, 'table', False)
 
-        mock_list.assert_called_with(state='Running', service=None)
+        mock_list.assert_called_with(tutum.Container, fields=mock.ANY, filters=[], prefetch=True, state='Running',
+                                     service=None)
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.tutum.Node.list')
     @mock.patch('tutumcli.commands.tutum.Stack.list')
     @mock.patch('tutumcli.commands.tutum.Service.list')
-    @mock.patch('tutumcli.commands.tutum.Container.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_container_ps_quiet(self, mock_list, mock_service, mock_stack, mock_node):
         output = '''7A4CFE51-03BB-42D6-825E-3B533888D8CD
 8B4CFE51-03BB-42D6-825E-3B533888D8CD'''
@@ -657,14 +1047,59 @@ CONTAINER2  8B4CFE51-03BB-42D6-825E-3B533888D8CD  \u25fc Stopped  test/container
         mock_stack.return_value = self.stacklist
         mock_service.return_value = self.servicelist
         mock_list.return_value = self.containerlist
-        container_ps(True, None, None, False)
+        with mock.patch('tutumcli.commands.cache.index_objects') as mock_index_objects:
+            container_ps(True, None, None, False, None, 'table', False)
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
+        # nodes are not shown, and only the identifiers of the containers are kept
+        self.assertFalse(mock_node.called)
+        indexed_containers = mock_index_objects.call_args[0][1]
+        self.assertEqual([('CONTAINER1', 'container1_service_uri'), ('CONTAINER2', 'container2_service_uri')],
+                         [(container.name, container.service) for container in indexed_containers])
+        self.assertNotIsInstance(indexed_containers[0], tutum.Container)
+        self.assertEqual('service2', mock_index_objects.call_args[0][2](indexed_containers[1]))
+
+    @mock.patch('tutumcli.commands.tutum.Node.list')
+    @mock.patch('tutumcli.commands.tutum.Stack.list')
+    @mock.patch('tutumcli.commands.tutum.Service.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_container_ps_fixed(self, mock_list, mock_service, mock_stack, mock_node):
+        mock_node.return_value = self.nodelist
+        mock_stack.return_value = self.stacklist
+        mock_service.return_value = self.servicelist
+        mock_list.return_value = self.containerlist
+        container_ps(False, None, None, False, None, 'fixed', False)
+
+        lines = self.buf.getvalue().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith('NAME                      UUID      STATUS'))
+        self.assertEqual(lines[0].index('STACK'), lines[1].index('service1'))
+        self.assertEqual(lines[0].index('PORTS'), lines[2].index('container2.io:330...'))
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.tutum.Node.list')
+    @mock.patch('tutumcli.commands.tutum.Stack.list')
+    @mock.patch('tutumcli.commands.tutum.Service.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_container_ps_ndjson(self, mock_list, mock_service, mock_stack, mock_node):
+        mock_node.return_value = self.nodelist
+        mock_stack.return_value = self.stacklist
+        mock_service.return_value = self.servicelist
+        mock_list.return_value = self.containerlist
+        container_ps(False, None, None, False, None, 'ndjson', False)
+
+        records = [json.loads(line) for line in self.buf.getvalue().splitlines()]
+        self.assertEqual(2, len(records))
+        self.assertEqual({'name': 'CONTAINER2', 'uuid': '8B4CFE51-03BB-42D6-825E-3B533888D8CD', 'state': 'Stopped',
+                          'image_name': 'test/container2', 'run_command': '/bin/sh', 'exit_code': 0,
+                          'deployed_datetime': '', 'ports': ['container2.io:3307->3306/tcp'],
+                          'node': '445c3d27-0dd4-443c-ad51-ea7539083114', 'stack': 'service2'}, records[1])
+        self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.sys.exit')
-    @mock.patch('tutumcli.commands.tutum.Container.list', side_effect=TutumApiError)
+    @mock.patch('tutumcli.commands.utils.iter_list', side_effect=TutumApiError)
     def test_container_ps_with_exception(self, mock_list, mock_exit):
-        container_ps(None, None, None, False)
+        container_ps(None, None, None, False, None, 'table', False)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -676,6 +1111,7 @@ class ContainerStartTestCase(unittest.TestCase):
 
     def tearDown(self):
         sys.stdout = self.stdout
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
 
     @mock.patch('tutumcli.commands.tutum.Container.start')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_container')
@@ -684,7 +1120,7 @@ class ContainerStartTestCase(unittest.TestCase):
         container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_container.return_value = container
         mock_start.return_value = True
-        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(container.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -692,7 +1128,7 @@ class ContainerStartTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_container', side_effect=TutumApiError)
     def test_container_start_with_exception(self, mock_fetch_remote_container, mock_exit):
-        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -712,7 +1148,7 @@ class ContainerStopTestCase(unittest.TestCase):
         container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_container.return_value = container
         mock_stop.return_value = True
-        container_stop(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_stop(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(container.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -720,7 +1156,7 @@ class ContainerStopTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_container', side_effect=TutumApiError)
     def test_container_stop_with_exception(self, mock_fetch_remote_container, mock_exit):
-        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_start(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -740,7 +1176,7 @@ class ContainerTerminateTestCase(unittest.TestCase):
         container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_container.return_value = container
         mock_delete.return_value = True
-        container_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(container.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -748,7 +1184,7 @@ class ContainerTerminateTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_container', side_effect=TutumApiError)
     def test_container_terminate_with_exception(self, mock_fetch_remote_container, mock_exit):
-        container_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        container_terminate(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -768,7 +1204,7 @@ class ContainerRedeployTestCase(unittest.TestCase):
         container.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_container.return_value = container
         mock_redeploy.return_value = True
-        container_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False)
+        container_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False, 1)
 
         self.assertEqual(container.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -776,7 +1212,7 @@ class ContainerRedeployTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_container', side_effect=TutumApiError)
     def test_container_redeploy_with_exception(self, mock_fetch_remote_container, mock_exit):
-        container_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False)
+        container_redeploy(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], True, False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -806,30 +1242,31 @@ class ImageListTestCase(unittest.TestCase):
     def tearDown(self):
         sys.stdout = self.stdout
 
-    @mock.patch('tutumcli.commands.tutum.Image.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_image_list(self, mock_list):
         output = u'''NAME                                          #TAG  IN_USE    PRIVATE    TUTUM_BUILD    DESCRIPTION
 r-staging.tutum.co/admin/tutum-app               1  no        yes        yes
 r-staging.tutum.co/admin/python-quickstart       1  no        yes        yes'''
         mock_list.return_value = self.imagelist
-        image_list(False, False, False, False, False, False)
+        image_list(False, False, False, False, False, False, None, 'table')
 
+        mock_list.assert_called_with(tutum.Image, fields=mock.ANY, filters=[], is_user_image=True)
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
-    @mock.patch('tutumcli.commands.tutum.Image.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
     def test_image_list_quiet(self, mock_list):
         output = 'r-staging.tutum.co/admin/tutum-app\nr-staging.tutum.co/admin/python-quickstart'
         mock_list.return_value = self.imagelist
-        image_list(True, False, False, False, False, False)
+        image_list(True, False, False, False, False, False, None, 'table')
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.sys.exit')
-    @mock.patch('tutumcli.commands.tutum.Image.list', side_effect=TutumApiError)
+    @mock.patch('tutumcli.commands.utils.iter_list', side_effect=TutumApiError)
     def test_image_list_with_exception(self, mock_fetch_remote_container, mock_exit):
-        image_list(False, False, False, False, False, False)
+        image_list(False, False, False, False, False, False, None, 'table')
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -905,10 +1342,10 @@ class ImageSearchTestCase(unittest.TestCase):
     def tearDown(self):
         sys.stdout = self.stdout
 
-    @mock.patch.object(tutumcli.commands.utils.docker.Client, 'search')
+    @mock.patch('docker.Client.search')
     @mock.patch('tutumcli.utils.get_docker_client')
     def test_image_search(self, mock_get_docker_client, mock_search):
-        mock_get_docker_client.return_value = tutumcli.commands.utils.docker.Client()
+        mock_get_docker_client.return_value = docker.Client()
         mock_search.return_value = [
             {
                 "description": "1st image",
@@ -940,10 +1377,10 @@ vgauthier/sshd   3rd image            0  ✓           ✓'''
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.sys.exit')
-    @mock.patch.object(tutumcli.commands.utils.docker.Client, 'search', side_effect=TutumApiError)
+    @mock.patch('docker.Client.search', side_effect=TutumApiError)
     @mock.patch('tutumcli.utils.get_docker_client')
     def test_image_search_with_exception(self, mock_get_docker_client, mock_search, mock_exit):
-        mock_get_docker_client.return_value = tutumcli.commands.utils.docker.Client()
+        mock_get_docker_client.return_value = docker.Client()
         image_search('keyword')
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
@@ -989,50 +1426,82 @@ class NodeListTestCase(unittest.TestCase):
         node1.state = 'Deployed'
         node1.last_seen = None
         node1.node_cluster = '/api/v1/nodecluster/b0374cc2-4003-4270-b131-25fc494ea2be/'
+        node1.docker_version = '1.8.1'
         node2 = tutumcli.commands.tutum.Node()
         node2.uuid = 'bd276db4-cd35-4311-8110-1c82885c33d2'
         node2.external_fqdn = 'bd276db4-tifayuki.node.tutum.io"'
         node2.state = 'Deploying'
         node2.last_seen = None
         node2.node_cluster = '/api/v1/nodecluster/b0374cc2-4003-4270-b131-25fc494ea2be/'
+        node2.docker_version = '1.8.1'
         self.nodeklist = [node1, node2]
 
     def tearDown(self):
         sys.stdout = self.stdout
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
 
     @mock.patch('tutumcli.commands.tutum.NodeCluster.fetch')
-    @mock.patch('tutumcli.commands.tutum.Node.list')
-    def test_node_list(self, mock_list, mock_fetch):
-        output = u'''UUID      FQDN                              LASTSEEN    STATUS       CLUSTER
-19303d01  19303d01-tifayuki.node.tutum.io               ▶ Deployed   test_nodecluster
-bd276db4  bd276db4-tifayuki.node.tutum.io"              ⚙ Deploying  test_nodecluster'''
+    @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_node_list(self, mock_list, mock_nodecluster_list, mock_fetch):
+        output = u'''UUID      FQDN                              LASTSEEN    STATUS       CLUSTER           DOCKER_VER
+19303d01  19303d01-tifayuki.node.tutum.io               \u25b6 Deployed   test_nodecluster  1.8.1
+bd276db4  bd276db4-tifayuki.node.tutum.io"              \u2699 Deploying  test_nodecluster  1.8.1'''
         mock_list.return_value = self.nodeklist
         nodecluster = tutumcli.commands.tutum.NodeCluster()
         nodecluster.name = 'test_nodecluster'
-        mock_fetch.return_value = nodecluster
-        node_list(quiet=False)
+        nodecluster.resource_uri = '/api/v1/nodecluster/b0374cc2-4003-4270-b131-25fc494ea2be/'
+        mock_nodecluster_list.return_value = [nodecluster]
+        node_list(quiet=False, filters=None, output_format='table', watch=False)
 
+        mock_list.assert_called_with(tutum.Node, fields=mock.ANY, filters=[])
         self.assertEqual(output, self.buf.getvalue().strip())
+        mock_nodecluster_list.assert_called_once_with()
+        self.assertFalse(mock_fetch.called)
         self.buf.truncate(0)
 
-    @mock.patch('tutumcli.commands.tutum.NodeCluster.fetch')
-    @mock.patch('tutumcli.commands.tutum.Node.list')
-    def test_node_list(self, mock_list, mock_fetch):
+    @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_node_list_unknown_cluster(self, mock_list, mock_nodecluster_list):
+        mock_list.return_value = self.nodeklist
+        mock_nodecluster_list.return_value = []
+        node_list(quiet=False, filters=None, output_format='table', watch=False)
+
+        self.assertIn('/api/v1/nodecluster/b0374cc2-4003-4270-b131-25fc494ea2be/', self.buf.getvalue())
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_node_list_quiet(self, mock_list, mock_nodecluster_list):
         output = '''19303d01-3564-437b-ac54-e7f8d17003f6
 bd276db4-cd35-4311-8110-1c82885c33d2'''
+        mock_list.return_value = self.nodeklist
+        node_list(quiet=True, filters=None, output_format='table', watch=False)
+
+        self.assertEqual(output, self.buf.getvalue().strip())
+        self.assertFalse(mock_nodecluster_list.called)
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
+    @mock.patch('tutumcli.commands.utils.iter_list')
+    def test_node_list_csv(self, mock_list, mock_nodecluster_list):
+        output = '''uuid,external_fqdn,last_seen,state,node_cluster,docker_version
+19303d01-3564-437b-ac54-e7f8d17003f6,19303d01-tifayuki.node.tutum.io,,Deployed,test_nodecluster,1.8.1
+bd276db4-cd35-4311-8110-1c82885c33d2,"bd276db4-tifayuki.node.tutum.io""",,Deploying,test_nodecluster,1.8.1'''
         mock_list.return_value = self.nodeklist
         nodecluster = tutumcli.commands.tutum.NodeCluster()
         nodecluster.name = 'test_nodecluster'
-        mock_fetch.return_value = nodecluster
-        node_list(quiet=True)
+        nodecluster.resource_uri = '/api/v1/nodecluster/b0374cc2-4003-4270-b131-25fc494ea2be/'
+        mock_nodecluster_list.return_value = [nodecluster]
+        node_list(False, None, 'csv', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.sys.exit')
-    @mock.patch('tutumcli.commands.tutum.Node.list', side_effect=TutumApiError)
-    def test_node_list(self, mock_list, mock_exit):
-        node_list(False)
+    @mock.patch('tutumcli.commands.utils.iter_list', side_effect=TutumApiError)
+    def test_node_list_with_exception(self, mock_list, mock_exit):
+        node_list(False, None, 'table', False)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1063,9 +1532,9 @@ class NodeInspectTestCase(unittest.TestCase):
         mock_fetch.return_value = node
         mock_fetch_remote_node.return_value = node
         mock_get_all_attributes.return_value = {'key': [{'name': 'test', 'id': '1'}]}
-        node_inspect(['test_id'])
+        node_inspect(['test_id'], None, 10)
 
-        mock_fetch.assert_called_with(uuid)
+        self.assertFalse(mock_fetch.called)
         self.assertEqual(' '.join(output.split()), ' '.join(self.buf.getvalue().strip().split()))
         self.buf.truncate(0)
 
@@ -1074,7 +1543,7 @@ class NodeInspectTestCase(unittest.TestCase):
     def test_node_inspect_with_exception(self, mock_fetch_remote_node, mock_exit):
         node = tutumcli.commands.tutum.Node()
         mock_fetch_remote_node.return_value = node
-        node_inspect(['test_id', 'test_id2'])
+        node_inspect(['test_id', 'test_id2'], None, 10)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1094,7 +1563,7 @@ class NodeRmTestCase(unittest.TestCase):
         node.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_node.return_value = node
         mock_delete.return_value = True
-        node_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        node_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(node.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1102,13 +1571,14 @@ class NodeRmTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_node', side_effect=TutumApiError)
     def test_node_terminate_with_exception(self, mock_fetch_remote_node, mock_exit):
-        node_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        node_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
 class NodeClusterListTestCase(unittest.TestCase):
     def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
         self.stdout = sys.stdout
         sys.stdout = self.buf = StringIO.StringIO()
         nodecluster1 = tutumcli.commands.tutum.NodeCluster()
@@ -1132,52 +1602,77 @@ class NodeClusterListTestCase(unittest.TestCase):
         self.nodeclusterlist = [nodecluster1, nodecluster2]
 
         region1 = tutumcli.commands.tutum.Region()
+        region1.name = 'nyc3'
         region1.label = 'New York 3'
+        region1.resource_uri = '/api/v1/region/digitalocean/nyc3/'
         region2 = tutumcli.commands.tutum.Region()
+        region2.name = 'sfo1'
         region2.label = 'San Francisco 1'
+        region2.resource_uri = '/api/v1/region/digitalocean/sfo1/'
         self.regionlist = [region1, region2]
 
         nodetype1 = tutumcli.commands.tutum.NodeType()
+        nodetype1.name = '512mb'
         nodetype1.label = '512MB'
-        nodetype2 = tutumcli.commands.tutum.NodeType()
-        nodetype2.label = '512MB'
-        self.nodetypelist = [nodetype1, nodetype2]
+        nodetype1.resource_uri = '/api/v1/nodetype/digitalocean/512mb/'
+        self.nodetypelist = [nodetype1]
 
     def tearDown(self):
         sys.stdout = self.stdout
 
-    @mock.patch('tutumcli.commands.tutum.Region.fetch')
-    @mock.patch('tutumcli.commands.tutum.NodeType.fetch')
+    @mock.patch('tutumcli.commands.tutum.Region.list')
+    @mock.patch('tutumcli.commands.tutum.NodeType.list')
     @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
-    def test_clusternode_list(self, mock_list, mock_nodetype_fetch, mock_region_fetch):
+    def test_clusternode_list(self, mock_list, mock_nodetype_list, mock_region_list):
         mock_list.return_value = self.nodeclusterlist
-        mock_nodetype_fetch.side_effect = self.nodetypelist
-        mock_region_fetch.side_effect = self.regionlist
+        mock_nodetype_list.return_value = self.nodetypelist
+        mock_region_list.return_value = self.regionlist
         output = '''NAME      UUID      REGION           TYPE    DEPLOYED    STATUS          CURRENT#NODES    TARGET#NODES
-test_sfo  b0374cc2  New York 3       512MB               Deployed                    2               2
-newyork3  a4c1e712  San Francisco 1  512MB               Provisioning                1               1'''
-        nodecluster_list(quiet=False)
+test_sfo  b0374cc2  San Francisco 1  512MB               Deployed                    2               2
+newyork3  a4c1e712  New York 3       512MB               Provisioning                1               1'''
+        nodecluster_list(quiet=False, refresh=False, output_format='table')
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
 
-    @mock.patch('tutumcli.commands.tutum.Region.fetch')
-    @mock.patch('tutumcli.commands.tutum.NodeType.fetch')
+    @mock.patch('tutumcli.commands.tutum.Region.list')
+    @mock.patch('tutumcli.commands.tutum.NodeType.list')
     @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
-    def test_clusternode_list_quiet(self, mock_list, mock_nodetype_fetch, mock_region_fetch):
+    def test_clusternode_list_uses_cached_reference_data(self, mock_list, mock_nodetype_list, mock_region_list):
+        mock_list.return_value = self.nodeclusterlist
+        mock_nodetype_list.return_value = self.nodetypelist
+        mock_region_list.return_value = self.regionlist
+        nodecluster_list(quiet=False, refresh=False, output_format='table')
+        first_output = self.buf.getvalue()
+        self.buf.truncate(0)
+
+        nodecluster_list(quiet=False, refresh=False, output_format='table')
+        self.assertEqual(first_output, self.buf.getvalue())
+        self.assertEqual(1, mock_nodetype_list.call_count)
+        self.assertEqual(1, mock_region_list.call_count)
+
+        nodecluster_list(quiet=False, refresh=True, output_format='table')
+        self.assertEqual(2, mock_nodetype_list.call_count)
+        self.assertEqual(2, mock_region_list.call_count)
+        self.buf.truncate(0)
+
+    @mock.patch('tutumcli.commands.tutum.Region.list')
+    @mock.patch('tutumcli.commands.tutum.NodeType.list')
+    @mock.patch('tutumcli.commands.tutum.NodeCluster.list')
+    def test_clusternode_list_quiet(self, mock_list, mock_nodetype_list, mock_region_list):
         mock_list.return_value = self.nodeclusterlist
-        mock_nodetype_fetch.side_effect = self.nodetypelist
-        mock_region_fetch.side_effect = self.regionlist
         output = 'b0374cc2-4003-4270-b131-25fc494ea2be\na4c1e712-ca26-4547-adb7-8da1057b964b'
-        nodecluster_list(quiet=True)
+        nodecluster_list(quiet=True, refresh=False, output_format='table')
 
         self.assertEqual(output, self.buf.getvalue().strip())
+        self.assertFalse(mock_nodetype_list.called)
+        self.assertFalse(mock_region_list.called)
         self.buf.truncate(0)
 
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.NodeCluster.list', side_effect=TutumApiError)
     def test_clusternode_list_with_excepiton(self, mock_list, mock_exit):
-        nodecluster_list(quiet=True)
+        nodecluster_list(quiet=True, refresh=False, output_format='table')
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1208,9 +1703,9 @@ class NodeClusterInspectTestCase(unittest.TestCase):
         mock_fetch.return_value = nodecluster
         mock_fetch_remote_node_cluster.return_value = nodecluster
         mock_get_all_attributes.return_value = {'key': [{'name': 'test', 'id': '1'}]}
-        nodecluster_inspect(['test_id'])
+        nodecluster_inspect(['test_id'], None, 10)
 
-        mock_fetch.assert_called_with(uuid)
+        self.assertFalse(mock_fetch.called)
         self.assertEqual(' '.join(output.split()), ' '.join(self.buf.getvalue().strip().split()))
         self.buf.truncate(0)
 
@@ -1219,7 +1714,7 @@ class NodeClusterInspectTestCase(unittest.TestCase):
     def test_nodecluster_inspect_with_exception(self, mock_fetch_remote_nodecluster, mock_exit):
         nodecluster = tutumcli.commands.tutum.NodeCluster()
         mock_fetch_remote_nodecluster.return_value = nodecluster
-        nodecluster_inspect(['test_id', 'test_id2'])
+        nodecluster_inspect(['test_id', 'test_id2'], None, 10)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1239,7 +1734,7 @@ class NodeClusterRmTestCase(unittest.TestCase):
         nodecluster.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_nodecluster.return_value = nodecluster
         mock_delete.return_value = True
-        nodecluster_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        nodecluster_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         self.assertEqual(nodecluster.uuid, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1247,7 +1742,7 @@ class NodeClusterRmTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_nodecluster', side_effect=TutumApiError)
     def test_nodecluster_rm_with_exception(self, mock_fetch_remote_nodecluster, mock_exit):
-        nodecluster_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False)
+        nodecluster_rm(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1266,7 +1761,7 @@ class NodeClusterScaleTestCase(unittest.TestCase):
         nodecluster = tutumcli.commands.tutum.NodeCluster()
         nodecluster.uuid = '7A4CFE51-03BB-42D6-825E-3B533888D8CD'
         mock_fetch_remote_nodecluster.return_value = nodecluster
-        nodecluster_scale(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], 3, False)
+        nodecluster_scale(['7A4CFE51-03BB-42D6-825E-3B533888D8CD'], 3, False, 1)
 
         mock_save.assert_called()
         self.assertEqual(3, nodecluster.target_num_nodes)
@@ -1276,13 +1771,14 @@ class NodeClusterScaleTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Utils.fetch_remote_nodecluster', side_effect=TutumApiError)
     def test_nodecluster_scale_with_exception(self, mock_fetch_remote_nodecluster, mock_exit):
-        nodecluster_scale(['test_id'], 3, False)
+        nodecluster_scale(['test_id'], 3, False, 1)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
 class NodeClusterShowProviderTestCase(unittest.TestCase):
     def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
         self.stdout = sys.stdout
         sys.stdout = self.buf = StringIO.StringIO()
 
@@ -1310,7 +1806,7 @@ class NodeClusterShowProviderTestCase(unittest.TestCase):
         output = '''NAME          LABEL
 digitalocean  Digital Ocean'''
         mock_list.return_value = self.providerlist
-        nodecluster_show_providers(quiet=False)
+        nodecluster_show_providers(quiet=False, refresh=False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1319,7 +1815,7 @@ digitalocean  Digital Ocean'''
     def test_nodecluster_show_providers_quiet(self, mock_list):
         output = 'digitalocean'
         mock_list.return_value = self.providerlist
-        nodecluster_show_providers(quiet=True)
+        nodecluster_show_providers(quiet=True, refresh=False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1327,13 +1823,14 @@ digitalocean  Digital Ocean'''
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Provider.list', side_effect=TutumApiError)
     def test_nodecluster_show_providers_with_exception(self, mock_list, mock_exit):
-        nodecluster_show_providers(quiet=True)
+        nodecluster_show_providers(quiet=True, refresh=False)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
 class NodeClusterShowRegionsTestCase(unittest.TestCase):
     def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
         self.stdout = sys.stdout
         sys.stdout = self.buf = StringIO.StringIO()
         region1 = tutumcli.commands.tutum.Region()
@@ -1380,7 +1877,7 @@ ams1    Amsterdam 1      digitalocean
 sfo1    San Francisco 1  digitalocean
 jap1    Japan 1          aws'''
         mock_list.return_value = self.regionlist
-        nodecluster_show_regions('')
+        nodecluster_show_regions('', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1391,7 +1888,7 @@ jap1    Japan 1          aws'''
 ams1    Amsterdam 1      digitalocean
 sfo1    San Francisco 1  digitalocean'''
         mock_list.return_value = self.regionlist
-        nodecluster_show_regions('digitalocean')
+        nodecluster_show_regions('digitalocean', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1399,13 +1896,14 @@ sfo1    San Francisco 1  digitalocean'''
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.Region.list', side_effect=TutumApiError)
     def test_nodecluster_show_regions_with_exception(self, mock_list, mock_exit):
-        nodecluster_show_regions('')
+        nodecluster_show_regions('', False)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
 
 class NodeClusterShowTypesTestCase(unittest.TestCase):
     def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
         self.stdout = sys.stdout
         sys.stdout = self.buf = StringIO.StringIO()
         nodetype1 = tutumcli.commands.tutum.NodeType()
@@ -1453,7 +1951,7 @@ class NodeClusterShowTypesTestCase(unittest.TestCase):
 1gb     1GB      digitalocean  ams1, sfo1, nyc2, ams2, sgp1, lon1, nyc3, nyc1
 3gb     3GB      aws           tokyo, kyoto, shibuya, ueno, akiba'''
         mock_list.return_value = self.nodetypelist
-        nodecluster_show_types('', '')
+        nodecluster_show_types('', '', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1463,7 +1961,7 @@ class NodeClusterShowTypesTestCase(unittest.TestCase):
         output = '''NAME    LABEL    PROVIDER    REGIONS
 3gb     3GB      aws         tokyo, kyoto, shibuya, ueno, akiba'''
         mock_list.return_value = self.nodetypelist
-        nodecluster_show_types('aws', '')
+        nodecluster_show_types('aws', '', False)
 
         self.assertEqual(output, self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1474,12 +1972,12 @@ class NodeClusterShowTypesTestCase(unittest.TestCase):
 512mb   512MB    digitalocean  ams1, sfo1, nyc2, ams2, sgp1, lon1, nyc3, nyc1
 1gb     1GB      digitalocean  ams1, sfo1, nyc2, ams2, sgp1, lon1, nyc3, nyc1'''
         mock_list.return_value = self.nodetypelist
-        nodecluster_show_types(output, 'nyc3')
+        nodecluster_show_types(output, 'nyc3', False)
 
     @mock.patch('tutumcli.commands.tutum.NodeType.list')
     def test_nodecluster_show_types_with_filters(self, mock_list):
         mock_list.return_value = self.nodetypelist
-        nodecluster_show_types('aws', 'nyc3')
+        nodecluster_show_types('aws', 'nyc3', False)
 
         self.assertEqual('NAME    LABEL    PROVIDER    REGIONS', self.buf.getvalue().strip())
         self.buf.truncate(0)
@@ -1487,7 +1985,7 @@ class NodeClusterShowTypesTestCase(unittest.TestCase):
     @mock.patch('tutumcli.commands.sys.exit')
     @mock.patch('tutumcli.commands.tutum.NodeType.list', side_effect=TutumApiError)
     def test_nodecluster_show_types_with_exception(self, mock_list, mock_exit):
-        nodecluster_show_types('', '')
+        nodecluster_show_types('', '', False)
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
 
@@ -1525,3 +2023,95 @@ class NodeClusterCreateTestCase(unittest.TestCase):
         nodecluster_create(3, 'name', 'provider', 'region', 'nodetype', False, None, None, "", [], [], "")
 
         mock_exit.assert_called_with(EXCEPTION_EXIT_CODE)
+
+
+class VerifyAuthTestCase(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
+        self.patchers = [mock.patch.object(module, 'send_request', mock.Mock(spec=[]))
+                         for module in [tutum.api.http, tutum.api.base, tutum.api.stack, tutum.api.trigger,
+                                        tutum.api.imagetag]]
+        self.mock_send_requests = [patcher.start() for patcher in self.patchers]
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
+
+    def _args(self, cmd):
+        args = mock.MagicMock()
+        args.cmd = cmd
+        return args
+
+    def test_verify_auth_is_lazy(self):
+        verify_auth(self._args('service'))
+        verify_auth(self._args('service'))
+
+        self.assertFalse(self.mock_send_requests[0].called)
+        for module, mock_send_request in zip([tutum.api.http, tutum.api.base], self.mock_send_requests):
+            self.assertTrue(module.send_request.login_on_auth_error)
+            mock_send_request.return_value = {'uuid': 'abc'}
+            self.assertEqual({'uuid': 'abc'}, module.send_request('GET', 'service'))
+            mock_send_request.assert_called_once_with('GET', 'service')
+
+    def test_verify_auth_login(self):
+        verify_auth(self._args('login'))
+        self.assertIs(self.mock_send_requests[0], tutum.api.http.send_request)
+
+    @mock.patch('tutumcli.commands._login')
+    def test_verify_auth_login_on_auth_error(self, mock_login):
+        mock_login.side_effect = lambda: setattr(tutum, 'basic_auth', 'bmV3OmNyZWRz')
+        self.mock_send_requests[1].side_effect = [TutumAuthError("Not authorized"), {'uuid': 'abc'}]
+        verify_auth(self._args('service'))
+
+        with mock.patch.object(tutum, 'basic_auth', 'b2xkOmNyZWRz'):
+            self.assertEqual({'uuid': 'abc'}, tutum.api.base.send_request('GET', 'service'))
+        self.assertEqual(1, mock_login.call_count)
+        self.assertEqual(2, self.mock_send_requests[1].call_count)
+
+    @mock.patch('tutumcli.commands._login')
+    def test_verify_auth_login_once_for_concurrent_requests(self, mock_login):
+        self.mock_send_requests[1].side_effect = [TutumAuthError("Not authorized"), {'uuid': 'abc'}]
+        verify_auth(self._args('service'))
+
+        with mock.patch.object(tutum, 'basic_auth', 'b2xkOmNyZWRz'):
+            with mock.patch('tutumcli.commands.auth.get_auth_header', side_effect=[{'Authorization': 'old'},
+                                                                                     {'Authorization': 'new'}]):
+                self.assertEqual({'uuid': 'abc'}, tutum.api.base.send_request('GET', 'service'))
+        self.assertFalse(mock_login.called)
+
+    @mock.patch('tutumcli.commands._login')
+    def test_verify_auth_no_login_in_worker_threads(self, mock_login):
+        self.mock_send_requests[1].side_effect = TutumAuthError("Not authorized")
+        verify_auth(self._args('service'))
+
+        errors = []
+
+        def _request():
+            try:
+                tutum.api.base.send_request('GET', 'service')
+            except TutumAuthError as e:
+                errors.append(e)
+
+        with mock.patch.object(tutum, 'basic_auth', 'b2xkOmNyZWRz'):
+            thread = threading.Thread(target=_request)
+            thread.start()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(mock_login.called)
+        self.assertEqual(1, len(errors))
+        self.assertIn('tutum login', str(errors[0]))
+
+    @mock.patch('tutumcli.commands.raw_input', create=True, side_effect=EOFError)
+    def test_login_without_terminal(self, mock_raw_input):
+        with mock.patch('sys.stderr', new_callable=StringIO.StringIO):
+            self.assertRaises(TutumAuthError, tutumcli.commands._login)
+
+    def test_verify_auth_event(self):
+        verify_auth(self._args('event'))
+        verify_auth(self._args('event'))
+        self.mock_send_requests[0].assert_called_once_with('GET', '/auth')
+
+        with mock.patch('tutumcli.commands.cache.time.time', return_value=time.time() + AUTH_VERIFIED_TTL + 1):
+            verify_auth(self._args('event'))
+        self.assertEqual(2, self.mock_send_requests[0].call_count)
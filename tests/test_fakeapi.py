@@ -0,0 +1,132 @@
+import base64
+import os
+import shutil
+import socket
+import StringIO
+import tarfile
+import tempfile
+import unittest
+
+import mock
+import tutum
+import websocket
+from tests.fakeapi import EXEC_BUFFER_SIZE, FakeTutumAPI
+from tutumcli import utils
+
+
+class FakeTutumAPITestCase(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeTutumAPI(stacks=2, services=2, containers_per_service=4, page_size=3).start()
+        self.user_agent = mock.patch.object(tutum, 'user_agent', 'tutum-cli/test')
+        self.user_agent.start()
+
+    def tearDown(self):
+        self.user_agent.stop()
+        self.api.stop()
+
+    def test_list(self):
+        containers = list(utils.iter_list(tutum.Container))
+        self.assertEqual(8, len(containers))
+        self.assertEqual(3, len([request for request in self.api.requests if request == ('GET', '/api/v1/container/')]))
+
+        service = self.api.objects['service'].values()[1]
+        containers = list(utils.iter_list(tutum.Container, service=service['resource_uri']))
+        self.assertEqual(['web-1-1', 'web-1-2', 'web-1-3', 'web-1-4'], [container.name for container in containers])
+
+    def test_fetch(self):
+        service = self.api.objects['service'].values()[1]
+        self.assertEqual(service['uuid'], utils.fetch_remote_service('web-1').uuid)
+        self.assertEqual(service['uuid'], utils.fetch_remote_service(service['uuid'][:8]).uuid)
+        self.assertEqual(service['uuid'], utils.fetch_remote_service('web-1.stack-1').uuid)
+        self.assertEqual('web-1-2', utils.fetch_remote_container('web-1-2').name)
+        self.assertRaises(tutum.ObjectNotFound, utils.fetch_remote_service, 'web-1.stack-0')
+
+    def test_actions_and_events(self):
+        stream = utils.open_event_stream(timeout=5)
+        try:
+            self.assertIsNone(utils.read_event(stream))
+            service = tutum.Service.fetch(self.api.objects['service'].values()[0]['uuid'])
+            with mock.patch('tutumcli.utils.cache.apply_event'):
+                self.assertTrue(service.stop())
+                self.assertEqual('Stopped', service.state)
+                self.assertTrue(service.tutum_action_uri.startswith('/api/v1/action/'))
+                event = utils.read_event(stream)
+        finally:
+            stream.close()
+        self.assertEqual({'type': 'service', 'action': 'update', 'state': 'Stopped',
+                          'resource_uri': service.resource_uri},
+                         dict((key, event[key]) for key in ['type', 'action', 'state', 'resource_uri']))
+        self.assertEqual('Success', tutum.Utils.fetch_by_resource_uri(service.tutum_action_uri).state)
+
+    def test_create_and_update(self):
+        service = tutum.Service.create(image='tutum/redis', name='redis')
+        self.assertTrue(service.save())
+        self.assertEqual('Not running', service.state)
+        service.target_num_containers = 3
+        self.assertTrue(service.save())
+        self.assertEqual(3, self.api.objects['service'][service.uuid]['target_num_containers'])
+
+    def test_logs(self):
+        messages = []
+        service = tutum.Service.fetch(self.api.objects['service'].values()[0]['uuid'])
+        self.assertFalse(utils.stream_logs([service], 2, False, messages.append))
+        self.assertEqual(8, len(messages))
+        self.assertIn('"source": "web-0-4"', messages[-1])
+
+    def test_exec(self):
+        container = tutum.Container.fetch(self.api.objects['container'].values()[0]['uuid'])
+        output = []
+        utils.run_exec(container, ['cat'], lambda stream_type, data: output.append(data), ['line 1\n', 'line 2\n'])
+        self.assertEqual('cat\nline 1\nline 2\n', ''.join(output))
+
+        container.uuid = 'unknown'
+        self.assertRaises(tutum.TutumApiError, utils.run_exec, container, ['cat'], lambda stream_type, data: None)
+
+    def test_copy_to_container(self):
+        # the fake API echoes the input, and reads no more of it while the echo is not read
+        container = tutum.Container.fetch(self.api.objects['container'].values()[0]['uuid'])
+        create_connection = websocket.create_connection
+
+        def _create_connection(url, **options):
+            options['sockopt'] = [(socket.SOL_SOCKET, socket.SO_RCVBUF, EXEC_BUFFER_SIZE),
+                                  (socket.SOL_SOCKET, socket.SO_SNDBUF, EXEC_BUFFER_SIZE)]
+            return create_connection(url, **options)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            content = os.urandom(2 * 1024 * 1024)
+            with open(os.path.join(tmpdir, 'data.bin'), 'wb') as f:
+                f.write(content)
+            with mock.patch('tutumcli.utils.write_fd'), \
+                    mock.patch('tutumcli.utils.websocket.create_connection', side_effect=_create_connection):
+                copy = utils._Prefetch(utils.copy_to_container, container, os.path.join(tmpdir, 'data.bin'), '/tmp')
+                copy.join(60)
+                self.assertFalse(copy.is_alive())
+                copy.result()
+        finally:
+            shutil.rmtree(tmpdir)
+
+        tar = tarfile.open(fileobj=StringIO.StringIO(base64.b64decode(self.api.exec_inputs[-1])))
+        self.assertEqual(['data.bin'], tar.getnames())
+        self.assertEqual(content, tar.extractfile('data.bin').read())
+
+    def test_shared_session(self):
+        with mock.patch('tutumcli.utils._shared_session', None), \
+                mock.patch.object(tutum.api.http, 'Session', tutum.api.http.Session):
+            utils.install_shared_session()
+            list(utils.iter_list(tutum.Container))
+            list(utils.iter_list(tutum.Service))
+        self.assertEqual(1, self.api.connections)
+        self.assertEqual(4, len(self.api.requests))
+
+    def test_traffic(self):
+        list(utils.iter_list(tutum.Service))
+        self.assertGreater(self.api.bytes_received, 0)
+        self.assertGreater(self.api.bytes_sent, self.api.bytes_received)
+
+    def test_follow_logs_end(self):
+        messages = []
+        service = tutum.Service.fetch(self.api.objects['service'].values()[0]['uuid'])
+        self.api.log_follow_end = True
+        self.assertFalse(utils.stream_logs([service], None, True, messages.append))
+        self.assertEqual(40, len(messages))
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+from tutumcli.journal import *
+
+
+class EventJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_append_and_read(self):
+        journal = EventJournal(self.directory)
+        self.assertEqual(0, journal.append({'type': 'service', 'action': 'create'}))
+        self.assertEqual(1, journal.append({'type': 'service', 'action': 'update'}))
+        self.assertEqual([(0, {'type': 'service', 'action': 'create'}), (1, {'type': 'service', 'action': 'update'})],
+                         list(journal.read()))
+        self.assertEqual([(1, {'type': 'service', 'action': 'update'})], list(journal.read(1)))
+        self.assertEqual([], list(journal.read(2)))
+        journal.close()
+
+        with open(os.path.join(self.directory, 'events-%020d.ndjson' % 0)) as f:
+            self.assertEqual('{"action":"create","type":"service"}\n', f.readline())
+
+    def test_resume(self):
+        journal = EventJournal(self.directory)
+        journal.append({'n': 0})
+        journal.append({'n': 1})
+        journal.close()
+        # a line cut short by a crash
+        with open(os.path.join(self.directory, 'events-%020d.ndjson' % 0), 'a') as f:
+            f.write('{"n":')
+
+        journal = EventJournal(self.directory)
+        self.assertEqual(2, journal.next_offset)
+        self.assertEqual(2, journal.append({'n': 2}))
+        self.assertEqual([0, 1, 2], [event['n'] for _, event in journal.read()])
+        journal.close()
+
+    def test_rotate(self):
+        journal = EventJournal(self.directory, max_segment_size=20, max_segments=2)
+        for n in range(6):
+            journal.append({'n': n, 'pad': 'xxxxxxxx'})
+        self.assertEqual(['events-%020d.ndjson' % 4, 'events-%020d.ndjson' % 5], sorted(os.listdir(self.directory)))
+        self.assertEqual(4, journal.first_offset)
+        self.assertEqual([(4, 4), (5, 5)], [(offset, event['n']) for offset, event in journal.read(1)])
+        self.assertEqual([(5, 5)], [(offset, event['n']) for offset, event in journal.read(5)])
+        journal.close()
+
+    def test_state(self):
+        journal = EventJournal(self.directory)
+        self.assertEqual({}, journal.load_state())
+        journal.save_state({'service': {'/api/v1/service/1/': 'Running'}})
+        self.assertEqual({'service': {'/api/v1/service/1/': 'Running'}}, EventJournal(self.directory).load_state())
+
+    @mock.patch('tutumcli.journal.cache.get_cache_dir', return_value='/tmp/tutum-cache')
+    def test_get_journal_dir(self, mock_get_cache_dir):
+        self.assertTrue(get_journal_dir().startswith('/tmp/tutum-cache/'))
+        self.assertTrue(get_journal_dir().endswith('/events'))
@@ -1,6 +1,7 @@
 import unittest
 import copy
 import StringIO
+import subprocess
 import sys
 
 import mock
@@ -15,6 +16,7 @@ class PatchHelpOptionTestCase(unittest.TestCase):
             ['tutum'],
             ['tutum', 'service'],
             ['tutum', 'service', 'create'],
+            ['tutum', 'service', 'exec'],
             ['tutum', 'service', 'inspect'],
             ['tutum', 'service', 'logs'],
             ['tutum', 'service', 'redeploy'],
@@ -26,6 +28,7 @@ class PatchHelpOptionTestCase(unittest.TestCase):
             ['tutum', 'service', 'terminate'],
             ['tutum', 'build'],
             ['tutum', 'container'],
+            ['tutum', 'container', 'cp'],
             ['tutum', 'container', 'exec'],
             ['tutum', 'container', 'inspect'],
             ['tutum', 'container', 'logs'],
@@ -134,6 +137,26 @@ class CommandsDispatchTestCase(unittest.TestCase):
                                                  deployment_strategy=args.deployment_strategy, sync=args.sync,
                                                  net=args.net, pid=args.pid)
 
+    @mock.patch('tutumcli.tutum_cli.commands')
+    def test_event_dispatch(self, mock_cmds):
+        args = self.parser.parse_args(['event'])
+        dispatch_cmds(args)
+        mock_cmds.event.assert_called_with(None, None, None, None, None, None, None, None, None)
+
+        args = self.parser.parse_args(['event', '--type', 'container', '--type', 'service', '--state', 'Stopped',
+                                       '--resource', 'web', '--format', 'ndjson', '--socket', '/tmp/tutum.sock'])
+        dispatch_cmds(args)
+        mock_cmds.event.assert_called_with(['container', 'service'], None, ['Stopped'], ['web'], None, 'ndjson',
+                                           '/tmp/tutum.sock', None, None)
+
+        args = self.parser.parse_args(['event', '--journal', '--from', '42'])
+        dispatch_cmds(args)
+        mock_cmds.event.assert_called_with(None, None, None, None, None, None, None, '', 42)
+
+        args = self.parser.parse_args(['event', '--journal', '/tmp/journal'])
+        dispatch_cmds(args)
+        mock_cmds.event.assert_called_with(None, None, None, None, None, None, None, '/tmp/journal', None)
+
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_push_dispatch(self, mock_cmds):
         args = self.parser.parse_args(['push', 'name'])
@@ -172,9 +195,14 @@ class CommandsDispatchTestCase(unittest.TestCase):
                                                     deployment_strategy=args.deployment_strategy, sync=args.sync,
                                                     net=args.net, pid=args.pid)
 
+        args = self.parser.parse_args(['service', 'exec', '--container', 'web-1', '--container', 'web-2', 'id', '--',
+                                       'ls', '-l'])
+        dispatch_cmds(args)
+        mock_cmds.service_exec.assert_called_with('id', ['web-1', 'web-2'], ['ls', '-l'], 10)
+
         args = self.parser.parse_args(['service', 'inspect', 'id'])
         dispatch_cmds(args)
-        mock_cmds.service_inspect.assert_called_with(args.identifier)
+        mock_cmds.service_inspect.assert_called_with(args.identifier, args.format, args.parallel)
 
         args = self.parser.parse_args(['service', 'logs', 'id'])
         dispatch_cmds(args)
@@ -182,11 +210,16 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['service', 'ps'])
         dispatch_cmds(args)
-        mock_cmds.service_ps.assert_called_with(args.quiet, args.status, args.stack)
+        mock_cmds.service_ps.assert_called_with(args.quiet, args.status, args.stack, args.filter, 'table', False)
+
+        args = self.parser.parse_args(['service', 'ps', '--filter', 'name=web', '--filter', 'tag=prod'])
+        dispatch_cmds(args)
+        mock_cmds.service_ps.assert_called_with(args.quiet, args.status, args.stack, ['name=web', 'tag=prod'],
+                                                'table', False)
 
         args = self.parser.parse_args(['service', 'redeploy', 'mysql'])
         dispatch_cmds(args)
-        mock_cmds.service_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync)
+        mock_cmds.service_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync, args.parallel)
 
         args = self.parser.parse_args(['service', 'run', 'mysql'])
         dispatch_cmds(args)
@@ -206,7 +239,8 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['service', 'scale', 'id', '3'])
         dispatch_cmds(args)
-        mock_cmds.service_scale.assert_called_with(args.identifier, args.target_num_containers, args.sync)
+        mock_cmds.service_scale.assert_called_with(args.identifier, args.target_num_containers, args.sync,
+                                                   args.parallel)
 
         args = self.parser.parse_args(['service', 'set', 'id'])
         dispatch_cmds(args)
@@ -226,15 +260,15 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['service', 'start', 'id'])
         dispatch_cmds(args)
-        mock_cmds.service_start.assert_called_with(args.identifier, args.sync)
+        mock_cmds.service_start.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['service', 'stop', 'id'])
         dispatch_cmds(args)
-        mock_cmds.service_stop.assert_called_with(args.identifier, args.sync)
+        mock_cmds.service_stop.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['service', 'terminate', 'id'])
         dispatch_cmds(args)
-        mock_cmds.service_terminate.assert_called_with(args.identifier, args.sync)
+        mock_cmds.service_terminate.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['service', 'env', 'add', 'id', '--env', 'abc=abc'])
         dispatch_cmds(args)
@@ -258,17 +292,22 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['service', 'env', 'list', 'id'])
         dispatch_cmds(args)
-        mock_cmds.service_env_list.assert_called_with(args.identifier, args.quiet, args.user, args.image, args.tutum)
+        mock_cmds.service_env_list.assert_called_with(args.identifier, args.quiet, args.user, args.image, args.tutum,
+                                                      args.format)
 
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_container_dispatch(self, mock_cmds):
+        args = self.parser.parse_args(['container', 'cp', 'id:/tmp/heap.hprof', '.'])
+        dispatch_cmds(args)
+        mock_cmds.container_cp.assert_called_with('id:/tmp/heap.hprof', '.')
+
         args = self.parser.parse_args(['container', 'exec', 'id'])
         dispatch_cmds(args)
         mock_cmds.container_exec.assert_called_with(args.identifier, args.command)
 
         args = self.parser.parse_args(['container', 'inspect', 'id'])
         dispatch_cmds(args)
-        mock_cmds.container_inspect.assert_called_with(args.identifier)
+        mock_cmds.container_inspect.assert_called_with(args.identifier, args.format, args.parallel)
 
         args = self.parser.parse_args(['container', 'logs', 'id'])
         dispatch_cmds(args)
@@ -276,30 +315,42 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['container', 'ps'])
         dispatch_cmds(args)
-        mock_cmds.container_ps.assert_called_with(args.quiet, args.status, args.service, args.no_trunc)
+        mock_cmds.container_ps.assert_called_with(args.quiet, args.status, args.service, args.no_trunc, args.filter,
+                                                  'table', False)
+
+        args = self.parser.parse_args(['container', 'ps', '--watch'])
+        dispatch_cmds(args)
+        mock_cmds.container_ps.assert_called_with(args.quiet, args.status, args.service, args.no_trunc, args.filter,
+                                                  'table', True)
 
         args = self.parser.parse_args(['container', 'start', 'id'])
         dispatch_cmds(args)
-        mock_cmds.container_start.assert_called_with(args.identifier, args.sync)
+        mock_cmds.container_start.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['container', 'stop', 'id'])
         dispatch_cmds(args)
-        mock_cmds.container_stop.assert_called_with(args.identifier, args.sync)
+        mock_cmds.container_stop.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['container', 'terminate', 'id'])
         dispatch_cmds(args)
-        mock_cmds.container_terminate.assert_called_with(args.identifier, args.sync)
+        mock_cmds.container_terminate.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['container', 'redeploy', 'id'])
         dispatch_cmds(args)
-        mock_cmds.container_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync)
+        mock_cmds.container_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync,
+                                                        args.parallel)
 
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_image_dispatch(self, mock_cmds):
         args = self.parser.parse_args(['image', 'list'])
         dispatch_cmds(args)
         mock_cmds.image_list.assert_called_with(args.quiet, args.jumpstarts, args.private, args.user, args.all,
-                                                args.no_trunc)
+                                                args.no_trunc, args.filter, 'table')
+
+        args = self.parser.parse_args(['image', 'list', '--format', 'csv'])
+        dispatch_cmds(args)
+        mock_cmds.image_list.assert_called_with(args.quiet, args.jumpstarts, args.private, args.user, args.all,
+                                                args.no_trunc, args.filter, 'csv')
 
         args = self.parser.parse_args(['image', 'register', 'name'])
         dispatch_cmds(args)
@@ -325,19 +376,19 @@ class CommandsDispatchTestCase(unittest.TestCase):
     def test_node_dispatch(self, mock_cmds):
         args = self.parser.parse_args(['node', 'inspect', 'id'])
         dispatch_cmds(args)
-        mock_cmds.node_inspect.assert_called_with(args.identifier)
+        mock_cmds.node_inspect.assert_called_with(args.identifier, args.format, args.parallel)
 
         args = self.parser.parse_args(['node', 'list'])
         dispatch_cmds(args)
-        mock_cmds.node_list(args.quiet)
+        mock_cmds.node_list.assert_called_with(args.quiet, args.filter, args.format, args.watch)
 
         args = self.parser.parse_args(['node', 'rm', 'id'])
         dispatch_cmds(args)
-        mock_cmds.node_rm(args.identifier, args.sync)
+        mock_cmds.node_rm(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['node', 'upgrade', 'id'])
         dispatch_cmds(args)
-        mock_cmds.node_rm(args.identifier, args.sync)
+        mock_cmds.node_rm(args.identifier, args.sync, args.parallel)
 
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_nodecluster_dispatch(self, mock_cmds):
@@ -352,45 +403,45 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['nodecluster', 'list'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_list(args.quiet)
+        mock_cmds.nodecluster_list.assert_called_with(args.quiet, args.refresh, args.format)
 
         args = self.parser.parse_args(['nodecluster', 'provider'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_show_providers(args.quiet)
+        mock_cmds.nodecluster_show_providers.assert_called_with(args.quiet, args.refresh)
 
         args = self.parser.parse_args(['nodecluster', 'region', '-p', 'digitalocean'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_show_regions(args.provider)
+        mock_cmds.nodecluster_show_regions.assert_called_with(args.provider, args.refresh)
 
         args = self.parser.parse_args(['nodecluster', 'nodetype', '-r', 'ams1', '-p', 'digitalocean'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_show_types(args.provider, args.region)
+        mock_cmds.nodecluster_show_types.assert_called_with(args.provider, args.region, args.refresh)
 
         args = self.parser.parse_args(['nodecluster', 'rm', 'id'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_rm(args.identifier, args.sync)
+        mock_cmds.nodecluster_rm(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['nodecluster', 'scale', 'id', '3'])
         dispatch_cmds(args)
-        mock_cmds.nodecluster_scale(args.identifier, args.target_num_nodes, args.sync)
+        mock_cmds.nodecluster_scale(args.identifier, args.target_num_nodes, args.sync, args.parallel)
 
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_tag_dispatch(self, mock_cmds):
         args = self.parser.parse_args(['tag', 'add', '-t', 'abc', 'id'])
         dispatch_cmds(args)
-        mock_cmds.tag_add.assert_called_with(args.identifier, args.tag)
+        mock_cmds.tag_add.assert_called_with(args.identifier, args.tag, args.type)
 
         args = self.parser.parse_args(['tag', 'list', 'abc', 'id'])
         dispatch_cmds(args)
-        mock_cmds.tag_list.assert_called_with(args.identifier, args.quiet)
+        mock_cmds.tag_list.assert_called_with(args.identifier, args.quiet, args.type, args.format)
 
         args = self.parser.parse_args(['tag', 'rm', '-t', 'abc', 'id'])
         dispatch_cmds(args)
-        mock_cmds.tag_rm.assert_called_with(args.identifier, args.tag)
+        mock_cmds.tag_rm.assert_called_with(args.identifier, args.tag, args.type)
 
-        args = self.parser.parse_args(['tag', 'set', '-t', 'abc', 'id'])
+        args = self.parser.parse_args(['tag', 'set', '-t', 'abc', '--type', 'node', 'id'])
         dispatch_cmds(args)
-        mock_cmds.tag_set.assert_called_with(args.identifier, args.tag)
+        mock_cmds.tag_set.assert_called_with(args.identifier, args.tag, 'node')
 
     @mock.patch('tutumcli.tutum_cli.commands')
     def test_stack_dispatch(self, mock_cmds):
@@ -400,27 +451,27 @@ class CommandsDispatchTestCase(unittest.TestCase):
 
         args = self.parser.parse_args(['stack', 'inspect', 'id'])
         dispatch_cmds(args)
-        mock_cmds.stack_inspect.assert_called_with(args.identifier)
+        mock_cmds.stack_inspect.assert_called_with(args.identifier, args.format, args.parallel)
 
         args = self.parser.parse_args(['stack', 'list'])
         dispatch_cmds(args)
-        mock_cmds.stack_list.assert_called_with(args.quiet)
+        mock_cmds.stack_list.assert_called_with(args.quiet, args.format)
 
         args = self.parser.parse_args(['stack', 'redeploy', 'id'])
         dispatch_cmds(args)
-        mock_cmds.stack_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync)
+        mock_cmds.stack_redeploy.assert_called_with(args.identifier, args.not_reuse_volumes, args.sync, args.parallel)
 
         args = self.parser.parse_args(['stack', 'start', 'id'])
         dispatch_cmds(args)
-        mock_cmds.stack_start.assert_called_with(args.identifier, args.sync)
+        mock_cmds.stack_start.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['stack', 'stop', 'id'])
         dispatch_cmds(args)
-        mock_cmds.stack_stop.assert_called_with(args.identifier, args.sync)
+        mock_cmds.stack_stop.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['stack', 'terminate', 'id'])
         dispatch_cmds(args)
-        mock_cmds.stack_terminate.assert_called_with(args.identifier, args.sync)
+        mock_cmds.stack_terminate.assert_called_with(args.identifier, args.sync, args.parallel)
 
         args = self.parser.parse_args(['stack', 'up'])
         dispatch_cmds(args)
@@ -459,3 +510,11 @@ class ParserTestCase(unittest.TestCase):
     def test_tutum_version(self, mock_exit, mock_add_arg):
         initialize_parser()
         mock_add_arg.assert_any_call('-v', '--version', action='version', version='%(prog)s ' + tutumcli.__version__)
+
+
+class StartupImportsTestCase(unittest.TestCase):
+    def test_heavy_dependencies_are_not_imported_at_startup(self):
+        code = "import sys, tutumcli.tutum_cli; print(' '.join(sys.modules))"
+        modules = subprocess.check_output([sys.executable, '-c', code]).split()
+        for module in ['docker', 'yaml', 'tabulate', 'ago', 'dateutil']:
+            self.assertNotIn(module, modules)
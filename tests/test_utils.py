@@ -1,6 +1,18 @@
 # -*- coding: utf-8 -*-
+import base64
+import codecs
+import collections
 import unittest
 import __builtin__
+import BaseHTTPServer
+import SocketServer
+import StringIO
+import shutil
+import socket
+import tarfile
+import tempfile
+import threading
+import time
 
 import mock
 import tutumcli
@@ -77,6 +89,340 @@ class GetDockerClientTestCase(unittest.TestCase):
         self.assertRaises(DockerNotFound, get_docker_client)
 
 
+class GetResourceUriMapTestCase(unittest.TestCase):
+    @mock.patch('tutumcli.utils.tutum.NodeCluster.list')
+    def test_get_resource_uri_map(self, mock_list):
+        cluster1 = tutum.NodeCluster()
+        cluster1.resource_uri = '/api/v1/nodecluster/1/'
+        cluster1.name = 'cluster1'
+        cluster1.uuid = '1'
+        cluster2 = tutum.NodeCluster()
+        cluster2.resource_uri = '/api/v1/nodecluster/2/'
+        cluster2.name = 'cluster2'
+        cluster2.uuid = '2'
+        mock_list.return_value = [cluster1, cluster2]
+
+        self.assertEqual({'/api/v1/nodecluster/1/': 'cluster1', '/api/v1/nodecluster/2/': 'cluster2'},
+                         get_resource_uri_map(tutum.NodeCluster))
+        self.assertEqual({'/api/v1/nodecluster/1/': '1', '/api/v1/nodecluster/2/': '2'},
+                         get_resource_uri_map(tutum.NodeCluster, "uuid", state="Deployed"))
+        mock_list.assert_called_with(state="Deployed")
+
+
+    @mock.patch('tutumcli.utils.get_resource_uri_map')
+    def test_lazy_resource_uri_map(self, mock_get_resource_uri_map):
+        fetched = threading.Event()
+
+        def _get_resource_uri_map(model, attribute):
+            fetched.wait(5)
+            return {'/api/v1/nodecluster/1/': 'cluster1'}
+
+        mock_get_resource_uri_map.side_effect = _get_resource_uri_map
+        resource_uri_map = LazyResourceUriMap(tutum.NodeCluster)
+        self.assertIsNone(resource_uri_map.get(None))
+        fetched.set()
+        self.assertEqual('cluster1', resource_uri_map.get('/api/v1/nodecluster/1/'))
+        self.assertIsNone(resource_uri_map.get('/api/v1/nodecluster/2/'))
+        mock_get_resource_uri_map.assert_called_once_with(tutum.NodeCluster, 'name')
+
+
+class FiltersTestCase(unittest.TestCase):
+    def test_parse_filters(self):
+        self.assertEqual([], parse_filters(None))
+        self.assertEqual([('state', 'Running'), ('tags', 'prod'), ('name__startswith', 'web')],
+                         parse_filters(['status=Running', 'tag=prod', 'name__startswith=web']))
+        self.assertEqual([('description', 'a=b')], parse_filters(['description=a=b']))
+        self.assertRaises(BadParameter, parse_filters, ['state'])
+        self.assertRaises(BadParameter, parse_filters, ['=Running'])
+
+    def test_match_filters(self):
+        attributes = {'name': 'web-1', 'state': 'Running', 'in_use': True,
+                      'tags': [{'name': 'prod'}, {'name': 'eu'}],
+                      'node': '/api/v1/node/19303d01-3564-437b-ac54-e7f8d17003f6/'}
+        self.assertTrue(match_filters(attributes, []))
+        self.assertTrue(match_filters(attributes, [('state', 'running'), ('in_use', 'true')]))
+        self.assertTrue(match_filters(attributes, [('name__startswith', 'web')]))
+        self.assertTrue(match_filters(attributes, [('tags', 'eu')]))
+        self.assertTrue(match_filters(attributes, [('node', '19303d01')]))
+        self.assertFalse(match_filters(attributes, [('state', 'Running'), ('tags', 'staging')]))
+        self.assertFalse(match_filters(attributes, [('name', 'web')]))
+        self.assertFalse(match_filters(attributes, [('unknown', 'value')]))
+
+
+class IterListTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pages = [
+            {'meta': {'limit': 2, 'offset': 0, 'next': '/api/v1/service/?limit=2&offset=2'},
+             'objects': [{'uuid': '1', 'name': 'web', 'state': 'Running', 'resource_uri': '/api/v1/service/1/',
+                          'tags': [{'name': 'prod'}], 'containers': ['/api/v1/container/a/']},
+                         {'uuid': '2', 'name': 'db', 'state': 'Running', 'resource_uri': '/api/v1/service/2/',
+                          'tags': [], 'containers': ['/api/v1/container/b/']}]},
+            {'meta': {'limit': 2, 'offset': 2, 'next': None},
+             'objects': [{'uuid': '3', 'name': 'cache', 'state': 'Running', 'resource_uri': '/api/v1/service/3/',
+                          'tags': [{'name': 'prod'}], 'containers': []}]}]
+
+    def send_request(self, method, path, params=None):
+        self.requests.append((method, path, dict(params)))
+        return self.pages[len(self.requests) - 1]
+
+    @mock.patch('tutumcli.utils.tutum.api.http.send_request')
+    def test_iter_list_paginates(self, mock_send_request):
+        self.requests = []
+        mock_send_request.side_effect = self.send_request
+
+        services = list(iter_list(tutum.Service, state='Running', stack=None))
+
+        self.assertEqual(['1', '2', '3'], [service.uuid for service in services])
+        self.assertIsInstance(services[0], tutum.Service)
+        self.assertEqual([('GET', '/service', {'state': 'Running'}),
+                          ('GET', '/service', {'state': 'Running', 'offset': 2, 'limit': 2})], self.requests)
+
+    @mock.patch('tutumcli.utils.tutum.api.http.send_request')
+    def test_iter_list_filters_and_projects(self, mock_send_request):
+        self.requests = []
+        mock_send_request.side_effect = self.send_request
+
+        services = list(iter_list(tutum.Service, fields=['name'],
+                                  filters=[('uuid__startswith', '3'), ('tags', 'prod'), ('name__startswith', 'ca')]))
+
+        self.assertEqual(1, len(services))
+        self.assertEqual({'uuid': '3', 'name': 'cache', 'resource_uri': '/api/v1/service/3/'},
+                         services[0].get_all_attributes())
+        self.assertEqual({'uuid__startswith': '3'}, self.requests[0][2])
+
+    @mock.patch('tutumcli.utils.tutum.api.http.send_request')
+    def test_iter_list_pushes_down_filters_with_the_same_comparison(self, mock_send_request):
+        self.requests = []
+        mock_send_request.side_effect = self.send_request
+
+        services = list(iter_list(tutum.Service, filters=[('state', 'running'), ('name', 'CACHE')]))
+        self.assertEqual(['3'], [service.uuid for service in services])
+        self.assertEqual({'state': 'Running'}, self.requests[0][2])
+
+        self.requests = []
+        self.assertEqual([], list(iter_list(tutum.Service, filters=[('state', 'sleeping')])))
+        self.assertEqual({}, self.requests[0][2])
+
+    @mock.patch('tutumcli.utils.tutum.api.http.send_request')
+    def test_iter_list_prefetch(self, mock_send_request):
+        self.requests = []
+        mock_send_request.side_effect = self.send_request
+
+        services = iter_list(tutum.Service, prefetch=True)
+        self.assertEqual('1', next(services).uuid)
+        time.sleep(0.1)
+        # the second page is requested before the first one has been consumed
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual(['2', '3'], [service.uuid for service in services])
+
+    @mock.patch('tutumcli.utils.tutum.api.http.send_request')
+    def test_iter_list_prefetch_error(self, mock_send_request):
+        mock_send_request.side_effect = [self.pages[0], tutum.TutumApiError('error')]
+
+        services = iter_list(tutum.Service, prefetch=True)
+        self.assertEqual(['1', '2'], [next(services).uuid, next(services).uuid])
+        self.assertRaises(tutum.TutumApiError, next, services)
+
+
+class ListWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.buf = StringIO.StringIO()
+        self.headers = ['NAME', 'STATUS', 'PORTS']
+        self.keys = ['name', 'state', 'ports']
+
+    def write_rows(self, writer):
+        writer.write(['web', u'\u25b6 Running', '80/tcp, 443/tcp'],
+                     {'ports': ['80/tcp', '443/tcp'], 'state': 'Running', 'name': 'web', 'uuid': '1'})
+        writer.write(['db, "master"', u'\u25fc Stopped', ''], {'name': 'db, "master"', 'state': 'Stopped'})
+
+    @mock.patch('tutumcli.utils.tabulate_result')
+    def test_table(self, mock_tabulate_result):
+        writer = ListWriter(self.headers, self.keys, stream=self.buf)
+        self.write_rows(writer)
+        self.assertFalse(mock_tabulate_result.called)
+        writer.close()
+        mock_tabulate_result.assert_called_with([['web', u'\u25b6 Running', '80/tcp, 443/tcp'],
+                                                 ['db, "master"', u'\u25fc Stopped', '']], self.headers)
+
+    def test_fixed(self):
+        writer = ListWriter(['NAME', 'STATUS', 'NODE'], ['name', 'state', 'node'], 'fixed', [6, 10], stream=self.buf)
+        writer.write(['web', 'Running', None], {})
+        writer.write(['database', 'Stopped', 'node1'], {})
+        self.assertEqual('NAME    STATUS      NODE\nweb     Running\ndatabase  Stopped     node1\n',
+                         self.buf.getvalue())
+
+    def test_json(self):
+        writer = ListWriter(self.headers, self.keys, 'json', stream=self.buf)
+        self.write_rows(writer)
+        writer.close()
+        self.assertEqual([{'name': 'web', 'state': 'Running', 'ports': ['80/tcp', '443/tcp']},
+                          {'name': 'db, "master"', 'state': 'Stopped', 'ports': None}],
+                         json.loads(self.buf.getvalue()))
+        self.assertTrue(self.buf.getvalue().startswith('[\n  {"name": "web", "state": "Running", "ports"'))
+
+    def test_json_empty(self):
+        ListWriter(self.headers, self.keys, 'json', stream=self.buf).close()
+        self.assertEqual('[]\n', self.buf.getvalue())
+
+    def test_ndjson(self):
+        writer = ListWriter(self.headers, self.keys, 'ndjson', stream=self.buf)
+        self.write_rows(writer)
+        writer.close()
+        self.assertEqual(['{"name": "web", "state": "Running", "ports": ["80/tcp", "443/tcp"]}',
+                          '{"name": "db, \\"master\\"", "state": "Stopped", "ports": null}'],
+                         self.buf.getvalue().splitlines())
+
+    def test_csv(self):
+        writer = ListWriter(self.headers, self.keys, 'csv', stream=self.buf)
+        self.write_rows(writer)
+        writer.close()
+        self.assertEqual('name,state,ports\nweb,Running,"[""80/tcp"", ""443/tcp""]"\n"db, ""master""",Stopped,\n',
+                         self.buf.getvalue())
+
+    def test_tsv(self):
+        writer = ListWriter(self.headers, self.keys, 'tsv', stream=self.buf)
+        self.write_rows(writer)
+        writer.close()
+        self.assertEqual('name\tstate\tports\nweb\tRunning\t"[""80/tcp"", ""443/tcp""]"\n'
+                         '"db, ""master"""\tStopped\t\n', self.buf.getvalue())
+
+    def test_csv_non_ascii(self):
+        # as set up by tutum_cli
+        writer = ListWriter(self.headers, self.keys, 'csv', stream=codecs.getwriter('utf8')(self.buf))
+        writer.write([u'caf\xe9', '', ''], {'name': u'caf\xe9', 'state': 'Running', 'ports': [u'\u25b6']})
+        writer.close()
+        self.assertEqual('name,state,ports\ncaf\xc3\xa9,Running,"[""\\u25b6""]"\n', self.buf.getvalue())
+
+    def test_unknown_format(self):
+        self.assertRaises(BadParameter, ListWriter, self.headers, self.keys, 'xml')
+
+
+class InspectObjectsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout, self.stderr = sys.stdout, sys.stderr
+        sys.stdout = self.buf = StringIO.StringIO()
+        sys.stderr = self.err = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+
+    def fetch(self, identifier):
+        if identifier == 'unknown':
+            raise ObjectNotFound("Cannot find a service with the identifier '%s'" % identifier)
+        time.sleep(0.01 * (3 - len(identifier)))
+        service = tutum.Service()
+        service._loaddict({'uuid': identifier, 'name': 'service-%s' % identifier})
+        return service
+
+    def test_inspect_objects(self):
+        self.assertFalse(inspect_objects(self.fetch, ['a', 'bb'], None, 2))
+        self.assertEqual(''.join(json.dumps(attributes, indent=2) + '\n' for attributes in
+                                 [{'uuid': 'a', 'name': 'service-a'}, {'uuid': 'bb', 'name': 'service-bb'}]),
+                         self.buf.getvalue())
+
+    def test_inspect_objects_json(self):
+        self.assertTrue(inspect_objects(self.fetch, ['a', 'unknown', 'bb'], 'json', 3))
+        self.assertEqual([{'uuid': 'a', 'name': 'service-a'}, {'uuid': 'bb', 'name': 'service-bb'}],
+                         json.loads(self.buf.getvalue()))
+        self.assertEqual("Cannot find a service with the identifier 'unknown'\n", self.err.getvalue())
+
+    def test_inspect_objects_json_empty(self):
+        self.assertTrue(inspect_objects(self.fetch, ['unknown'], 'json', 1))
+        self.assertEqual([], json.loads(self.buf.getvalue()))
+
+    def test_inspect_objects_ndjson(self):
+        self.assertFalse(inspect_objects(self.fetch, ['bb', 'a'], 'ndjson', 2))
+        self.assertEqual([{'uuid': 'bb', 'name': 'service-bb'}, {'uuid': 'a', 'name': 'service-a'}],
+                         [json.loads(line) for line in self.buf.getvalue().splitlines()])
+
+
+class IterConcurrentlyTestCase(unittest.TestCase):
+    def test_iter_concurrently(self):
+        def func(item):
+            time.sleep(0.01 * (5 - item))
+            if item == 3:
+                raise ObjectNotFound(item)
+            return item * 2
+
+        results = list(iter_concurrently(func, range(5), 5))
+        self.assertEqual([0, 1, 2, 3, 4], [item for item, result, exception in results])
+        self.assertEqual([0, 2, 4, None, 8], [result for item, result, exception in results])
+        self.assertIsInstance(results[3][2], ObjectNotFound)
+
+    def test_iter_concurrently_bounded(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def func(item):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        list(iter_concurrently(func, range(10), 3))
+        self.assertLessEqual(max_running[0], 3)
+
+
+    def test_iter_concurrently_base_exception(self):
+        def func(item):
+            if item == 2:
+                sys.exit(1)
+            return item
+
+        results = iter_concurrently(func, range(5), 1)
+        self.assertEqual((0, 0, None), next(results))
+        self.assertEqual((1, 1, None), next(results))
+        self.assertRaises(SystemExit, next, results)
+
+
+class RunForEachTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        sys.stdout = self.out = StringIO.StringIO()
+        sys.stderr = self.err = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+    @staticmethod
+    def func(identifier):
+        time.sleep(0.01 * (5 - int(identifier)))
+        sys.stdout.write("start %s\n" % identifier)
+        if identifier == "2":
+            raise ObjectNotFound("cannot find %s" % identifier)
+        sys.stdout.write("done %s\n" % identifier)
+
+    def test_run_for_each_sequential(self):
+        self.assertTrue(run_for_each(self.func, ["1", "2", "3"], 1))
+        self.assertEqual("start 1\ndone 1\nstart 2\nstart 3\ndone 3\n", self.out.getvalue())
+        self.assertEqual("cannot find 2\n", self.err.getvalue())
+
+    def test_run_for_each_parallel(self):
+        self.assertTrue(run_for_each(self.func, ["1", "2", "3", "4"], 4))
+        self.assertEqual("start 1\ndone 1\nstart 2\nstart 3\ndone 3\nstart 4\ndone 4\n", self.out.getvalue())
+        self.assertEqual("cannot find 2\n", self.err.getvalue())
+        self.assertIs(self.out, sys.stdout)
+        self.assertIs(self.err, sys.stderr)
+
+    def test_run_for_each_parallel_without_exception(self):
+        self.assertFalse(run_for_each(self.func, ["1", "3"], 2))
+        self.assertEqual("start 1\ndone 1\nstart 3\ndone 3\n", self.out.getvalue())
+
+    def test_map_for_each(self):
+        def func(identifier):
+            self.func(identifier)
+            return "value %s" % identifier
+
+        # the later identifiers finish first
+        self.assertEqual((["value 1", "value 3", "value 4"], True), map_for_each(func, ["1", "2", "3", "4"], 4))
+        self.assertEqual((["value 1", "value 3"], True), map_for_each(func, ["1", "2", "3"], 1))
+
+
 class ParseLinksTestCase(unittest.TestCase):
     def test_parse_links(self):
         output = [{'to_service': 'mysql', 'name': 'db1'}, {'to_service': 'mariadb', 'name': 'db2'}]
@@ -123,3 +469,1036 @@ class ParseEnvironmentVariablesTestCase(unittest.TestCase):
     def test_parse_envvars(self):
         output = [{'key': 'MYSQL_PASS', 'value': 'mypass'}, {'key': 'MYSQL_USER', 'value': 'admin'}]
         self.assertEqual(output, parse_envvars(['MYSQL_USER=admin', 'MYSQL_PASS=mypass'], []))
+
+
+class SyncActionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = self.buf = StringIO.StringIO()
+        self.obj = tutum.Service()
+        self.obj.tutum_action_uri = '/api/v1/action/7eaf7fff/'
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    def _action(self, state):
+        action = tutum.Action()
+        action.state = state
+        return action
+
+    def _stream(self, *messages):
+        stream = mock.MagicMock()
+        stream.recv.side_effect = list(messages)
+        return stream
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_with_events(self, mock_fetch, mock_open):
+        mock_fetch.return_value = self._action('Pending')
+        mock_open.return_value = self._stream(
+            json.dumps({'type': 'auth'}),
+            json.dumps({'type': 'action', 'state': 'In progress', 'resource_uri': '/api/v1/action/other/'}),
+            json.dumps({'type': 'action', 'state': 'In progress', 'resource_uri': '/api/v1/action/7eaf7fff/'}),
+            json.dumps({'type': 'service', 'state': 'Running', 'resource_uri': '/api/v1/service/7eaf7fff/'}),
+            json.dumps({'type': 'action', 'state': 'Success', 'resource_uri': '/api/v1/action/7eaf7fff/'}))
+
+        sync_action(self.obj, True)
+
+        self.assertEqual('Pending\nIn progress\nSuccess\n', self.buf.getvalue())
+        self.assertEqual(1, mock_fetch.call_count)
+        mock_open.return_value.close.assert_called_with()
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_already_finished(self, mock_fetch, mock_open):
+        mock_fetch.return_value = self._action('Failed')
+        mock_open.return_value = self._stream()
+
+        sync_action(self.obj, True)
+
+        self.assertEqual('Failed\n', self.buf.getvalue())
+        self.assertFalse(mock_open.return_value.recv.called)
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_with_events_timeout(self, mock_fetch, mock_open):
+        mock_fetch.return_value = self._action('In progress')
+        mock_open.return_value = self._stream(
+            websocket.WebSocketTimeoutException(),
+            json.dumps({'type': 'action', 'state': 'Success', 'resource_uri': '/api/v1/action/7eaf7fff/'}))
+
+        sync_action(self.obj, True)
+
+        self.assertEqual('In progress.\nSuccess\n', self.buf.getvalue())
+
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream', side_effect=websocket.WebSocketException())
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_fallback_to_polling(self, mock_fetch, mock_open, mock_sleep):
+        mock_fetch.side_effect = [self._action('Pending'), self._action('Pending'), self._action('In progress'),
+                                  self._action('Success')]
+
+        sync_action(self.obj, True)
+
+        self.assertEqual('Pending.\nIn progress\nSuccess\n', self.buf.getvalue())
+        self.assertEqual([mock.call(SYNC_POLLING_MIN_INTERVAL), mock.call(SYNC_POLLING_MIN_INTERVAL * 2),
+                          mock.call(SYNC_POLLING_MIN_INTERVAL * 4)], mock_sleep.call_args_list)
+
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_stream_interrupted(self, mock_fetch, mock_open, mock_sleep):
+        mock_fetch.side_effect = [self._action('Pending'), self._action('Success')]
+        mock_open.return_value = self._stream(websocket.WebSocketConnectionClosedException())
+
+        sync_action(self.obj, True)
+
+        self.assertEqual('Pending\nSuccess\n', self.buf.getvalue())
+
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_api_error(self, mock_fetch, mock_open, mock_sleep):
+        mock_fetch.side_effect = [tutum.TutumApiError('Status 502'), self._action('In progress'),
+                                  self._action('Success')]
+        mock_open.return_value = self._stream()
+
+        with mock.patch('sys.stderr', new_callable=StringIO.StringIO) as stderr:
+            sync_action(self.obj, True)
+
+        self.assertEqual('Status 502\n', stderr.getvalue())
+        self.assertEqual('In progress\nSuccess\n', self.buf.getvalue())
+        mock_open.return_value.close.assert_called_with()
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_action_not_authorized(self, mock_fetch, mock_open):
+        mock_fetch.return_value = self._action('Pending')
+        mock_open.return_value = self._stream(json.dumps({'type': 'error', 'data': {'errorMessage': 'UNAUTHORIZED'}}))
+
+        with mock.patch('sys.stderr', new_callable=StringIO.StringIO) as stderr:
+            sync_action(self.obj, True)
+
+        self.assertEqual('Not authorized\n', stderr.getvalue())
+        self.assertEqual(1, mock_fetch.call_count)
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    def test_sync_action_without_sync(self, mock_open):
+        sync_action(self.obj, False)
+        self.assertFalse(mock_open.called)
+        self.assertEqual('', self.buf.getvalue())
+
+
+class SyncActionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = self.buf = StringIO.StringIO()
+        self.objs = []
+        for name in ['a', 'b', 'c']:
+            obj = tutum.Service()
+            obj.uuid = 'service-%s' % name
+            obj.tutum_action_uri = '/api/v1/action/action-%s/' % name
+            self.objs.append(obj)
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    def _fetch(self, states):
+        def fetch_by_resource_uri(action_uri):
+            action = tutum.Action()
+            action.state = states[action_uri].pop(0)
+            return action
+
+        return fetch_by_resource_uri
+
+    def _event(self, name, state):
+        return json.dumps({'type': 'action', 'state': state, 'resource_uri': '/api/v1/action/action-%s/' % name})
+
+    @mock.patch('tutumcli.utils.tabulate_result')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_actions_with_events(self, mock_fetch, mock_open, mock_tabulate_result):
+        mock_fetch.side_effect = self._fetch({'/api/v1/action/action-a/': ['Success'],
+                                              '/api/v1/action/action-b/': ['Pending'],
+                                              '/api/v1/action/action-c/': ['In progress']})
+        mock_open.return_value.recv.side_effect = [self._event('b', 'In progress'), self._event('c', 'Failed'),
+                                                   self._event('b', 'Success')]
+
+        sync_actions(self.objs, True)
+
+        self.assertEqual(3, mock_fetch.call_count)
+        self.assertEqual('Waiting for 3 actions: 1 In progress, 1 Pending, 1 Success\n'
+                         'Waiting for 3 actions: 2 In progress, 1 Success\n'
+                         'Waiting for 3 actions: 1 Failed, 1 In progress, 1 Success\n'
+                         'Waiting for 3 actions: 1 Failed, 2 Success\n', self.buf.getvalue())
+        mock_tabulate_result.assert_called_with(
+            [['action-a', 'service-a', add_unicode_symbol_to_state('Success')],
+             ['action-b', 'service-b', add_unicode_symbol_to_state('Success')],
+             ['action-c', 'service-c', add_unicode_symbol_to_state('Failed')]],
+            ['ACTION', 'RESOURCE', 'STATE'])
+
+    @mock.patch('tutumcli.utils.tabulate_result')
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream', side_effect=websocket.WebSocketException())
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_actions_fallback_to_polling(self, mock_fetch, mock_open, mock_sleep, mock_tabulate_result):
+        mock_fetch.side_effect = self._fetch({'/api/v1/action/action-a/': ['In progress', 'Success'],
+                                              '/api/v1/action/action-b/': ['Success'],
+                                              '/api/v1/action/action-c/': ['Pending', 'Pending', 'Success']})
+
+        sync_actions(self.objs, True)
+
+        self.assertEqual(6, mock_fetch.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertEqual('Waiting for 3 actions: 1 In progress, 1 Pending, 1 Success\n'
+                         'Waiting for 3 actions: 1 Pending, 2 Success\n'
+                         'Waiting for 3 actions: 3 Success\n', self.buf.getvalue())
+        self.assertTrue(mock_tabulate_result.called)
+
+    @mock.patch('tutumcli.utils.tabulate_result')
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    def test_sync_actions_stream_error(self, mock_fetch, mock_open, mock_sleep, mock_tabulate_result):
+        mock_fetch.side_effect = self._fetch({'/api/v1/action/action-a/': ['Success'],
+                                              '/api/v1/action/action-b/': ['Pending', 'Success'],
+                                              '/api/v1/action/action-c/': ['Success']})
+        mock_open.return_value.recv.side_effect = [socket.error(104, 'Connection reset by peer')]
+
+        with mock.patch('sys.stderr', new_callable=StringIO.StringIO) as stderr:
+            sync_actions(self.objs, True)
+
+        self.assertEqual('[Errno 104] Connection reset by peer\n', stderr.getvalue())
+        self.assertEqual(4, mock_fetch.call_count)
+        mock_tabulate_result.assert_called_with(
+            [['action-a', 'service-a', add_unicode_symbol_to_state('Success')],
+             ['action-b', 'service-b', add_unicode_symbol_to_state('Success')],
+             ['action-c', 'service-c', add_unicode_symbol_to_state('Success')]],
+            ['ACTION', 'RESOURCE', 'STATE'])
+
+    @mock.patch('tutumcli.utils.sync_action')
+    def test_sync_actions_single_action(self, mock_sync_action):
+        self.objs[1].tutum_action_uri = ''
+        self.objs[2].tutum_action_uri = ''
+        sync_actions(self.objs, True)
+        mock_sync_action.assert_called_with(self.objs[0], True)
+
+    @mock.patch('tutumcli.utils.open_event_stream')
+    def test_sync_actions_without_sync(self, mock_open):
+        sync_actions(self.objs, False)
+        self.assertFalse(mock_open.called)
+        self.assertEqual('', self.buf.getvalue())
+
+
+class FetchRemoteTestCase(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
+        self.service = tutum.Service()
+        self.service.uuid = '7a4cfe51-03bb-42d6-825e-3b533888d8cd'
+        self.service.name = 'web'
+        self.service.resource_uri = '/api/v1/service/7a4cfe51-03bb-42d6-825e-3b533888d8cd/'
+
+    def tearDown(self):
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
+
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_remote_service')
+    def test_fetch_remote_service_from_index(self, mock_fetch_remote_service, mock_fetch_by_resource_uri):
+        tutumcli.cache.index_objects('service', [self.service], complete=True)
+        mock_fetch_by_resource_uri.return_value = self.service
+
+        self.assertEqual(self.service, fetch_remote_service('web'))
+        mock_fetch_by_resource_uri.assert_called_with(self.service.resource_uri)
+        self.assertFalse(mock_fetch_remote_service.called)
+
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_remote_service')
+    def test_fetch_remote_service_stale_index(self, mock_fetch_remote_service, mock_fetch_by_resource_uri):
+        tutumcli.cache.index_objects('service', [self.service], complete=True)
+        renamed = tutum.Service()
+        renamed.uuid = self.service.uuid
+        renamed.name = 'api'
+        mock_fetch_by_resource_uri.return_value = renamed
+        mock_fetch_remote_service.side_effect = ObjectNotFound("Cannot find a service with the identifier 'web'")
+
+        self.assertRaises(ObjectNotFound, fetch_remote_service, 'web')
+        mock_fetch_remote_service.assert_called_with('web', raise_exceptions=True)
+        self.assertIsNone(tutumcli.cache.lookup_identifier('service', 'web'))
+
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_by_resource_uri')
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_remote_service')
+    def test_fetch_remote_service_not_indexed(self, mock_fetch_remote_service, mock_fetch_by_resource_uri):
+        mock_fetch_remote_service.return_value = self.service
+
+        self.assertEqual(self.service, fetch_remote_service('web'))
+        self.assertFalse(mock_fetch_by_resource_uri.called)
+        self.assertEqual([self.service.resource_uri], tutumcli.cache._load_index('service')['entries'].keys())
+
+    @mock.patch('tutumcli.utils.tutum.Utils.fetch_remote_service')
+    def test_fetch_remote_service_without_exceptions(self, mock_fetch_remote_service):
+        error = ObjectNotFound("Cannot find a service with the identifier 'web'")
+        mock_fetch_remote_service.return_value = error
+
+        self.assertEqual(error, fetch_remote_service('web', raise_exceptions=False))
+
+
+class FetchRemoteTaggableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.service = tutum.Service()
+        self.nodecluster = tutum.NodeCluster()
+        self.node = tutum.Node()
+        self.not_found = ObjectNotFound("not found")
+
+    @mock.patch('tutumcli.utils.fetch_remote_node')
+    @mock.patch('tutumcli.utils.fetch_remote_nodecluster')
+    @mock.patch('tutumcli.utils.fetch_remote_service')
+    def test_fetch_remote_taggable_priority(self, mock_service, mock_nodecluster, mock_node):
+        mock_service.return_value = self.service
+        mock_nodecluster.return_value = self.nodecluster
+        mock_node.return_value = self.node
+        self.assertEqual((self.service, 'Service'), fetch_remote_taggable('abc'))
+
+        mock_service.return_value = self.not_found
+        self.assertEqual((self.nodecluster, 'NodeCluster'), fetch_remote_taggable('abc'))
+
+        mock_nodecluster.side_effect = self.not_found
+        self.assertEqual((self.node, 'Node'), fetch_remote_taggable('abc'))
+        mock_node.assert_called_with('abc', raise_exceptions=False)
+
+    @mock.patch('tutumcli.utils.fetch_remote_node')
+    @mock.patch('tutumcli.utils.fetch_remote_nodecluster')
+    @mock.patch('tutumcli.utils.fetch_remote_service')
+    def test_fetch_remote_taggable_errors(self, mock_service, mock_nodecluster, mock_node):
+        mock_service.return_value = self.not_found
+        mock_nodecluster.return_value = tutum.NonUniqueIdentifier("More than one nodecluster has the same identifier")
+        mock_node.return_value = self.node
+        self.assertRaises(tutum.NonUniqueIdentifier, fetch_remote_taggable, 'abc')
+
+        mock_nodecluster.return_value = self.not_found
+        mock_node.return_value = self.not_found
+        self.assertRaisesRegexp(ObjectNotFound, "Identifier 'abc' does not match any service, node or nodecluster",
+                                fetch_remote_taggable, 'abc')
+
+    @mock.patch('tutumcli.utils.fetch_remote_node')
+    @mock.patch('tutumcli.utils.fetch_remote_nodecluster')
+    @mock.patch('tutumcli.utils.fetch_remote_service')
+    def test_fetch_remote_taggable_with_type(self, mock_service, mock_nodecluster, mock_node):
+        mock_node.return_value = self.node
+        self.assertEqual((self.node, 'Node'), fetch_remote_taggable('abc', 'node'))
+        self.assertFalse(mock_service.called)
+        self.assertFalse(mock_nodecluster.called)
+
+        mock_node.return_value = self.not_found
+        self.assertRaisesRegexp(ObjectNotFound, "Identifier 'abc' does not match any node",
+                                fetch_remote_taggable, 'abc', 'node')
+
+
+class SharedSessionTestCase(unittest.TestCase):
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = json.dumps({'path': self.path})
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    def setUp(self):
+        self.server = SocketServer.ThreadingTCPServer(('127.0.0.1', 0), self.Handler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @mock.patch('tutumcli.utils._shared_session', None)
+    @mock.patch.object(tutum.api.http, 'Session')
+    def test_install_shared_session(self, mock_session):
+        install_shared_session()
+        self.assertIs(get_shared_session(), tutum.api.http.Session())
+        self.assertIs(tutum.api.http.Session(), tutum.api.http.Session())
+
+        with mock.patch.object(tutum, 'base_url', 'http://127.0.0.1:%d/api/v1/' % self.server.server_address[1]):
+            for path in ['service', 'container', 'node']:
+                self.assertEqual({'path': '/api/v1/%s/' % path, 'tutum_action_uri': ''},
+                                 tutum.api.http.send_request('GET', path))
+        self.assertEqual((1, 3), get_connection_stats())
+
+
+class WatchTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = self.buf = StringIO.StringIO()
+        self.headers = ['NAME', 'STATUS']
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(tutumcli.cache.get_cache_dir(), ignore_errors=True)
+
+    def test_table_screen_terminal(self):
+        self.buf.isatty = lambda: True
+        screen = tutumcli.utils._TableScreen(self.buf)
+        screen.draw(['a', 'b', 'c'])
+        self.assertEqual('a\nb\nc\n', self.buf.getvalue())
+
+        self.buf.truncate(0)
+        screen.draw(['a', 'B', 'c'])
+        self.assertEqual('\x1b[3A\x1b[1B\r\x1b[KB\n\x1b[1B', self.buf.getvalue())
+
+        self.buf.truncate(0)
+        screen.draw(['a', 'B', 'c'])
+        screen.draw(['a', 'B', 'c', 'd'])
+        self.assertEqual('\x1b[3A\x1b[1B\x1b[1B\x1b[1B\r\x1b[Kd\n', self.buf.getvalue())
+
+        self.buf.truncate(0)
+        screen.draw(['A'])
+        self.assertEqual('\x1b[4A\r\x1b[KA\n\x1b[J', self.buf.getvalue())
+
+    def test_table_screen_not_terminal(self):
+        screen = tutumcli.utils._TableScreen(self.buf)
+        screen.draw(['a', 'b'])
+        screen.draw(['a', 'b'])
+        screen.draw(['a', 'c'])
+        self.assertEqual('a\nb\n\na\nc\n', self.buf.getvalue())
+
+    def _event(self, resource_type, resource_uri, action='update'):
+        return json.dumps({'type': resource_type, 'action': action, 'resource_uri': resource_uri})
+
+    def _render(self, *rows):
+        return tutumcli.utils._render_table(collections.OrderedDict(rows), self.headers)
+
+    @mock.patch('tutumcli.utils._TableScreen')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    def test_watch_table(self, mock_open, mock_screen):
+        rows = {'/api/v1/service/a/': ['a', 'Stopped'], '/api/v1/service/b/': ['b', 'Running']}
+        list_rows = mock.Mock(return_value=[('/api/v1/service/a/', ['a', 'Running'])])
+        fetch_row = mock.Mock(side_effect=lambda resource_uri: rows.pop(resource_uri, None))
+        mock_open.return_value.recv.side_effect = [
+            self._event('service', '/api/v1/service/a/'), self._event('container', '/api/v1/container/c/'),
+            websocket.WebSocketTimeoutException(), self._event('service', '/api/v1/service/d/'),
+            self._event('service', '/api/v1/service/b/', 'create'), self._event('service', '/api/v1/service/a/'),
+            KeyboardInterrupt]
+
+        watch_table(self.headers, 'service', list_rows, fetch_row)
+
+        self.assertEqual(1, list_rows.call_count)
+        self.assertEqual([mock.call('/api/v1/service/a/'), mock.call('/api/v1/service/b/'),
+                          mock.call('/api/v1/service/a/')], fetch_row.call_args_list)
+        draws = [args[0] for args, kwargs in mock_screen.return_value.draw.call_args_list]
+        self.assertEqual([self._render(('/api/v1/service/a/', ['a', 'Running'])),
+                          self._render(('/api/v1/service/a/', ['a', 'Stopped'])),
+                          self._render(('/api/v1/service/a/', ['a', 'Stopped'])),
+                          self._render(('/api/v1/service/a/', ['a', 'Stopped'])),
+                          self._render(('/api/v1/service/a/', ['a', 'Stopped'])),
+                          self._render(('/api/v1/service/a/', ['a', 'Stopped']),
+                                       ('/api/v1/service/b/', ['b', 'Running'])),
+                          self._render(('/api/v1/service/b/', ['b', 'Running']))], draws)
+        self.assertTrue(mock_open.return_value.close.called)
+
+    @mock.patch('tutumcli.utils._TableScreen')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    def test_watch_table_reconciles(self, mock_open, mock_screen):
+        list_rows = mock.Mock(side_effect=[[('/api/v1/service/a/', ['a', 'Running'])],
+                                           [('/api/v1/service/b/', ['b', 'Running'])]])
+        mock_open.return_value.recv.side_effect = [websocket.WebSocketConnectionClosedException(), KeyboardInterrupt]
+
+        watch_table(self.headers, 'service', list_rows, mock.Mock())
+
+        self.assertEqual(2, list_rows.call_count)
+        self.assertEqual(2, mock_open.call_count)
+        self.assertEqual(self._render(('/api/v1/service/b/', ['b', 'Running'])),
+                         mock_screen.return_value.draw.call_args[0][0])
+
+    def test_match_query(self):
+        service = tutum.Service()
+        service._loaddict({'uuid': '1', 'name': 'web', 'state': 'Running', 'stack': '/api/v1/stack/1/'})
+        self.assertTrue(match_query(service, [('name__startswith', 'w')], state='Running', stack=None))
+        self.assertFalse(match_query(service, state='Stopped'))
+        self.assertFalse(match_query(service, [('name', 'db')], stack='/api/v1/stack/1/'))
+
+    def test_event_may_match(self):
+        event = {'type': 'container', 'action': 'create', 'state': 'Starting', 'uuid': '7a4cfe51',
+                 'resource_uri': '/api/v1/container/7a4cfe51/', 'parents': ['/api/v1/service/1/']}
+        self.assertTrue(event_may_match(event, [('name', 'web-1')], service='/api/v1/service/1/'))
+        self.assertFalse(event_may_match(event, service='/api/v1/service/2/'))
+        self.assertFalse(event_may_match(event, [('uuid__startswith', '3')]))
+        self.assertFalse(event_may_match(event, state='Running'))
+        self.assertFalse(event_may_match(dict(event, action='update')))
+        self.assertTrue(event_may_match(dict(event, action='update', state='Running'), [('state', 'running')]))
+
+
+class EventFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.event = {'type': 'container', 'action': 'update', 'state': 'Running',
+                      'resource_uri': '/api/v1/container/7a4cfe51-03bb-42d6-825e-3b533888d8cd/',
+                      'parents': ['/api/v1/service/e3f5b2c1-0000-4000-8000-000000000000/']}
+
+    def test_match(self):
+        self.assertTrue(EventFilter().match(self.event))
+        self.assertTrue(EventFilter(['service', 'container'], ['UPDATE'], ['running']).match(self.event))
+        self.assertFalse(EventFilter(types=['service']).match(self.event))
+        self.assertFalse(EventFilter(actions=['delete']).match(self.event))
+        self.assertFalse(EventFilter(states=['Stopped']).match(self.event))
+
+    def test_match_resources(self):
+        self.assertTrue(EventFilter(resource_uris=['/api/v1/service/e3f5b2c1-0000-4000-8000-000000000000/'])
+                        .match(self.event))
+        self.assertTrue(EventFilter(uuids=['7A4CFE']).match(self.event))
+        self.assertTrue(EventFilter(resource_uris=[], uuids=['e3f5']).match(self.event))
+        self.assertFalse(EventFilter(resource_uris=['/api/v1/service/other/'], uuids=['8b4c']).match(self.event))
+        # a --tag that matches no resource selects no event
+        self.assertFalse(EventFilter(resource_uris=[], uuids=[]).match(self.event))
+
+
+class ResolveEventResourcesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.service = tutum.Service()
+        self.service.resource_uri = '/api/v1/service/1/'
+        self.stack = tutum.Stack()
+        self.stack.resource_uri = '/api/v1/stack/2/'
+        self.node = tutum.Node()
+        self.node.resource_uri = '/api/v1/node/3/'
+        self.container = tutum.Container()
+        self.container.resource_uri = '/api/v1/container/4/'
+
+    def _iter_list(self, model, fields, filters=None, **params):
+        if params.get('name') in ['web', 'cafe']:
+            return {tutum.Service: [self.service], tutum.Stack: [self.stack]}.get(model, [])
+        if filters == [('tags', 'prod')]:
+            return [self.node] if model is tutum.Node else []
+        return []
+
+    @mock.patch('tutumcli.utils.iter_list')
+    def test_resolve_event_resources(self, mock_iter_list):
+        mock_iter_list.side_effect = self._iter_list
+        self.assertEqual(({'/api/v1/service/1/', '/api/v1/stack/2/', '/api/v1/node/3/'}, ['7a4c']),
+                         resolve_event_resources(['web', '7a4c'], ['prod']))
+        mock_iter_list.assert_any_call(tutum.Container, fields=['name'], name='web')
+        mock_iter_list.assert_called_with(tutum.NodeCluster, fields=['tags'], filters=[('tags', 'prod')])
+        self.assertRaises(ObjectNotFound, resolve_event_resources, ['unknown'], [])
+
+    @mock.patch('tutumcli.utils.iter_list')
+    def test_resolve_event_resources_hexadecimal_names(self, mock_iter_list):
+        mock_iter_list.side_effect = self._iter_list
+        self.assertEqual(({'/api/v1/service/1/', '/api/v1/stack/2/'}, []), resolve_event_resources(['cafe'], []))
+        self.assertEqual((set(), ['beef']), resolve_event_resources(['beef'], []))
+        self.assertEqual((set(), ['7a4cfe51']), resolve_event_resources(['7a4cfe51'], []))
+
+    @mock.patch('tutumcli.utils.fetch_remote_service')
+    @mock.patch('tutumcli.utils.fetch_remote_container', return_value=ObjectNotFound())
+    def test_resolve_event_resources_name_and_stack(self, mock_container, mock_service):
+        mock_service.return_value = self.service
+        self.assertEqual(({'/api/v1/service/1/'}, []), resolve_event_resources(['web.prod'], []))
+        mock_service.assert_called_with('web.prod', raise_exceptions=False)
+
+
+class EventSocketServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'events.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _connect(self, server, count):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.path)
+        for _ in range(100):
+            if len(server.clients) == count:
+                break
+            time.sleep(0.01)
+        return client.makefile()
+
+    def test_broadcast(self):
+        server = EventSocketServer(self.path)
+        client1 = self._connect(server, 1)
+        client2 = self._connect(server, 2)
+        server.broadcast('{"type": "container"}\n')
+        server.broadcast(u'{"type": "service"}\n')
+        server.close()
+
+        for client in [client1, client2]:
+            self.assertEqual(['{"type": "container"}\n', '{"type": "service"}\n'], client.readlines())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_slow_client_disconnected(self):
+        server = EventSocketServer(self.path, max_pending=1)
+        # keep the client from being served
+        with mock.patch.object(EventSocketServer, '_serve'):
+            self._connect(server, 1)
+        for _ in range(3):
+            server.broadcast('{}\n')
+        self.assertEqual({}, server.clients)
+        server.close()
+
+    def test_stale_socket_replaced(self):
+        EventSocketServer(self.path).server.close()
+        server = EventSocketServer(self.path)
+        self._connect(server, 1)
+        server.close()
+
+        with open(self.path, 'w') as f:
+            f.write('')
+        self.assertRaises(BadParameter, EventSocketServer, self.path)
+
+
+class FollowEventsTestCase(unittest.TestCase):
+    @mock.patch('tutumcli.utils.time.sleep')
+    @mock.patch('tutumcli.utils.open_event_stream')
+    def test_follow_events(self, mock_open, mock_sleep):
+        stream1 = mock.MagicMock()
+        stream1.recv.side_effect = ['{"type": "auth"}', '{"type": "service", "action": "update"}',
+                                    websocket.WebSocketConnectionClosedException()]
+        stream2 = mock.MagicMock()
+        stream2.recv.side_effect = ['{"type": "container", "action": "create"}', KeyboardInterrupt()]
+        mock_open.side_effect = [IOError(), IOError(), stream1, IOError(), stream2]
+        on_event = mock.MagicMock()
+        on_connect = mock.MagicMock()
+
+        with mock.patch('tutumcli.utils.cache.apply_event'):
+            self.assertRaises(KeyboardInterrupt, follow_events, on_event, on_connect)
+        self.assertEqual([mock.call({"type": "service", "action": "update"}),
+                          mock.call({"type": "container", "action": "create"})], on_event.call_args_list)
+        self.assertEqual([mock.call(False), mock.call(True)], on_connect.call_args_list)
+        # backs off while the stream cannot be opened, starting over once events flow
+        self.assertEqual([mock.call(1), mock.call(2), mock.call(1), mock.call(2)], mock_sleep.call_args_list)
+        self.assertTrue(stream1.close.called)
+        self.assertTrue(stream2.close.called)
+
+
+class EventReconcilerTestCase(unittest.TestCase):
+    def _container(self, uuid, state):
+        container = tutum.Container()
+        container.resource_uri = '/api/v1/container/%s/' % uuid
+        container.state = state
+        return container
+
+    @mock.patch('tutumcli.utils.iter_list')
+    def test_reconcile(self, mock_iter_list):
+        mock_iter_list.return_value = [self._container(1, 'Running'), self._container(2, 'Stopped')]
+        reconciler = EventReconciler(['container', 'unknown'])
+        self.assertFalse(reconciler.follows('container'))
+        self.assertEqual([], reconciler.reconcile())
+        mock_iter_list.assert_called_with(tutum.Container, fields=['resource_uri', 'state'])
+        self.assertTrue(reconciler.follows('container'))
+
+        reconciler.track({'type': 'container', 'action': 'delete', 'state': 'Terminated',
+                          'resource_uri': '/api/v1/container/2/'})
+        reconciler.track({'type': 'service', 'action': 'update', 'resource_uri': '/api/v1/service/1/'})
+        self.assertEqual({'container': {'/api/v1/container/1/': 'Running'}}, reconciler.state)
+
+        mock_iter_list.return_value = [self._container(1, 'Stopped'), self._container(3, 'Starting')]
+        self.assertEqual([{'type': 'container', 'action': 'update', 'state': 'Stopped', 'parents': [],
+                           'resource_uri': '/api/v1/container/1/', 'reconciled': True},
+                          {'type': 'container', 'action': 'create', 'state': 'Starting', 'parents': [],
+                           'resource_uri': '/api/v1/container/3/', 'reconciled': True}],
+                         sorted(reconciler.reconcile(), key=lambda e: e['resource_uri']))
+
+        mock_iter_list.return_value = []
+        self.assertEqual(['delete', 'delete'], [e['action'] for e in reconciler.reconcile()])
+
+    @mock.patch('tutumcli.utils.iter_list')
+    def test_reconcile_saved_state(self, mock_iter_list):
+        mock_iter_list.side_effect = [[], tutum.TutumApiError('error')]
+        reconciler = EventReconciler(None, {'node': {'/api/v1/node/1/': 'Deployed'}})
+        self.assertEqual(['delete'], [e['action'] for e in reconciler.reconcile()])
+        mock_iter_list.assert_called_with(tutum.Node, fields=['resource_uri', 'state'])
+
+        # the last known state is kept when the resources cannot be listed
+        reconciler.state['node'] = {'/api/v1/node/2/': 'Deployed'}
+        with mock.patch('sys.stderr', new_callable=StringIO.StringIO):
+            self.assertEqual([], reconciler.reconcile())
+        self.assertEqual({'node': {'/api/v1/node/2/': 'Deployed'}}, reconciler.state)
+
+
+class ReadInputTestCase(unittest.TestCase):
+    def setUp(self):
+        self.read_fd, self.write_fd = os.pipe()
+
+    def tearDown(self):
+        os.close(self.read_fd)
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+
+    def test_read_input_coalesced(self):
+        def _write():
+            for line in ['ls\n', 'pwd\n', 'exit\n']:
+                os.write(self.write_fd, line)
+                time.sleep(0.01)
+            os.close(self.write_fd)
+            self.write_fd = None
+
+        thread = threading.Thread(target=_write)
+        thread.start()
+        self.assertEqual('ls\npwd\nexit\n', read_input(self.read_fd, latency=5))
+        thread.join()
+
+    def test_read_input_max_size(self):
+        os.write(self.write_fd, 'x' * 10)
+        self.assertEqual('x' * 4, read_input(self.read_fd, max_size=4))
+        self.assertEqual('x' * 4, read_input(self.read_fd, max_size=4))
+        self.assertEqual('x' * 2, read_input(self.read_fd, max_size=4, latency=0.01))
+
+    def test_read_input_end(self):
+        os.write(self.write_fd, 'data')
+        os.close(self.write_fd)
+        self.write_fd = None
+        self.assertEqual('data', read_input(self.read_fd, latency=5))
+        self.assertEqual('', read_input(self.read_fd))
+
+
+class ParseExecFrameTestCase(unittest.TestCase):
+    def test_parse_exec_frame(self):
+        self.assertEqual(('stdout', 'h\xc3\xa9llo'),
+                         parse_exec_frame(json.dumps({'streamType': 'stdout', 'output': u'h\xe9llo'})))
+        self.assertEqual(('stderr', 'error'), parse_exec_frame(u'{"streamType": "stderr", "output": "error"}'))
+        self.assertEqual((None, ''), parse_exec_frame('{"type": "auth"}'))
+        self.assertEqual(('stdout', '{not json'), parse_exec_frame('{not json'))
+        self.assertEqual(('stdout', '\x1b[0m\xff'), parse_exec_frame('\x1b[0m\xff'))
+
+    def test_parse_exec_frame_error(self):
+        self.assertRaises(tutum.TutumAuthError, parse_exec_frame,
+                          '{"type": "error", "data": {"errorMessage": "UNAUTHORIZED"}}')
+        self.assertRaises(tutum.TutumApiError, parse_exec_frame, '{"type": "error", "data": {}}')
+
+    def test_write_fd(self):
+        read_end, write_end = os.pipe()
+        write_fd(write_end, 'data')
+        os.close(write_end)
+        self.assertEqual('data', os.read(read_end, 10))
+        os.close(read_end)
+
+
+class RunExecTestCase(unittest.TestCase):
+    @mock.patch('tutumcli.utils.tutum.user_agent', 'tutum-cli/test')
+    @mock.patch('tutumcli.utils.tutum.auth.get_auth_header', return_value={'Authorization': 'ApiKey user:key'})
+    @mock.patch('tutumcli.utils.websocket.create_connection')
+    def test_run_exec(self, mock_create_connection, mock_get_auth_header):
+        container = tutum.Container()
+        container.uuid = '7a4cfe51-03bb-42d6-825e-3b533888d8cd'
+        shell = mock_create_connection.return_value
+        shell.recv.side_effect = ['{"type": "auth"}', '{"streamType": "stdout", "output": "total 0\\n"}',
+                                  '{"streamType": "stderr", "output": "warning"}',
+                                  websocket.WebSocketConnectionClosedException()]
+        output_handler = mock.MagicMock()
+
+        run_exec(container, ['ls', '-l', 'my dir'], output_handler)
+        self.assertTrue(mock_create_connection.call_args[0][0].endswith(
+            'container/7a4cfe51-03bb-42d6-825e-3b533888d8cd/exec/?&command=ls+-l+%22my+dir%22'))
+        self.assertIn('Authorization: ApiKey user:key', mock_create_connection.call_args[1]['header'])
+        shell.send.assert_called_once_with(u'\u0004')
+        self.assertEqual([mock.call('stdout', 'total 0\n'), mock.call('stderr', 'warning')],
+                         output_handler.call_args_list)
+        self.assertTrue(shell.close.called)
+
+
+class PrefixedOutputTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        sys.stdout = self.buf = StringIO.StringIO()
+        sys.stderr = self.error = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+    def test_prefixed_output(self):
+        output = PrefixedOutput('web-1', threading.Lock())
+        output.write('stdout', 'first li')
+        self.assertEqual('', self.buf.getvalue())
+        output.write('stdout', 'ne\nsecond line\nthi')
+        output.write('stderr', 'error\n')
+        output.write('stdout', 'rd')
+        output.close()
+        self.assertEqual('web-1 | first line\nweb-1 | second line\nweb-1 | third\n', self.buf.getvalue())
+        self.assertEqual('web-1 | error\n', self.error.getvalue())
+
+
+    def test_prefixed_output_utf8(self):
+        # as set up by tutum_cli
+        sys.stdout = codecs.getwriter('utf8')(self.buf)
+        output = PrefixedOutput(u'caf\xe9-1', threading.Lock())
+        output.write('stdout', 'caf\xc3')
+        output.write('stdout', '\xa9\n\xff\n')
+        output.close()
+        self.assertEqual('caf\xc3\xa9-1 | caf\xc3\xa9\ncaf\xc3\xa9-1 | \xef\xbf\xbd\n', self.buf.getvalue())
+
+
+class ContainerCopyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        sys.stdout = tempfile.TemporaryFile()
+        sys.stderr = tempfile.TemporaryFile()
+        self.container = tutum.Container()
+        self.container.uuid = '7a4cfe51-03bb-42d6-825e-3b533888d8cd'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        sys.stdout.close()
+        sys.stderr.close()
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+    def _read(self, f):
+        f.seek(0)
+        return f.read()
+
+    def _archive(self, files):
+        archive = StringIO.StringIO()
+        tar = tarfile.open(fileobj=archive, mode='w')
+        for name, content in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, StringIO.StringIO(content))
+        tar.close()
+        return archive.getvalue()
+
+    def test_base64_stream_decoder(self):
+        encoded = base64.encodestring('\x00\xff' * 100)
+        decoder = Base64StreamDecoder()
+        self.assertEqual('\x00\xff' * 100, ''.join(decoder.decode(encoded[i:i + 7]) for i in range(0, len(encoded), 7)))
+        self.assertEqual('', decoder.pending)
+
+    def test_parse_copy_path(self):
+        self.assertEqual(('web-1', '/tmp/heap.hprof'), parse_copy_path('web-1:/tmp/heap.hprof'))
+        self.assertEqual(('web-1.prod', ''), parse_copy_path('web-1.prod:'))
+        self.assertEqual((None, './a:b'), parse_copy_path('./a:b'))
+        self.assertEqual((None, '/tmp'), parse_copy_path('/tmp'))
+        self.assertEqual((None, '-'), parse_copy_path('-'))
+
+    @mock.patch('tutumcli.utils.run_exec')
+    def test_copy_from_container(self, mock_run_exec):
+        encoded = base64.encodestring(self._archive([('logs/app.log', 'line\n' * 1000), ('../escape', 'x')]))
+
+        def _run_exec(container, command, output_handler):
+            self.assertEqual(['sh', '-c', "tar cf - -C /var logs | base64"], command)
+            for i in range(0, len(encoded), 1001):
+                output_handler('stdout', encoded[i:i + 1001])
+            output_handler('stderr', 'tar: removing leading /\n')
+
+        mock_run_exec.side_effect = _run_exec
+        copy_from_container(self.container, '/var/logs/', self.tmpdir)
+
+        with open(os.path.join(self.tmpdir, 'logs', 'app.log')) as f:
+            self.assertEqual('line\n' * 1000, f.read())
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, '..', 'escape')))
+        self.assertIn('tar: removing leading /\n', self._read(sys.stderr))
+        self.assertIn('Skipping ../escape', self._read(sys.stderr))
+
+    @mock.patch('tutumcli.utils.run_exec')
+    def test_copy_from_container_links(self, mock_run_exec):
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside, ignore_errors=True)
+        archive = StringIO.StringIO()
+        tar = tarfile.open(fileobj=archive, mode='w')
+        for name, kind, linkname in [('logs', tarfile.DIRTYPE, ''), ('logs/app.log', tarfile.REGTYPE, ''),
+                                     ('logs/current', tarfile.SYMTYPE, 'app.log'),
+                                     ('x', tarfile.SYMTYPE, outside), ('y', tarfile.SYMTYPE, '../'),
+                                     ('z', tarfile.LNKTYPE, '/etc/passwd'), ('fifo', tarfile.FIFOTYPE, '')]:
+            info = tarfile.TarInfo(name)
+            info.type = kind
+            info.linkname = linkname
+            tar.addfile(info)
+        for name in ['x/evil', 'y/evil']:
+            info = tarfile.TarInfo(name)
+            info.size = 4
+            tar.addfile(info, StringIO.StringIO('evil'))
+        tar.close()
+        mock_run_exec.side_effect = lambda container, command, output_handler: \
+            output_handler('stdout', base64.encodestring(archive.getvalue()))
+
+        copy_from_container(self.container, '/var', self.tmpdir)
+
+        self.assertEqual('app.log', os.readlink(os.path.join(self.tmpdir, 'logs', 'current')))
+        self.assertEqual([], os.listdir(outside))
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.tmpdir), 'evil')))
+        for name in ['z', 'fifo']:
+            self.assertFalse(os.path.lexists(os.path.join(self.tmpdir, name)))
+        # without the links, the files behind them are plain files of the destination
+        for name in ['x', 'y']:
+            self.assertFalse(os.path.islink(os.path.join(self.tmpdir, name)))
+            self.assertTrue(os.path.isfile(os.path.join(self.tmpdir, name, 'evil')))
+        errors = self._read(sys.stderr)
+        for name in ['x', 'y', 'z']:
+            self.assertIn('Skipping %s, which is outside of' % name, errors)
+        self.assertIn('Skipping fifo, which is not a file, a directory or a link', errors)
+
+    @mock.patch('tutumcli.utils.run_exec')
+    def test_copy_from_container_to_stdout(self, mock_run_exec):
+        archive = self._archive([('heap.hprof', '\x00\xff' * 100)])
+        mock_run_exec.side_effect = lambda container, command, output_handler: \
+            output_handler('stdout', base64.b64encode(archive))
+        copy_from_container(self.container, '/tmp/heap.hprof', '-')
+        self.assertEqual(archive, self._read(sys.stdout))
+
+    @mock.patch('tutumcli.utils.run_exec')
+    def test_copy_from_container_with_exception(self, mock_run_exec):
+        def _run_exec(container, command, output_handler):
+            output_handler('stderr', 'tar: /missing: No such file or directory\n')
+
+        mock_run_exec.side_effect = _run_exec
+        self.assertRaises(tarfile.TarError, copy_from_container, self.container, '/missing', self.tmpdir)
+
+        mock_run_exec.side_effect = websocket.WebSocketException('Handshake status 404')
+        self.assertRaises(websocket.WebSocketException, copy_from_container, self.container, '/tmp', self.tmpdir)
+
+    @mock.patch('tutumcli.utils.run_exec')
+    def test_copy_to_container(self, mock_run_exec):
+        source = os.path.join(self.tmpdir, 'conf')
+        os.mkdir(source)
+        with open(os.path.join(source, 'nginx.conf'), 'w') as f:
+            f.write('x' * 200000)
+        received = StringIO.StringIO()
+
+        def _run_exec(container, command, output_handler, input_chunks):
+            self.assertEqual(['sh', '-c', "mkdir -p '/etc/my app' && base64 -d | tar xf - -C '/etc/my app'"],
+                             command)
+            for chunk in input_chunks:
+                lines = chunk.splitlines(True)
+                self.assertTrue(all(len(line) <= 77 and line.endswith('\n') for line in lines))
+                received.write(base64.b64decode(chunk))
+                # the terminal of the exec session echoes the input
+                for i in range(0, len(chunk), 1000):
+                    output_handler('stdout', chunk[i:i + 1000].replace('\n', '\r\n'))
+            output_handler('stdout', 'tar: conf/nginx.conf: Cannot open: Read-only file system\r\n')
+            output_handler('stderr', 'partial')
+
+        mock_run_exec.side_effect = _run_exec
+        copy_to_container(self.container, source + '/', '/etc/my app')
+        self.assertEqual('tar: conf/nginx.conf: Cannot open: Read-only file system\r\n', self._read(sys.stdout))
+        self.assertEqual('partial\n', self._read(sys.stderr))
+
+        received.seek(0)
+        tar = tarfile.open(fileobj=received)
+        self.assertEqual(['conf', 'conf/nginx.conf'], sorted(tar.getnames()))
+        self.assertEqual('x' * 200000, tar.extractfile('conf/nginx.conf').read())
+
+    def test_copy_to_container_missing_source(self):
+        self.assertRaises(BadParameter, copy_to_container, self.container, os.path.join(self.tmpdir, 'x'), '/tmp')
+
+
+class StreamLogsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stderr = sys.stderr
+        sys.stderr = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def test_stream_logs_follow(self):
+        # each stream waits for a line of the other one, which only works if they are followed at the same time
+        events = {'web-1': threading.Event(), 'web-2': threading.Event()}
+        messages = []
+
+        def logs(name, other):
+            def _logs(tail, follow, log_handler):
+                log_handler('%s started' % name)
+                events[name].set()
+                self.assertTrue(events[other].wait(5))
+                log_handler('%s done' % name)
+
+            obj = mock.MagicMock()
+            obj.logs.side_effect = _logs
+            return obj
+
+        objs = [logs('web-1', 'web-2'), logs('web-2', 'web-1')]
+        self.assertFalse(stream_logs(objs, 10, True, messages.append))
+
+        self.assertEqual(['web-1 done', 'web-1 started', 'web-2 done', 'web-2 started'], sorted(messages))
+        objs[0].logs.assert_called_with(10, True, mock.ANY)
+
+    def test_stream_logs_follow_error(self):
+        # the first stream only ends once the failure of the second one has been reported
+        def _logs(tail, follow, log_handler):
+            for _ in range(500):
+                if sys.stderr.getvalue():
+                    break
+                time.sleep(0.01)
+            log_handler(sys.stderr.getvalue())
+
+        objs = [mock.MagicMock(), mock.MagicMock()]
+        objs[0].logs.side_effect = _logs
+        objs[1].logs.side_effect = tutum.TutumApiError('Status 500')
+        messages = []
+
+        self.assertTrue(stream_logs(objs, None, True, messages.append))
+        self.assertEqual(['Status 500\n'], messages)
+
+    def test_stream_logs_without_follow(self):
+        messages = []
+        objs = []
+        for name in ['web-1', 'web-2']:
+            obj = mock.MagicMock()
+            obj.logs.side_effect = lambda tail, follow, log_handler, name=name: log_handler(name)
+            objs.append(obj)
+        objs.insert(1, mock.MagicMock())
+        objs[1].logs.side_effect = tutum.TutumApiError('Status 500')
+
+        self.assertTrue(stream_logs(objs, None, False, messages.append))
+        self.assertEqual(['web-1', 'web-2'], messages)
+        self.assertEqual('Status 500\n', sys.stderr.getvalue())
+
+
+class StreamOutputTestCase(unittest.TestCase):
+    class Terminal(StringIO.StringIO):
+        def fileno(self):
+            return 1
+
+    def _progress(self, image_id, current):
+        return json.dumps({'status': 'Downloading', 'id': image_id, 'progress': '%d/10' % current,
+                           'progressDetail': {'current': current, 'total': 10}})
+
+    def test_stream_output(self):
+        stream = StringIO.StringIO()
+        output = [json.dumps({'status': 'Pulling from tutum/builder', 'id': 'latest'}),
+                  self._progress('a1', 1), self._progress('a1', 5),
+                  json.dumps({'stream': 'Step 1 : FROM ubuntu\n'})]
+
+        self.assertEqual([], stream_output(output, stream))
+        self.assertEqual('latest: Pulling from tutum/builder\n\nStep 1 : FROM ubuntu\n', stream.getvalue())
+
+    def test_stream_output_history_and_callback(self):
+        events = []
+        output = [self._progress('a1', current) for current in range(10)]
+
+        history = stream_output(output, StringIO.StringIO(), callback=events.append, history=3)
+
+        self.assertEqual([json.loads(chunk) for chunk in output], events)
+        self.assertEqual([json.loads(chunk) for chunk in output[-3:]], history)
+
+    def test_stream_output_error(self):
+        output = [json.dumps({'errorDetail': {'message': 'image not found'}, 'error': 'image not found'})]
+        self.assertRaises(StreamOutputError, stream_output, output, StringIO.StringIO())
+
+    @mock.patch('tutumcli.utils.time.time', return_value=1000.0)
+    @mock.patch('tutumcli.utils.os.isatty', return_value=True)
+    def test_stream_output_throttles_redraws(self, mock_isatty, mock_time):
+        stream = self.Terminal()
+        output = [self._progress('a1', 1), self._progress('b2', 1)] + \
+                 [self._progress(image_id, current) for current in range(2, 10) for image_id in ['a1', 'b2']]
+
+        stream_output(output, stream)
+
+        value = stream.getvalue()
+        # the first line of each layer is drawn right away, then only the last progress before the end of the stream
+        for progress in ['1/10', '9/10']:
+            self.assertEqual(2, value.count(progress))
+        for current in range(2, 9):
+            self.assertNotIn('%d/10' % current, value)
+
+        mock_time.return_value = 2000.0
+        stream = self.Terminal()
+        stream_output(output, stream, fps=0)
+        for current in range(1, 10):
+            self.assertEqual(2, stream.getvalue().count('%d/10' % current))
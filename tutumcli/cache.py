@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import tutum
+
+REFERENCE_DATA_TTL = 24 * 60 * 60
+IDENTIFIER_INDEX_TTL = {
+    "container": 5 * 60,
+    "service": 30 * 60,
+    "stack": 60 * 60,
+    "node": 60 * 60,
+    "nodecluster": 60 * 60,
+}
+
+
+def get_cache_dir():
+    cache_dir = os.environ.get('TUTUM_CACHE_DIR')
+    if not cache_dir:
+        xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(xdg_cache_home, 'tutum')
+    return cache_dir
+
+
+def get_cache_path(*parts):
+    # Keep data from different Tutum endpoints (e.g. staging and production) apart
+    namespace = hashlib.md5(tutum.base_url).hexdigest()[:8]
+    return os.path.join(get_cache_dir(), namespace, *parts)
+
+
+def load(path, ttl):
+    """Return the data stored at ``path``, or None if it is missing, unreadable or older than ``ttl`` seconds"""
+    try:
+        with open(path) as f:
+            content = json.load(f)
+        if time.time() - content["timestamp"] > ttl:
+            return None
+        return content["data"]
+    except Exception:
+        return None
+
+
+def save(path, data):
+    """Atomically store ``data`` at ``path``. Failures are ignored, a cache miss is never fatal"""
+    try:
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # a unique name, for the threads of a --parallel command saving the same file at once
+        fd, tmp_path = tempfile.mkstemp(prefix="%s." % os.path.basename(path), suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"timestamp": time.time(), "data": data}, f)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except Exception:
+        pass
+
+
+def list_reference_data(model, refresh=False):
+    """List rarely changing catalogue resources (providers, regions, node types, availability zones)
+
+    The result of ``model.list()`` is kept on disk for ``REFERENCE_DATA_TTL`` seconds, and is fetched again
+    when ``refresh`` is set.
+    """
+    path = get_cache_path("reference", "%s.json" % model.endpoint.strip("/"))
+    objects = None
+    if not refresh:
+        objects = load(path, REFERENCE_DATA_TTL)
+    if objects is None:
+        objects = [obj.get_all_attributes() for obj in model.list()]
+        save(path, objects)
+
+    instances = []
+    for obj in objects:
+        instance = model()
+        instance._loaddict(obj)
+        instances.append(instance)
+    return instances
+
+
+def _get_index_path(resource_type):
+    return get_cache_path("index", "%s.json" % resource_type)
+
+
+# path -> (modification time, index), so that the index is only read again when another process changed it
+_indexes = {}
+
+
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _load_index(resource_type):
+    # Freshness is checked against the time of the last full listing, the file itself never expires
+    path = _get_index_path(resource_type)
+    mtime = _get_mtime(path)
+    cached = _indexes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    index = load(path, float("inf"))
+    if not index:
+        index = {"complete": None, "entries": {}}
+    _indexes[path] = (mtime, index)
+    return index
+
+
+def _save_index(resource_type, index):
+    path = _get_index_path(resource_type)
+    save(path, index)
+    _indexes[path] = (_get_mtime(path), index)
+
+
+def index_objects(resource_type, objects, get_stack_name=None, complete=False):
+    """Remember how ``objects`` can be identified: by uuid prefix, name and ``name.stack``
+
+    ``get_stack_name`` returns the name of the stack of an object, if any. ``complete`` must only be set when
+    ``objects`` is the full, unfiltered list of resources of that type, which replaces whatever was indexed before.
+    """
+    now = time.time()
+    index = {"complete": now, "entries": {}} if complete else _load_index(resource_type)
+    for obj in objects:
+        if not getattr(obj, "resource_uri", None) or not getattr(obj, "uuid", None):
+            continue
+        index["entries"][obj.resource_uri] = {"uuid": obj.uuid,
+                                              "name": getattr(obj, "name", None),
+                                              "stack": get_stack_name(obj) if get_stack_name else None,
+                                              "timestamp": now}
+    _save_index(resource_type, index)
+
+
+def forget_object(resource_type, resource_uri):
+    """Drop an entry found to be stale, along with the completeness of the index
+
+    The other entries can no longer tell whether an identifier is unique, until the next full listing.
+    """
+    index = _load_index(resource_type)
+    if resource_uri in index["entries"] or index["complete"]:
+        index["entries"].pop(resource_uri, None)
+        index["complete"] = None
+        _save_index(resource_type, index)
+
+
+def lookup_identifier(resource_type, identifier):
+    """Return the resource uri that ``identifier`` refers to, or None when the index cannot tell for sure
+
+    Answers only come from an index built from a full listing within ``IDENTIFIER_INDEX_TTL``, so that an identifier
+    matching more than one resource is never resolved to one of them. Lookups follow ``tutum.Utils.fetch_remote_*``:
+    ``name.stack``, then uuid prefix, then name.
+    """
+    ttl = IDENTIFIER_INDEX_TTL.get(resource_type, 0)
+    index = _load_index(resource_type)
+    if not index["complete"] or time.time() - index["complete"] > ttl:
+        return None
+
+    # all the entries are kept until the next full listing: dropping one could make another one look unique
+    entries = index["entries"].items()
+    if "." in identifier:
+        terms = identifier.split(".", 2)
+        matches = [resource_uri for resource_uri, entry in entries
+                   if entry["name"] == terms[0] and entry["stack"] == terms[1]]
+    else:
+        matches = [resource_uri for resource_uri, entry in entries if entry["uuid"].startswith(identifier)] or \
+                  [resource_uri for resource_uri, entry in entries if entry["name"] == identifier]
+    if len(matches) == 1:
+        return matches[0]
+    return None
+
+
+def apply_event(event):
+    """Keep the identifier index in line with a Tutum event
+
+    Updates leave the uuid, name and stack of a resource as they are, so its entry stays. A new or deleted resource,
+    or one the index does not know of, makes the index incomplete until the next full listing. The index is kept in
+    memory, and only written when that happens.
+    """
+    resource_type = event.get("type")
+    if resource_type not in IDENTIFIER_INDEX_TTL:
+        return
+    index = _load_index(resource_type)
+    deleted = event.get("action") == "delete" or event.get("state") in ["Terminated", "Deleted"]
+    if index["complete"] and (event.get("action") == "create" or deleted or
+                              event.get("resource_uri") not in index["entries"]):
+        # a new resource may share its name or uuid prefix with an indexed one, a deleted one may have been the
+        # reason why an identifier is ambiguous
+        index["complete"] = None
+        _save_index(resource_type, index)
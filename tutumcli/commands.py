@@ -1,20 +1,24 @@
 from __future__ import print_function
 import base64
 import getpass
+import collections
+import hashlib
 import json
 import sys
 import ConfigParser
 import logging
 from os.path import join, expanduser, abspath
 import errno
-import urllib
 import re
+import threading
 import websocket
 import tutum
-import yaml
 from tutum.api import auth
 from tutum import TutumApiError, TutumAuthError, ObjectNotFound, NonUniqueIdentifier
 from tutumcli import utils
+from tutumcli import cache
+from tutumcli import journal
+from tutumcli.exceptions import BadParameter
 
 
 TUTUM_FILE = '.tutum'
@@ -26,7 +30,13 @@ NO_ERROR = 'no_error'
 TUTUM_AUTH_ERROR_EXIT_CODE = 2
 EXCEPTION_EXIT_CODE = 3
 
+AUTH_VERIFIED_TTL = 5 * 60
+
 cli_log = logging.getLogger("cli")
+_login_lock = threading.Lock()
+
+# what the identifier index needs to know of a listed container, instead of the whole object
+_IndexedContainer = collections.namedtuple("_IndexedContainer", ["resource_uri", "uuid", "name", "service"])
 
 
 def login(username, password):
@@ -50,10 +60,16 @@ def login(username, password):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def verify_auth(args):
-    def _login():
-        username = raw_input("Username: ")
-        password = getpass.getpass()
+def _login():
+    # Errors are raised, for the command to report them like any other
+    while True:
+        print("Not Authorized, Please login:", file=sys.stderr)
+        try:
+            username = raw_input('Username: ')
+            password = getpass.getpass()
+        except EOFError:
+            # e.g. run from cron, without a terminal
+            raise TutumAuthError("Not Authorized, please run 'tutum login'")
         try:
             auth.verify_credential(username, password)
             config = ConfigParser.ConfigParser()
@@ -61,25 +77,60 @@ def verify_auth(args):
             config.set(AUTH_SECTION, BASIC_AUTH_OPTION, '"%s"' % base64.b64encode("%s:%s" % (username, password)))
             with open(join(expanduser('~'), TUTUM_FILE), 'w') as f:
                 config.write(f)
-            return True
+            print("Login succeeded!")
+            tutum.basic_auth, tutum.apikey_auth = auth.load_from_file("~/.tutum")
+            return
         except tutum.TutumAuthError:
-            return False
-        except Exception as e:
-            print(e, file=sys.stderr)
-            sys.exit(EXCEPTION_EXIT_CODE)
+            continue
+
 
-    if args.cmd != 'login':
+def _get_credential_digest():
+    return hashlib.sha1(json.dumps(auth.get_auth_header(), sort_keys=True)).hexdigest()
+
+
+def _login_on_auth_error(send_request):
+    """Wrap ``send_request`` so that a request rejected with TutumAuthError prompts for a login, and is sent again
+
+    Only the main thread prompts. A request sent by another thread (e.g. with ``--parallel``) is sent again if the
+    credentials changed since it was rejected, and fails with TutumAuthError otherwise.
+    """
+    def wrapper(*args, **kwargs):
+        auth_header = auth.get_auth_header()
         try:
-            tutum.api.http.send_request("GET", "/auth")
+            return send_request(*args, **kwargs)
         except tutum.TutumAuthError:
-            print("Not Authorized, Please login:", file=sys.stderr)
-            while True:
-                if _login():
-                    print("Login succeeded!")
-                    tutum.basic_auth, tutum.apikey_auth = auth.load_from_file("~/.tutum")
-                    break
-                else:
-                    print("Not Authorized, Please login:", file=sys.stderr)
+            with _login_lock:
+                # concurrent requests that failed with the same credentials only prompt once
+                if auth_header == auth.get_auth_header():
+                    if not isinstance(threading.current_thread(), threading._MainThread):
+                        raise TutumAuthError("Not Authorized, please run 'tutum login'")
+                    _login()
+            return send_request(*args, **kwargs)
+
+    wrapper.login_on_auth_error = True
+    return wrapper
+
+
+def verify_auth(args):
+    """Make any unauthorized API request of this command prompt for a login
+
+    The credentials are checked when the first real request is sent, rather than with a ``GET /auth`` up front. The
+    event stream is the exception: it does not report bad credentials in a way a login can recover from, so they are
+    checked beforehand, once every ``AUTH_VERIFIED_TTL`` seconds.
+    """
+    if args.cmd == 'login':
+        return
+
+    for module in [tutum.api.http, tutum.api.base, tutum.api.stack, tutum.api.trigger, tutum.api.imagetag]:
+        if not getattr(module.send_request, "login_on_auth_error", False):
+            module.send_request = _login_on_auth_error(module.send_request)
+
+    if args.cmd == 'event':
+        path = cache.get_cache_path("auth", "verified.json")
+        if cache.load(path, AUTH_VERIFIED_TTL) != _get_credential_digest():
+            tutum.api.http.send_request("GET", "/auth")
+            # the request may have gone through a login, so the digest is taken again
+            cache.save(path, _get_credential_digest())
 
 
 def build(tag, working_directory, docker_sock):
@@ -113,85 +164,216 @@ def build(tag, working_directory, docker_sock):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def event():
+def event(types, actions, states, identifiers, tags, output_format, socket_path, journal_dir, offset):
+    server = event_journal = reconciler = None
+    try:
+        resource_uris = uuids = None
+        if identifiers or tags:
+            resource_uris, uuids = utils.resolve_event_resources(identifiers or [], tags or [])
+        event_filter = utils.EventFilter(types, actions, states, resource_uris, uuids)
+        if journal_dir is not None or offset is not None:
+            event_journal = journal.EventJournal(journal_dir or journal.get_journal_dir())
+            reconciler = utils.EventReconciler(types, event_journal.load_state())
+        if socket_path:
+            server = utils.EventSocketServer(socket_path)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(EXCEPTION_EXIT_CODE)
+
+    def _print_event(e, event_offset):
+        if not event_filter.match(e):
+            return
+        if event_offset is not None:
+            e = dict(e, offset=event_offset)
+        line = json.dumps(e)
+        if output_format == "ndjson":
+            print(line)
+        else:
+            print(e)
+        sys.stdout.flush()
+        if server:
+            server.broadcast(line + "\n")
+
+    def _on_event(e):
+        if reconciler:
+            if reconciler.follows(e.get("type")):
+                reconciler.track(e)
+            elif e.get("type") in utils.EVENT_RESOURCE_MODELS:
+                reconciler.reconcile([e.get("type")])
+        _print_event(e, event_journal.append(e) if event_journal else None)
+
+    def _on_connect(reconnected):
+        # also run at start up, to catch up with what happened since the journal was last written
+        if not reconciler:
+            return
+        for e in reconciler.reconcile():
+            cache.apply_event(e)
+            _print_event(e, event_journal.append(e))
+        event_journal.save_state(reconciler.state)
+
     try:
-        events = tutum.TutumEvents()
-        events.on_message(lambda e: print(e))
-        events.run_forever()
+        if offset is not None:
+            if offset < event_journal.first_offset:
+                print("Events before offset %d are no longer in the journal" % event_journal.first_offset,
+                      file=sys.stderr)
+            for event_offset, e in event_journal.read(offset):
+                _print_event(e, event_offset)
+        utils.follow_events(_on_event, _on_connect)
     except KeyboardInterrupt:
         pass
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(EXCEPTION_EXIT_CODE)
+    finally:
+        if server:
+            server.close()
+        if event_journal:
+            event_journal.save_state(reconciler.state)
+            event_journal.close()
 
 
-def service_inspect(identifiers):
+def service_exec(identifier, containers, command, parallel):
     has_exception = False
-    for identifier in identifiers:
+    try:
+        if command and command[0] == "--":
+            command = command[1:]
+        if not command:
+            raise BadParameter("A command to run is required")
+        service = utils.fetch_remote_service(identifier)
+        targets = list(utils.iter_list(tutum.Container, fields=["name", "uuid"], service=service.resource_uri,
+                                       state="Running"))
+        if containers:
+            selected = []
+            for container_identifier in containers:
+                matches = [container for container in targets if container.name == container_identifier or
+                           container.uuid.startswith(container_identifier.lower())]
+                if not matches:
+                    raise ObjectNotFound("Identifier '%s' does not match any running container of service %s" %
+                                         (container_identifier, service.name))
+                selected.extend(container for container in matches if container not in selected)
+            targets = selected
+        if not targets:
+            raise ObjectNotFound("Service %s has no running container" % service.name)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(EXCEPTION_EXIT_CODE)
+
+    lock = threading.Lock()
+
+    def _exec(container):
+        output = utils.PrefixedOutput(container.name, lock)
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            print(json.dumps(service.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+            utils.run_exec(container, command, output.write)
+        finally:
+            output.close()
+
+    try:
+        for container, _, e in utils.iter_concurrently(_exec, targets, parallel):
+            if e:
+                with lock:
+                    print("%s: %s" % (container.name, e), file=sys.stderr)
+                has_exception = True
+    except KeyboardInterrupt:
+        pass
+    if has_exception:
+        sys.exit(EXCEPTION_EXIT_CODE)
+
+
+def service_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(utils.fetch_remote_service, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
 def service_logs(identifiers, tail, follow):
     has_exception = False
+    services = []
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            service.logs(tail, follow, utils.container_service_log_handler)
-        except KeyboardInterrupt:
-            pass
+            services.append(utils.fetch_remote_service(identifier))
         except Exception as e:
             print(e, file=sys.stderr)
             has_exception = True
+    try:
+        if utils.stream_logs(services, tail, follow, utils.container_service_log_handler):
+            has_exception = True
+    except KeyboardInterrupt:
+        pass
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_ps(quiet, status, stack):
+def service_ps(quiet, status, stack, filters, output_format, watch):
     try:
+        if watch and (quiet or output_format != "table"):
+            raise BadParameter("--watch can only be used with the table output")
         headers = ["NAME", "UUID", "STATUS", "#CONTAINERS", "IMAGE", "DEPLOYED", "PUBLIC DNS", "STACK"]
+        keys = ["name", "uuid", "state", "synchronized", "current_num_containers", "image_name", "deployed_datetime",
+                "public_dns", "stack"]
 
         stack_resource_uri = None
         if stack:
-            s = tutum.Utils.fetch_remote_stack(stack, raise_exceptions=False)
+            s = utils.fetch_remote_stack(stack, raise_exceptions=False)
             if isinstance(s, NonUniqueIdentifier):
                 raise NonUniqueIdentifier("Identifier %s matches more than one stack, please use UUID instead" % stack)
             if isinstance(s, ObjectNotFound):
                 raise ObjectNotFound("Identifier '%s' does not match any stack" % stack)
             stack_resource_uri = s.resource_uri
-        service_list = tutum.Service.list(state=status, stack=stack_resource_uri)
+        filters = utils.parse_filters(filters)
+        query = {"state": status, "stack": stack_resource_uri}
+        stacks = utils.get_resource_uri_map(tutum.Stack)
 
-        data_list = []
-        long_uuid_list = []
-        has_unsynchronized_service = False
-        stacks = {}
-        for stack in tutum.Stack.list():
-            stacks[stack.resource_uri] = stack.name
-        for service in service_list:
+        def _list():
+            return utils.iter_list(tutum.Service,
+                                   fields=["name", "uuid", "state", "synchronized", "current_num_containers",
+                                           "image_name", "deployed_datetime", "public_dns", "stack"],
+                                   filters=filters, **query)
+
+        def _row(service):
             service_state = utils.add_unicode_symbol_to_state(service.state)
             if not service.synchronized and service.state != "Redeploying":
                 service_state += "(*)"
-                has_unsynchronized_service = True
-            data_list.append([service.name, service.uuid[:8],
-                              service_state,
-                              service.current_num_containers,
-                              service.image_name,
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(service.deployed_datetime),
-                              service.public_dns,
-                              stacks.get(service.stack)])
-            long_uuid_list.append(service.uuid)
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", "", ""])
+            return [service.name, service.uuid[:8],
+                    service_state,
+                    service.current_num_containers,
+                    service.image_name,
+                    utils.get_humanize_local_datetime_from_utc_datetime_string(service.deployed_datetime),
+                    service.public_dns,
+                    stacks.get(service.stack)]
+
+        if watch:
+            def _list_rows():
+                stacks.update(utils.get_resource_uri_map(tutum.Stack))
+                return [(service.resource_uri, _row(service)) for service in _list()]
+
+            def _fetch_row(resource_uri):
+                service = tutum.Utils.fetch_by_resource_uri(resource_uri)
+                return _row(service) if utils.match_query(service, filters, **query) else None
+
+            utils.watch_table(headers, "service", _list_rows, _fetch_row,
+                              lambda event: utils.event_may_match(event, filters, **query))
+            return
+
+        indexed_services = []
+        has_unsynchronized_service = False
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
+        for service in _list():
+            indexed_services.append(service)
+            if quiet:
+                print(service.uuid)
+                continue
 
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
-            if has_unsynchronized_service:
+            if not service.synchronized and service.state != "Redeploying":
+                has_unsynchronized_service = True
+            record = dict((key, getattr(service, key, None)) for key in keys)
+            record["stack"] = stacks.get(service.stack)
+            writer.write(_row(service), record)
+        cache.index_objects("service", indexed_services, lambda service: stacks.get(service.stack),
+                            complete=not status and not stack and not filters)
+
+        if writer:
+            writer.close()
+            if has_unsynchronized_service and output_format == "table":
                 print(
                     "\n(*) Please note that this service needs to be redeployed to "
                     "have its configuration changes applied")
@@ -200,18 +382,16 @@ def service_ps(quiet, status, stack):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_redeploy(identifiers, not_reuse_volume, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            result = service.redeploy(not not_reuse_volume)
-            utils.sync_action(service, sync)
-            if result:
-                print(service.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def service_redeploy(identifiers, not_reuse_volume, sync, parallel):
+    def _redeploy(identifier):
+        service = utils.fetch_remote_service(identifier)
+        result = service.redeploy(not not_reuse_volume)
+        if result:
+            print(service.uuid)
+        return service
+
+    services, has_exception = utils.map_for_each(_redeploy, identifiers, parallel)
+    utils.sync_actions(services, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -313,20 +493,18 @@ def service_run(image, name, cpu_shares, memory, privileged, target_num_containe
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_scale(identifiers, target_num_containers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            service.target_num_containers = target_num_containers
-            service.save()
-            result = service.scale()
-            utils.sync_action(service, sync)
-            if result:
-                print(service.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def service_scale(identifiers, target_num_containers, sync, parallel):
+    def _scale(identifier):
+        service = utils.fetch_remote_service(identifier)
+        service.target_num_containers = target_num_containers
+        service.save()
+        result = service.scale()
+        if result:
+            print(service.uuid)
+        return service
+
+    services, has_exception = utils.map_for_each(_scale, identifiers, parallel)
+    utils.sync_actions(services, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -337,7 +515,7 @@ def service_set(identifiers, image, cpu_shares, memory, privileged, target_num_c
     has_exception = False
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier, raise_exceptions=True)
+            service = utils.fetch_remote_service(identifier, raise_exceptions=True)
             if service is not None:
                 if image:
                     service.image = image
@@ -433,130 +611,118 @@ def service_set(identifiers, image, cpu_shares, memory, privileged, target_num_c
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_start(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            result = service.start()
-            utils.sync_action(service, sync)
-            if result:
-                print(service.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def service_start(identifiers, sync, parallel):
+    def _start(identifier):
+        service = utils.fetch_remote_service(identifier)
+        result = service.start()
+        if result:
+            print(service.uuid)
+        return service
+
+    services, has_exception = utils.map_for_each(_start, identifiers, parallel)
+    utils.sync_actions(services, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_stop(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            result = service.stop()
-            utils.sync_action(service, sync)
-            if result:
-                print(service.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def service_stop(identifiers, sync, parallel):
+    def _stop(identifier):
+        service = utils.fetch_remote_service(identifier)
+        result = service.stop()
+        if result:
+            print(service.uuid)
+        return service
+
+    services, has_exception = utils.map_for_each(_stop, identifiers, parallel)
+    utils.sync_actions(services, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_terminate(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            service = tutum.Utils.fetch_remote_service(identifier)
-            result = service.delete()
-            utils.sync_action(service, sync)
-            if result:
-                print(service.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def service_terminate(identifiers, sync, parallel):
+    def _terminate(identifier):
+        service = utils.fetch_remote_service(identifier)
+        result = service.delete()
+        if result:
+            print(service.uuid)
+        return service
+
+    services, has_exception = utils.map_for_each(_terminate, identifiers, parallel)
+    utils.sync_actions(services, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
+def container_cp(source, destination):
+    try:
+        source_identifier, source_path = utils.parse_copy_path(source)
+        destination_identifier, destination_path = utils.parse_copy_path(destination)
+        if bool(source_identifier) == bool(destination_identifier):
+            raise BadParameter("Either the source or the destination must be a path in a container, "
+                               "as CONTAINER:PATH")
+        if source_identifier:
+            container = utils.fetch_remote_container(source_identifier)
+            utils.copy_from_container(container, source_path, destination_path)
+        else:
+            container = utils.fetch_remote_container(destination_identifier)
+            utils.copy_to_container(container, source_path, destination_path)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(EXCEPTION_EXIT_CODE)
+
+
 def container_exec(identifier, command):
     try:
         import termios
         import tty
         import select
-        import signal
     except ImportError:
         print("tutum exec is not supported on this operating system", file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
     def invoke_shell(url):
-        header = {'User-Agent': tutum.user_agent}
-        header.update(tutum.auth.get_auth_header())
-
-        h = [": ".join([key, value]) for key, value in header.items()]
-        cli_log.info("websocket: %s %s" % (url, h))
-        shell = websocket.create_connection(url, timeout=10, header=h)
-
+        stdin = sys.stdin.fileno()
         oldtty = None
         try:
             oldtty = termios.tcgetattr(sys.stdin)
         except:
             pass
 
-        old_handler = signal.getsignal(signal.SIGWINCH)
+        h = utils.get_exec_header()
+        cli_log.info("websocket: %s %s" % (url, h))
+        shell = websocket.create_connection(url, timeout=10, header=h)
+
         errorcode = 0
+        inputs = [shell.sock, stdin]
+        outputs = {"stdout": sys.stdout, "stderr": sys.stderr}
+        for output in outputs.values():
+            output.flush()
 
         try:
             if oldtty:
-                tty.setraw(sys.stdin.fileno())
-                tty.setcbreak(sys.stdin.fileno())
+                tty.setraw(stdin)
+                tty.setcbreak(stdin)
 
             while True:
                 try:
-                    if oldtty:
-                        r, w, e = select.select([shell.sock, sys.stdin], [], [shell.sock], 5)
-                        if sys.stdin in r:
-                            x = sys.stdin.read(1)
-                            # read arrows
-                            if x == '\x1b':
-                                x += sys.stdin.read(1)
-                                if x[1] == '[':
-                                    x += sys.stdin.read(1)
-                            if len(x) == 0:
-                                shell.send('\n')
-                            shell.send(x)
-                    else:
-                        x = str(sys.stdin.read())
-                        r, w, e = select.select([shell.sock], [], [shell.sock], 1)
-                        shell.send(x)
-                        shell.send(u"\u0004")
+                    r, w, e = select.select(inputs, [], [shell.sock], 5)
+                    if stdin in r:
+                        data = utils.read_input(stdin)
+                        if data:
+                            shell.send(data)
+                        else:
+                            # end of the piped input
+                            shell.send(u"\u0004")
+                            inputs.remove(stdin)
 
                     if shell.sock in r:
                         data = shell.recv()
                         if not data:
                             continue
-                        try:
-                            message = json.loads(data)
-                            if message.get("type") == "error":
-                                if message.get("data", {}).get("errorMessage") == "UNAUTHORIZED":
-                                    raise TutumAuthError
-                                else:
-                                    raise TutumApiError(message)
-                            streamType = message.get("streamType")
-                            if streamType == "stdout":
-                                sys.stdout.write(message.get("output"))
-                                sys.stdout.flush()
-                            elif streamType == "stderr":
-                                sys.stderr.write(message.get("output"))
-                                sys.stderr.flush()
-                        except TutumAuthError:
-                            raise
-                        except:
-                            sys.stdout.write(data)
-                            sys.stdout.flush()
-                except (select.error, IOError) as e:
+                        stream_type, output = utils.parse_exec_frame(data)
+                        if stream_type in outputs:
+                            utils.write_fd(outputs[stream_type].fileno(), output)
+                except (select.error, IOError, OSError) as e:
                     if e.args and e.args[0] == errno.EINTR:
                         pass
                     else:
@@ -578,85 +744,69 @@ def container_exec(identifier, command):
         finally:
             if oldtty:
                 termios.tcsetattr(sys.stdin, termios.TCSADRAIN, oldtty)
-            signal.signal(signal.SIGWINCH, old_handler)
             exit(errorcode)
 
     try:
-        container = tutum.Utils.fetch_remote_container(identifier)
+        container = utils.fetch_remote_container(identifier)
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
-    endpoint = "container/%s/exec/?" % container.uuid
-
-    if command:
-        escaped_cmd = []
-        for c in command:
-            if r'"' in c:
-                c = c.replace(r'"', r'\"')
-            if " " in c:
-                c = '"%s"' % c
-            escaped_cmd.append(c)
-
-        escaped_cmd = " ".join(escaped_cmd)
-        cli_log.debug("escaped command: %s" % escaped_cmd)
-        endpoint = "%s&command=%s" % (endpoint, urllib.quote_plus(escaped_cmd))
-
-    url = "/".join([tutum.stream_url.rstrip("/"), endpoint.lstrip('/')])
+    url = utils.get_exec_url(container.uuid, command)
     invoke_shell(url)
 
 
-def container_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            print(json.dumps(container.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def container_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(utils.fetch_remote_container, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
 def container_logs(identifiers, tail, follow):
     has_exception = False
+    containers = []
     for identifier in identifiers:
         try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            container.logs(tail, follow, utils.container_service_log_handler)
-        except KeyboardInterrupt:
-            pass
+            containers.append(utils.fetch_remote_container(identifier))
         except Exception as e:
             print(e, file=sys.stderr)
             has_exception = True
+    try:
+        if utils.stream_logs(containers, tail, follow, utils.container_service_log_handler):
+            has_exception = True
+    except KeyboardInterrupt:
+        pass
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def container_redeploy(identifiers, not_reuse_volume, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            result = container.redeploy(not not_reuse_volume)
-            utils.sync_action(container, sync)
-            if result:
-                print(container.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def container_redeploy(identifiers, not_reuse_volume, sync, parallel):
+    def _redeploy(identifier):
+        container = utils.fetch_remote_container(identifier)
+        result = container.redeploy(not not_reuse_volume)
+        if result:
+            print(container.uuid)
+        return container
+
+    containers, has_exception = utils.map_for_each(_redeploy, identifiers, parallel)
+    utils.sync_actions(containers, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def container_ps(quiet, status, service, no_trunc):
+def container_ps(quiet, status, service, no_trunc, filters, output_format, watch):
     try:
+        if watch and (quiet or output_format != "table"):
+            raise BadParameter("--watch can only be used with the table output")
         headers = ["NAME", "UUID", "STATUS", "IMAGE", "RUN COMMAND", "EXIT CODE", "DEPLOYED", "PORTS", "NODE", "STACK"]
+        uuid_width = 36 if no_trunc else 8
+        keys = ["name", "uuid", "state", "image_name", "run_command", "exit_code", "deployed_datetime", "ports", "node",
+                "stack"]
+        widths = [24, uuid_width, 14, 32, 20, 9, 14, 20, uuid_width]
 
         service_resrouce_uri = None
         if service:
-            s = tutum.Utils.fetch_remote_service(service, raise_exceptions=False)
+            s = utils.fetch_remote_service(service, raise_exceptions=False)
             if isinstance(s, NonUniqueIdentifier):
                 raise NonUniqueIdentifier(
                     "Identifier %s matches more than one service, please use UUID instead" % service)
@@ -664,21 +814,28 @@ def container_ps(quiet, status, service, no_trunc):
                 raise ObjectNotFound("Identifier '%s' does not match any service" % service)
             service_resrouce_uri = s.resource_uri
 
-        containers = tutum.Container.list(state=status, service=service_resrouce_uri)
+        filters = utils.parse_filters(filters)
+        query = {"state": status, "service": service_resrouce_uri}
 
-        data_list = []
-        long_uuid_list = []
-        stacks = {}
-        for stack in tutum.Stack.list():
-            stacks[stack.resource_uri] = stack.name
-        services = {}
-        for s in tutum.Service.list():
-            services[s.resource_uri] = s.stack
-        nodes = {}
-        for n in tutum.Node.list():
-            nodes[n.resource_uri] = n.uuid
-
-        for container in containers:
+        # fetched while the first page of containers is, and only waited for by the first row that needs them
+        maps = {}
+
+        def _fetch_maps():
+            maps["stacks"] = utils.LazyResourceUriMap(tutum.Stack)
+            maps["services"] = utils.LazyResourceUriMap(tutum.Service, "stack")
+            if not quiet:
+                maps["nodes"] = utils.LazyResourceUriMap(tutum.Node, "uuid")
+
+        def _get_stack_name(container):
+            return maps["stacks"].get(maps["services"].get(container.service))
+
+        def _list():
+            return utils.iter_list(tutum.Container,
+                                   fields=["name", "uuid", "state", "image_name", "run_command", "exit_code",
+                                           "deployed_datetime", "container_ports", "public_dns", "node", "service"],
+                                   filters=filters, prefetch=True, **query)
+
+        def _record(container):
             ports = []
             for index, port in enumerate(container.container_ports):
                 ports_string = ""
@@ -687,10 +844,16 @@ def container_ps(quiet, status, service, no_trunc):
                 ports_string += "%d/%s" % (port['inner_port'], port['protocol'])
                 ports.append(ports_string)
 
-            container_uuid = container.uuid
-            run_command = container.run_command
-            ports_string = ", ".join(ports)
-            node = nodes.get(container.node)
+            return {"name": container.name, "uuid": container.uuid, "state": container.state,
+                    "image_name": container.image_name, "run_command": container.run_command,
+                    "exit_code": container.exit_code, "deployed_datetime": container.deployed_datetime,
+                    "ports": ports, "node": maps["nodes"].get(container.node), "stack": _get_stack_name(container)}
+
+        def _row(record):
+            container_uuid = record["uuid"]
+            run_command = record["run_command"]
+            ports_string = ", ".join(record["ports"])
+            node = record["node"]
             if not no_trunc:
                 container_uuid = container_uuid[:8]
 
@@ -700,82 +863,98 @@ def container_ps(quiet, status, service, no_trunc):
                     ports_string = ports_string[:17] + '...'
                 node = node[:8]
 
-            data_list.append([container.name,
-                              container_uuid,
-                              utils.add_unicode_symbol_to_state(container.state),
-                              container.image_name,
-                              run_command,
-                              container.exit_code,
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(container.deployed_datetime),
-                              ports_string,
-                              node,
-                              stacks.get(services.get(container.service))])
-            long_uuid_list.append(container.uuid)
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", "", "", "", "", ""])
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            return [record["name"],
+                    container_uuid,
+                    utils.add_unicode_symbol_to_state(record["state"]),
+                    record["image_name"],
+                    run_command,
+                    record["exit_code"],
+                    utils.get_humanize_local_datetime_from_utc_datetime_string(record["deployed_datetime"]),
+                    ports_string,
+                    node,
+                    record["stack"]]
+
+        if watch:
+            def _list_rows():
+                _fetch_maps()
+                return [(container.resource_uri, _row(_record(container))) for container in _list()]
+
+            def _fetch_row(resource_uri):
+                container = tutum.Utils.fetch_by_resource_uri(resource_uri)
+                return _row(_record(container)) if utils.match_query(container, filters, **query) else None
+
+            utils.watch_table(headers, "container", _list_rows, _fetch_row,
+                              lambda event: utils.event_may_match(event, filters, **query))
+            return
+
+        _fetch_maps()
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format, widths)
+        indexed_containers = []
+        for container in _list():
+            indexed_containers.append(_IndexedContainer(getattr(container, "resource_uri", None), container.uuid,
+                                                        container.name, container.service))
+            if quiet:
+                print(container.uuid)
+                continue
+
+            record = _record(container)
+            writer.write(_row(record), record)
+        if writer:
+            writer.close()
+
+        cache.index_objects("container", indexed_containers, _get_stack_name,
+                            complete=not status and not service and not filters)
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def container_start(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            result = container.start()
-            utils.sync_action(container, sync)
-            if result:
-                print(container.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def container_start(identifiers, sync, parallel):
+    def _start(identifier):
+        container = utils.fetch_remote_container(identifier)
+        result = container.start()
+        if result:
+            print(container.uuid)
+        return container
+
+    containers, has_exception = utils.map_for_each(_start, identifiers, parallel)
+    utils.sync_actions(containers, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def container_stop(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            result = container.stop()
-            utils.sync_action(container, sync)
-            if result:
-                print(container.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def container_stop(identifiers, sync, parallel):
+    def _stop(identifier):
+        container = utils.fetch_remote_container(identifier)
+        result = container.stop()
+        if result:
+            print(container.uuid)
+        return container
+
+    containers, has_exception = utils.map_for_each(_stop, identifiers, parallel)
+    utils.sync_actions(containers, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def container_terminate(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            container = tutum.Utils.fetch_remote_container(identifier)
-            result = container.delete()
-            utils.sync_action(container, sync)
-            if result:
-                print(container.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def container_terminate(identifiers, sync, parallel):
+    def _terminate(identifier):
+        container = utils.fetch_remote_container(identifier)
+        result = container.delete()
+        if result:
+            print(container.uuid)
+        return container
+
+    containers, has_exception = utils.map_for_each(_terminate, identifiers, parallel)
+    utils.sync_actions(containers, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def image_list(quiet, jumpstarts_image, private_image, user_image, all_image, no_trunc):
+def image_list(quiet, jumpstarts_image, private_image, user_image, all_image, no_trunc, filters, output_format):
     try:
         headers = ["NAME", "#TAG", "IN_USE", "PRIVATE", "TUTUM_BUILD", "DESCRIPTION"]
-        data_list = []
-        name_list = []
+        keys = ["name", "tags", "in_use", "is_private_image", "tutum_build", "description"]
 
         param = {}
         if jumpstarts_image:
@@ -789,59 +968,57 @@ def image_list(quiet, jumpstarts_image, private_image, user_image, all_image, no
         else:
             param["is_user_image"] = True
 
-        image_list = tutum.Image.list(**param)
-        if len(image_list) != 0:
-            for image in image_list:
-                data = [image.name, len(image.tags)]
+        image_list = utils.iter_list(tutum.Image,
+                                     fields=["name", "tags", "in_use", "is_private_image", "build_source",
+                                             "description"],
+                                     filters=utils.parse_filters(filters), **param)
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
+        for image in image_list:
+            if quiet:
+                print(image.name)
+                continue
 
-                if image.in_use:
-                    data.append("yes")
-                else:
-                    data.append("no")
+            data = [image.name, len(image.tags)]
 
-                if image.is_private_image:
-                    data.append("yes")
-                else:
-                    data.append("no")
+            if image.in_use:
+                data.append("yes")
+            else:
+                data.append("no")
 
-                if image.build_source:
-                    data.append("yes")
-                else:
-                    data.append("no")
+            if image.is_private_image:
+                data.append("yes")
+            else:
+                data.append("no")
 
-                description = image.description
-                if not no_trunc and description and len(description) > 40:
-                    description = description[:36] + ' ...'
-                data.append(description)
+            if image.build_source:
+                data.append("yes")
+            else:
+                data.append("no")
 
-                data_list.append(data)
-                name_list.append(image.name)
-        else:
-            data_list.append(["", "", "", "", ""])
+            description = image.description
+            if not no_trunc and description and len(description) > 40:
+                description = description[:36] + ' ...'
+            data.append(description)
 
-        if quiet:
-            for name in name_list:
-                print(name)
-        else:
-            utils.tabulate_result(data_list, headers)
+            writer.write(data, {"name": image.name, "tags": image.tags, "in_use": image.in_use,
+                                "is_private_image": image.is_private_image, "tutum_build": bool(image.build_source),
+                                "description": image.description})
+        if writer:
+            writer.close()
 
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def image_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
+def image_inspect(identifiers, output_format, parallel):
+    def _fetch(identifier):
         try:
-            try:
-                image = tutum.Image.fetch(identifier)
-            except Exception:
-                raise ObjectNotFound("Cannot find an image with the identifier '%s'" % identifier)
-            print(json.dumps(image.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+            return tutum.Image.fetch(identifier)
+        except Exception:
+            raise ObjectNotFound("Cannot find an image with the identifier '%s'" % identifier)
+
+    has_exception = utils.inspect_objects(_fetch, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -876,16 +1053,18 @@ def image_push(name, public):
 
 def image_rm(repositories, sync):
     has_exception = False
+    images = []
     for repository in repositories:
         try:
             image = tutum.Image.fetch(repository)
             result = image.delete()
-            utils.sync_action(image, sync)
+            images.append(image)
             if result:
                 print(repository)
         except Exception as e:
             print(e, file=sys.stderr)
             has_exception = True
+    utils.sync_actions(images, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -933,12 +1112,12 @@ def image_update(repositories, username, password, description, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def image_tag_list(jumpstarts_image, private_image, user_image, all_image, identifiers):
+def image_tag_list(jumpstarts_image, private_image, user_image, all_image, identifiers, output_format):
     has_exception = False
     tag_match = re.compile("/api/v1/image/.*/tag/(.*)/")
     try:
         headers = ["NAME", "TAG"]
-        data_list = []
+        keys = ["name", "tags"]
         param = {}
         if not identifiers:
             if jumpstarts_image:
@@ -952,23 +1131,19 @@ def image_tag_list(jumpstarts_image, private_image, user_image, all_image, ident
             else:
                 param["is_user_image"] = True
 
-        image_list = tutum.Image.list(**param)
-        if len(image_list) != 0:
-            for image in image_list:
-                if identifiers and image.name not in identifiers:
-                    continue
-                tags = []
-                if image.tags:
-                    for tag in image.tags:
-                        match = tag_match.search(tag)
-                        if match:
-                            tags.append(match.group(1))
-                data_list.append([image.name, ", ".join(sorted(tags))])
-
-        if not data_list:
-            data_list.append(["", ""])
-
-        utils.tabulate_result(data_list, headers)
+        writer = utils.ListWriter(headers, keys, output_format)
+        for image in utils.iter_list(tutum.Image, fields=["name", "tags"], **param):
+            if identifiers and image.name not in identifiers:
+                continue
+            tags = []
+            if image.tags:
+                for tag in image.tags:
+                    match = tag_match.search(tag)
+                    if match:
+                        tags.append(match.group(1))
+            tags.sort()
+            writer.write([image.name, ", ".join(tags)], {"name": image.name, "tags": tags})
+        writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         has_exception = True
@@ -976,27 +1151,23 @@ def image_tag_list(jumpstarts_image, private_image, user_image, all_image, ident
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def image_tag_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
+def image_tag_inspect(identifiers, output_format, parallel):
+    def _fetch(identifier):
+        terms = identifier.split(":", 1)
+        if len(terms) == 2:
+            name = terms[0]
+            tag = terms[1]
+        else:
+            name = terms[0]
+            tag = "latest"
+
         try:
-            if identifier:
-                terms = identifier.split(":", 1)
-                if len(terms) == 2:
-                    name = terms[0]
-                    tag = terms[1]
-                else:
-                    name = terms[0]
-                    tag = "latest"
+            return tutum.ImageTag.fetch(name, tag)
+        except Exception:
+            raise ObjectNotFound("Cannot find an image tag with the identifier '%s'" % identifier)
 
-                try:
-                    image = tutum.ImageTag.fetch(name, tag)
-                except Exception:
-                    raise ObjectNotFound("Cannot find an image tag with the identifier '%s'" % identifier)
-                print(json.dumps(image.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+    has_exception = utils.inspect_objects(_fetch, [identifier for identifier in identifiers if identifier],
+                                          output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -1027,78 +1198,93 @@ def image_tag_build(identifiers, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def node_list(quiet):
+def node_list(quiet, filters, output_format, watch):
     try:
+        if watch and (quiet or output_format != "table"):
+            raise BadParameter("--watch can only be used with the table output")
         headers = ["UUID", "FQDN", "LASTSEEN", "STATUS", "CLUSTER", "DOCKER_VER"]
-        node_list = tutum.Node.list()
-        data_list = []
-        long_uuid_list = []
-        for node in node_list:
-            cluster_name = node.node_cluster
-            try:
-                cluster_name = tutum.NodeCluster.fetch(node.node_cluster.strip("/").split("/")[-1]).name
-            except:
-                pass
+        keys = ["uuid", "external_fqdn", "last_seen", "state", "node_cluster", "docker_version"]
+        filters = utils.parse_filters(filters)
+        nodeclusters = {}
+
+        def _list():
+            return utils.iter_list(tutum.Node,
+                                   fields=["uuid", "external_fqdn", "last_seen", "state", "node_cluster",
+                                           "docker_version"],
+                                   filters=filters)
+
+        def _row(node):
+            return [node.uuid[:8],
+                    node.external_fqdn,
+                    utils.get_humanize_local_datetime_from_utc_datetime_string(node.last_seen),
+                    utils.add_unicode_symbol_to_state(node.state),
+                    nodeclusters.get(node.node_cluster) or node.node_cluster, node.docker_version]
+
+        if watch:
+            def _list_rows():
+                nodeclusters.update(utils.get_resource_uri_map(tutum.NodeCluster))
+                return [(node.resource_uri, _row(node)) for node in _list()]
+
+            def _fetch_row(resource_uri):
+                node = tutum.Utils.fetch_by_resource_uri(resource_uri)
+                return _row(node) if utils.match_query(node, filters) else None
+
+            utils.watch_table(headers, "node", _list_rows, _fetch_row,
+                              lambda event: utils.event_may_match(event, filters))
+            return
+
+        indexed_nodes = []
+        writer = None
+        if not quiet:
+            nodeclusters = utils.get_resource_uri_map(tutum.NodeCluster)
+            writer = utils.ListWriter(headers, keys, output_format)
+        for node in _list():
+            indexed_nodes.append(node)
+            if quiet:
+                print(node.uuid)
+                continue
 
-            data_list.append([node.uuid[:8],
-                              node.external_fqdn,
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(node.last_seen),
-                              utils.add_unicode_symbol_to_state(node.state),
-                              cluster_name, node.docker_version])
-            long_uuid_list.append(node.uuid)
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", "", ""])
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            record = dict((key, getattr(node, key, None)) for key in keys)
+            record["node_cluster"] = nodeclusters.get(node.node_cluster) or node.node_cluster
+            writer.write(_row(node), record)
+        cache.index_objects("node", indexed_nodes, complete=not filters)
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def node_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            node = tutum.Utils.fetch_remote_node(identifier)
-            print(json.dumps(tutum.Node.fetch(node.uuid).get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def node_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(utils.fetch_remote_node, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def node_rm(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            node = tutum.Utils.fetch_remote_node(identifier)
-            result = node.delete()
-            utils.sync_action(node, sync)
-            if result:
-                print(node.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def node_rm(identifiers, sync, parallel):
+    def _rm(identifier):
+        node = utils.fetch_remote_node(identifier)
+        result = node.delete()
+        if result:
+            print(node.uuid)
+        return node
+
+    nodes, has_exception = utils.map_for_each(_rm, identifiers, parallel)
+    utils.sync_actions(nodes, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def node_upgrade(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            node = tutum.Utils.fetch_remote_node(identifier)
-            result = node.upgrade_docker()
-            utils.sync_action(node, sync)
-            if result:
-                print(node.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def node_upgrade(identifiers, sync, parallel):
+    def _upgrade(identifier):
+        node = utils.fetch_remote_node(identifier)
+        result = node.upgrade_docker()
+        if result:
+            print(node.uuid)
+        return node
+
+    nodes, has_exception = utils.map_for_each(_upgrade, identifiers, parallel)
+    utils.sync_actions(nodes, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -1107,7 +1293,7 @@ def node_healthcheck(identifiers):
     has_exception = False
     for identifier in identifiers:
         try:
-            node = tutum.Utils.fetch_remote_node(identifier)
+            node = utils.fetch_remote_node(identifier)
             result = node.health_check()
             if result:
                 print(node.uuid)
@@ -1135,65 +1321,58 @@ def node_byo():
     print()
 
 
-def nodecluster_list(quiet):
+def nodecluster_list(quiet, refresh, output_format):
     try:
         headers = ["NAME", "UUID", "REGION", "TYPE", "DEPLOYED", "STATUS", "CURRENT#NODES", "TARGET#NODES"]
+        keys = ["name", "uuid", "region", "node_type", "deployed_datetime", "state", "current_num_nodes",
+                "target_num_nodes"]
         nodecluster_list = tutum.NodeCluster.list()
-        data_list = []
-        long_uuid_list = []
+        cache.index_objects("nodecluster", nodecluster_list, complete=True)
+        node_types = {}
+        regions = {}
+        writer = None
+        if not quiet:
+            for nodetype in cache.list_reference_data(tutum.NodeType, refresh):
+                node_types[nodetype.resource_uri] = nodetype.label
+            for region in cache.list_reference_data(tutum.Region, refresh):
+                regions[region.resource_uri] = region.label
+            writer = utils.ListWriter(headers, keys, output_format)
         for nodecluster in nodecluster_list:
             if quiet:
-                long_uuid_list.append(nodecluster.uuid)
+                print(nodecluster.uuid)
                 continue
 
-            node_type = nodecluster.node_type
-            region = nodecluster.region
-            try:
-                node_type = tutum.NodeType.fetch(nodecluster.node_type.strip("/").split("api/v1/nodetype/")[-1]).label
-                region = tutum.Region.fetch(nodecluster.region.strip("/").split("api/v1/region/")[-1]).label
-            except Exception:
-                pass
-
-            data_list.append([nodecluster.name,
-                              nodecluster.uuid[:8],
-                              region,
-                              node_type,
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(nodecluster.deployed_datetime),
-                              nodecluster.state,
-                              nodecluster.current_num_nodes,
-                              nodecluster.target_num_nodes])
-            long_uuid_list.append(nodecluster.uuid)
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", "", "", "", ""])
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            node_type = node_types.get(nodecluster.node_type) or nodecluster.node_type
+            region = regions.get(nodecluster.region) or nodecluster.region
+            record = dict((key, getattr(nodecluster, key, None)) for key in keys)
+            record.update(region=region, node_type=node_type)
+            writer.write([nodecluster.name,
+                          nodecluster.uuid[:8],
+                          region,
+                          node_type,
+                          utils.get_humanize_local_datetime_from_utc_datetime_string(nodecluster.deployed_datetime),
+                          nodecluster.state,
+                          nodecluster.current_num_nodes,
+                          nodecluster.target_num_nodes], record)
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            nodecluster = tutum.Utils.fetch_remote_nodecluster(identifier)
-            print(json.dumps(tutum.NodeCluster.fetch(nodecluster.uuid).get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def nodecluster_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(utils.fetch_remote_nodecluster, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_show_providers(quiet):
+def nodecluster_show_providers(quiet, refresh):
     try:
         headers = ["NAME", "LABEL"]
         data_list = []
         name_list = []
-        provider_list = tutum.Provider.list()
+        provider_list = cache.list_reference_data(tutum.Provider, refresh)
         for provider in provider_list:
             if quiet:
                 name_list.append(provider.name)
@@ -1213,11 +1392,11 @@ def nodecluster_show_providers(quiet):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_show_regions(provider):
+def nodecluster_show_regions(provider, refresh):
     try:
         headers = ["NAME", "LABEL", "PROVIDER"]
         data_list = []
-        region_list = tutum.Region.list()
+        region_list = cache.list_reference_data(tutum.Region, refresh)
         for region in region_list:
             provider_name = region.resource_uri.strip("/").split("/")[-2]
             if provider and provider != provider_name:
@@ -1232,11 +1411,11 @@ def nodecluster_show_regions(provider):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_show_types(provider, region):
+def nodecluster_show_types(provider, region, refresh):
     try:
         headers = ["NAME", "LABEL", "PROVIDER", "REGIONS"]
         data_list = []
-        nodetype_list = tutum.NodeType.list()
+        nodetype_list = cache.list_reference_data(tutum.NodeType, refresh)
         for nodetype in nodetype_list:
             provider_name = nodetype.resource_uri.strip("/").split("/")[-2]
             regions = [region_uri.strip("/").split("/")[-1] for region_uri in nodetype.regions]
@@ -1297,59 +1476,53 @@ def nodecluster_create(target_num_nodes, name, provider, region, nodetype, sync,
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_rm(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            nodecluster = tutum.Utils.fetch_remote_nodecluster(identifier)
-            result = nodecluster.delete()
-            utils.sync_action(nodecluster, sync)
-            if result:
-                print(nodecluster.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def nodecluster_rm(identifiers, sync, parallel):
+    def _rm(identifier):
+        nodecluster = utils.fetch_remote_nodecluster(identifier)
+        result = nodecluster.delete()
+        if result:
+            print(nodecluster.uuid)
+        return nodecluster
+
+    nodeclusters, has_exception = utils.map_for_each(_rm, identifiers, parallel)
+    utils.sync_actions(nodeclusters, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_scale(identifiers, target_num_nodes, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            nodecluster = tutum.Utils.fetch_remote_nodecluster(identifier)
-            nodecluster.target_num_nodes = target_num_nodes
-            result = nodecluster.save()
-            utils.sync_action(nodecluster, sync)
-            if result:
-                print(nodecluster.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def nodecluster_scale(identifiers, target_num_nodes, sync, parallel):
+    def _scale(identifier):
+        nodecluster = utils.fetch_remote_nodecluster(identifier)
+        nodecluster.target_num_nodes = target_num_nodes
+        result = nodecluster.save()
+        if result:
+            print(nodecluster.uuid)
+        return nodecluster
+
+    nodeclusters, has_exception = utils.map_for_each(_scale, identifiers, parallel)
+    utils.sync_actions(nodeclusters, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_upgrade(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            nodecluster = tutum.Utils.fetch_remote_nodecluster(identifier)
-            result = nodecluster.upgrade_docker()
-            utils.sync_action(nodecluster, sync)
-            if result:
-                print(nodecluster.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def nodecluster_upgrade(identifiers, sync, parallel):
+    def _upgrade(identifier):
+        nodecluster = utils.fetch_remote_nodecluster(identifier)
+        result = nodecluster.upgrade_docker()
+        if result:
+            print(nodecluster.uuid)
+        return nodecluster
+
+    nodeclusters, has_exception = utils.map_for_each(_upgrade, identifiers, parallel)
+    utils.sync_actions(nodeclusters, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def nodecluster_az(quiet):
+def nodecluster_az(quiet, refresh):
     try:
         headers = ["NANE", "AVAIABLE", "RESOURCE URI"]
-        az_list = tutum.AZ.list()
+        az_list = cache.list_reference_data(tutum.AZ, refresh)
         data_list = []
         long_uuid_list = []
         for az in az_list:
@@ -1369,21 +1542,11 @@ def nodecluster_az(quiet):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def tag_add(identifiers, tags):
+def tag_add(identifiers, tags, resource_type):
     has_exception = False
     for identifier in identifiers:
         try:
-            try:
-                obj = tutum.Utils.fetch_remote_service(identifier)
-            except ObjectNotFound:
-                try:
-                    obj = tutum.Utils.fetch_remote_nodecluster(identifier)
-                except ObjectNotFound:
-                    try:
-                        obj = tutum.Utils.fetch_remote_node(identifier)
-                    except ObjectNotFound:
-                        raise ObjectNotFound(
-                            "Identifier '%s' does not match any service, node or nodecluster" % identifier)
+            obj, _ = utils.fetch_remote_taggable(identifier, resource_type)
 
             tag = tutum.Tag.fetch(obj)
             tag.add(tags)
@@ -1396,28 +1559,15 @@ def tag_add(identifiers, tags):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def tag_list(identifiers, quiet):
+def tag_list(identifiers, quiet, resource_type, output_format):
     has_exception = False
 
     headers = ["IDENTIFIER", "TYPE", "TAGS"]
-    data_list = []
-    tags_list = []
+    keys = ["identifier", "type", "tags"]
+    writer = None if quiet else utils.ListWriter(headers, keys, output_format)
     for identifier in identifiers:
         try:
-            obj = tutum.Utils.fetch_remote_service(identifier, raise_exceptions=False)
-            if isinstance(obj, ObjectNotFound):
-                obj = tutum.Utils.fetch_remote_nodecluster(identifier, raise_exceptions=False)
-                if isinstance(obj, ObjectNotFound):
-                    obj = tutum.Utils.fetch_remote_node(identifier, raise_exceptions=False)
-                    if isinstance(obj, ObjectNotFound):
-                        raise ObjectNotFound(
-                            "Identifier '%s' does not match any service, node or nodecluster" % identifier)
-                    else:
-                        obj_type = 'Node'
-                else:
-                    obj_type = 'NodeCluster'
-            else:
-                obj_type = 'Service'
+            obj, obj_type = utils.fetch_remote_taggable(identifier, resource_type)
 
             tagnames = []
             for tags in tutum.Tag.fetch(obj).list():
@@ -1425,40 +1575,31 @@ def tag_list(identifiers, quiet):
                 if tagname:
                     tagnames.append(tagname)
 
-            data_list.append([identifier, obj_type, ' '.join(tagnames)])
-            tags_list.append(' '.join(tagnames))
+            if quiet:
+                print(' '.join(tagnames))
+            else:
+                writer.write([identifier, obj_type, ' '.join(tagnames)],
+                             {"identifier": identifier, "type": obj_type, "tags": tagnames})
         except Exception as e:
-            if isinstance(e, ObjectNotFound):
-                data_list.append([identifier, 'None', ''])
+            if quiet:
+                print('')
+            elif isinstance(e, ObjectNotFound):
+                writer.write([identifier, 'None', ''], {"identifier": identifier, "type": None, "tags": []})
             else:
-                data_list.append([identifier, '', ''])
-            tags_list.append('')
+                writer.write([identifier, '', ''], {"identifier": identifier, "type": None, "tags": []})
             print(e, file=sys.stderr)
             has_exception = True
-    if quiet:
-        for tags in tags_list:
-            print(tags)
-    else:
-        utils.tabulate_result(data_list, headers)
+    if writer:
+        writer.close()
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def tag_rm(identifiers, tags):
+def tag_rm(identifiers, tags, resource_type):
     has_exception = False
     for identifier in identifiers:
         try:
-            try:
-                obj = tutum.Utils.fetch_remote_service(identifier)
-            except ObjectNotFound:
-                try:
-                    obj = tutum.Utils.fetch_remote_nodecluster(identifier)
-                except ObjectNotFound:
-                    try:
-                        obj = tutum.Utils.fetch_remote_node(identifier)
-                    except ObjectNotFound:
-                        raise ObjectNotFound(
-                            "Identifier '%s' does not match any service, node or nodecluster" % identifier)
+            obj, _ = utils.fetch_remote_taggable(identifier, resource_type)
 
             tag = tutum.Tag.fetch(obj)
             for t in tags:
@@ -1475,21 +1616,11 @@ def tag_rm(identifiers, tags):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def tag_set(identifiers, tags):
+def tag_set(identifiers, tags, resource_type):
     has_exception = False
     for identifier in identifiers:
         try:
-            try:
-                obj = tutum.Utils.fetch_remote_service(identifier)
-            except ObjectNotFound:
-                try:
-                    obj = tutum.Utils.fetch_remote_nodecluster(identifier)
-                except ObjectNotFound:
-                    try:
-                        obj = tutum.Utils.fetch_remote_node(identifier)
-                    except ObjectNotFound:
-                        raise ObjectNotFound(
-                            "Identifier '%s' does not match any service, node or nodecluster" % identifier)
+            obj, _ = utils.fetch_remote_taggable(identifier, resource_type)
 
             obj.tags = []
             for t in tags:
@@ -1507,80 +1638,56 @@ def tag_set(identifiers, tags):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def volume_list(quiet):
+def volume_list(quiet, output_format):
     try:
         headers = ["UUID", "STATE", "NODE", "VOLUMEGROUP"]
-        data_list = []
-        uuid_list = []
+        keys = ["uuid", "state", "node", "volume_group"]
         volume_list = tutum.Volume.list()
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         for volume in volume_list:
             if quiet:
-                uuid_list.append(volume.uuid)
+                print(volume.uuid)
                 continue
 
-            data_list.append([volume.uuid, volume.state,
-                              volume.node.strip("/").split("/")[-1],
-                              volume.volume_group.strip("/").split("/")[-1]])
-
-        if len(data_list) == 0:
-            data_list.append(["", "", "", ""])
-        if quiet:
-            for uuid in uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            node = volume.node.strip("/").split("/")[-1]
+            volume_group = volume.volume_group.strip("/").split("/")[-1]
+            writer.write([volume.uuid, volume.state, node, volume_group],
+                         {"uuid": volume.uuid, "state": volume.state, "node": node, "volume_group": volume_group})
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def volume_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            volume = tutum.Utils.fetch_remote_volume(identifier)
-            print(json.dumps(volume.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def volume_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(tutum.Utils.fetch_remote_volume, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def volumegroup_list(quiet):
+def volumegroup_list(quiet, output_format):
     try:
         headers = ["NAME", "UUID", "STATE"]
-        data_list = []
-        uuid_list = []
+        keys = ["name", "uuid", "state"]
         volumegroup_list = tutum.VolumeGroup.list()
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         for volumegroup in volumegroup_list:
             if quiet:
-                uuid_list.append(volumegroup.uuid)
+                print(volumegroup.uuid)
                 continue
 
-            data_list.append([volumegroup.name, volumegroup.uuid, volumegroup.state])
-
-        if len(data_list) == 0:
-            data_list.append(["", "", ""])
-        if quiet:
-            for uuid in uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            writer.write([volumegroup.name, volumegroup.uuid, volumegroup.state],
+                         {"name": volumegroup.name, "uuid": volumegroup.uuid, "state": volumegroup.state})
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def volumegroup_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            volumegroup = tutum.Utils.fetch_remote_volumegroup(identifier)
-            print(json.dumps(volumegroup.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def volumegroup_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(tutum.Utils.fetch_remote_volumegroup, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
@@ -1588,7 +1695,7 @@ def volumegroup_inspect(identifiers):
 def trigger_create(identifier, name, operation):
     has_exception = False
     try:
-        service = tutum.Utils.fetch_remote_service(identifier)
+        service = utils.fetch_remote_service(identifier)
         trigger = tutum.Trigger.fetch(service)
         trigger.add(name, operation)
         trigger.save()
@@ -1600,25 +1707,24 @@ def trigger_create(identifier, name, operation):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def trigger_list(identifier, quiet):
+def trigger_list(identifier, quiet, output_format):
     headers = ["UUID", "NAME", "OPERATION", "URL"]
-    data_list = []
-    uuid_list = []
+    keys = ["uuid", "name", "operation", "url"]
     try:
-        service = tutum.Utils.fetch_remote_service(identifier)
+        service = utils.fetch_remote_service(identifier)
         trigger = tutum.Trigger.fetch(service)
         triggers = trigger.list()
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         for t in triggers:
+            if quiet:
+                print(t.get('uuid', ''))
+                continue
+
             url = tutum.rest_host + t.get('url', '/')[1:]
-            data_list.append([t.get('uuid', '')[:8], t.get('name', ''), t.get('operation', ''), url])
-            uuid_list.append(t.get('uuid', ''))
-        if quiet:
-            for uuid in uuid_list:
-                print(uuid)
-        else:
-            if len(data_list) == 0:
-                data_list.append(['', '', '', ''])
-            utils.tabulate_result(data_list, headers)
+            writer.write([t.get('uuid', '')[:8], t.get('name', ''), t.get('operation', ''), url],
+                         {"uuid": t.get('uuid'), "name": t.get('name'), "operation": t.get('operation'), "url": url})
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
 
@@ -1626,7 +1732,7 @@ def trigger_list(identifier, quiet):
 def trigger_rm(identifier, trigger_identifiers):
     has_exception = False
     try:
-        service = tutum.Utils.fetch_remote_service(identifier)
+        service = utils.fetch_remote_service(identifier)
         trigger = tutum.Trigger.fetch(service)
         uuid_list = utils.get_uuids_of_trigger(trigger, trigger_identifiers)
         try:
@@ -1668,113 +1774,96 @@ def stack_create(name, stackfile, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            stack = tutum.Utils.fetch_remote_stack(identifier)
-            print(json.dumps(stack.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def stack_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(utils.fetch_remote_stack, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_list(quiet):
+def stack_list(quiet, output_format):
     try:
         headers = ["NAME", "UUID", "STATUS", "DEPLOYED", "DESTROYED"]
+        keys = ["name", "uuid", "state", "deployed_datetime", "destroyed_datetime"]
         stack_list = tutum.Stack.list()
-        data_list = []
-        long_uuid_list = []
+        cache.index_objects("stack", stack_list, complete=True)
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         for stack in stack_list:
-            data_list.append([stack.name,
-                              stack.uuid[:8],
-                              utils.add_unicode_symbol_to_state(stack.state),
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(stack.deployed_datetime),
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(stack.destroyed_datetime)])
-            long_uuid_list.append(stack.uuid)
-
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", ""])
+            if quiet:
+                print(stack.uuid)
+                continue
 
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            writer.write([stack.name,
+                          stack.uuid[:8],
+                          utils.add_unicode_symbol_to_state(stack.state),
+                          utils.get_humanize_local_datetime_from_utc_datetime_string(stack.deployed_datetime),
+                          utils.get_humanize_local_datetime_from_utc_datetime_string(stack.destroyed_datetime)],
+                         dict((key, getattr(stack, key, None)) for key in keys))
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_redeploy(identifiers, not_reuse_volume, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            stack = tutum.Utils.fetch_remote_stack(identifier)
-            result = stack.redeploy(not not_reuse_volume)
-            utils.sync_action(stack, sync)
-            if result:
-                print(stack.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def stack_redeploy(identifiers, not_reuse_volume, sync, parallel):
+    def _redeploy(identifier):
+        stack = utils.fetch_remote_stack(identifier)
+        result = stack.redeploy(not not_reuse_volume)
+        if result:
+            print(stack.uuid)
+        return stack
+
+    stacks, has_exception = utils.map_for_each(_redeploy, identifiers, parallel)
+    utils.sync_actions(stacks, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_start(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            stack = tutum.Utils.fetch_remote_stack(identifier)
-            result = stack.start()
-            utils.sync_action(stack, sync)
-            if result:
-                print(stack.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def stack_start(identifiers, sync, parallel):
+    def _start(identifier):
+        stack = utils.fetch_remote_stack(identifier)
+        result = stack.start()
+        if result:
+            print(stack.uuid)
+        return stack
+
+    stacks, has_exception = utils.map_for_each(_start, identifiers, parallel)
+    utils.sync_actions(stacks, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_stop(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            stack = tutum.Utils.fetch_remote_stack(identifier)
-            result = stack.stop()
-            utils.sync_action(stack, sync)
-            if result:
-                print(stack.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def stack_stop(identifiers, sync, parallel):
+    def _stop(identifier):
+        stack = utils.fetch_remote_stack(identifier)
+        result = stack.stop()
+        if result:
+            print(stack.uuid)
+        return stack
+
+    stacks, has_exception = utils.map_for_each(_stop, identifiers, parallel)
+    utils.sync_actions(stacks, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def stack_terminate(identifiers, sync):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            stack = tutum.Utils.fetch_remote_stack(identifier)
-            result = stack.delete()
-            utils.sync_action(stack, sync)
-            if result:
-                print(stack.uuid)
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def stack_terminate(identifiers, sync, parallel):
+    def _terminate(identifier):
+        stack = utils.fetch_remote_stack(identifier)
+        result = stack.delete()
+        if result:
+            print(stack.uuid)
+        return stack
+
+    stacks, has_exception = utils.map_for_each(_terminate, identifiers, parallel)
+    utils.sync_actions(stacks, sync)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
 def stack_update(identifier, stackfile, sync):
     try:
-        stack = utils.load_stack_file(name=None, stackfile=stackfile, stack=tutum.Utils.fetch_remote_stack(identifier))
+        stack = utils.load_stack_file(name=None, stackfile=stackfile, stack=utils.fetch_remote_stack(identifier))
         result = stack.save()
         utils.sync_action(stack, sync)
         if result:
@@ -1785,8 +1874,10 @@ def stack_update(identifier, stackfile, sync):
 
 
 def stack_export(identifier, stackfile):
+    import yaml
+
     try:
-        stack = tutum.Utils.fetch_remote_stack(identifier)
+        stack = utils.fetch_remote_stack(identifier)
         content = stack.export()
         if content:
             print(stackfile)
@@ -1801,69 +1892,52 @@ def stack_export(identifier, stackfile):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def action_inspect(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            action = tutum.Utils.fetch_remote_action(identifier)
-            print(json.dumps(action.get_all_attributes(), indent=2))
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
+def action_inspect(identifiers, output_format, parallel):
+    has_exception = utils.inspect_objects(tutum.Utils.fetch_remote_action, identifiers, output_format, parallel)
     if has_exception:
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def action_cancel(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            action = tutum.Utils.fetch_remote_action(identifier)
-            action.cancel()
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
-    if has_exception:
+def action_cancel(identifiers, parallel):
+    def _cancel(identifier):
+        action = tutum.Utils.fetch_remote_action(identifier)
+        action.cancel()
+
+    if utils.run_for_each(_cancel, identifiers, parallel):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def action_retry(identifiers):
-    has_exception = False
-    for identifier in identifiers:
-        try:
-            action = tutum.Utils.fetch_remote_action(identifier)
-            action.retry()
-        except Exception as e:
-            print(e, file=sys.stderr)
-            has_exception = True
-    if has_exception:
+def action_retry(identifiers, parallel):
+    def _retry(identifier):
+        action = tutum.Utils.fetch_remote_action(identifier)
+        action.retry()
+
+    if utils.run_for_each(_retry, identifiers, parallel):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def action_list(quiet, last):
+def action_list(quiet, last, output_format):
     try:
         headers = ["UUID", "ACTION", "START", "END", "TARGET", "IP", "LOCATION"]
+        keys = ["uuid", "action", "start_date", "end_date", "target", "ip", "location"]
         action_list = tutum.Action.list(25 if not last else last)
-        data_list = []
-        long_uuid_list = []
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         for action in action_list:
+            if quiet:
+                print(action.uuid)
+                continue
+
             terms = action.object.strip("/").split("/", 3)
             target = terms[3] if len(terms) == 4 else ""
-            data_list.append([action.uuid[:8],
-                              action.action,
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(action.start_date),
-                              utils.get_humanize_local_datetime_from_utc_datetime_string(action.end_date),
-                              target, action.ip, action.location])
-            long_uuid_list.append(action.uuid)
-
-        if len(data_list) == 0:
-            data_list.append(["", "", "", "", ""])
-
-        if quiet:
-            for uuid in long_uuid_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+            record = dict((key, getattr(action, key, None)) for key in keys)
+            record["target"] = target
+            writer.write([action.uuid[:8],
+                          action.action,
+                          utils.get_humanize_local_datetime_from_utc_datetime_string(action.start_date),
+                          utils.get_humanize_local_datetime_from_utc_datetime_string(action.end_date),
+                          target, action.ip, action.location], record)
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         sys.exit(EXCEPTION_EXIT_CODE)
@@ -1892,7 +1966,7 @@ def service_env_add(identifiers, envvars, envfiles, redeploy, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
+            service = utils.fetch_remote_service(identifier)
             existing_envvar_keys = [env["key"] for env in service.calculated_envvars]
             new_envvars = []
             for envvar in input_envvars:
@@ -1931,30 +2005,25 @@ def service_env_add(identifiers, envvars, envfiles, redeploy, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
 
 
-def service_env_list(identifier, quiet, origin_user, origin_image, origin_tutum):
+def service_env_list(identifier, quiet, origin_user, origin_image, origin_tutum, output_format):
     has_exception = False
     try:
-        service = tutum.Utils.fetch_remote_service(identifier)
+        service = utils.fetch_remote_service(identifier)
         headers = ["ORIGIN", "KEY", "VALUE"]
-        data_list = []
-        key_value_list = []
+        keys = ["origin", "key", "value"]
+        writer = None if quiet else utils.ListWriter(headers, keys, output_format)
         origin_all = not origin_user and not origin_image and not origin_tutum
         for envvars in service.calculated_envvars:
             if origin_all or \
                     (origin_user and envvars["origin"] == "user") or \
                     (origin_image and envvars["origin"] == "image") or \
                     (origin_tutum and envvars["origin"] == "tutum"):
-                data_list.append([envvars["origin"], envvars["key"], envvars["value"]])
-                key_value_list.append("%s=%s" % (envvars["key"], envvars["value"]))
-
-        if len(data_list) == 0:
-            data_list.append(["", "", ""])
-
-        if quiet:
-            for uuid in key_value_list:
-                print(uuid)
-        else:
-            utils.tabulate_result(data_list, headers)
+                if quiet:
+                    print("%s=%s" % (envvars["key"], envvars["value"]))
+                else:
+                    writer.write([envvars["origin"], envvars["key"], envvars["value"]], envvars)
+        if writer:
+            writer.close()
     except Exception as e:
         print(e, file=sys.stderr)
         has_exception = True
@@ -1969,7 +2038,7 @@ def service_env_remove(identifiers, names, redeploy, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
+            service = utils.fetch_remote_service(identifier)
             existing_envvar_keys = [env["key"] for env in service.calculated_envvars if env["origin"] == "user"]
 
             names_to_be_removed = []
@@ -2017,7 +2086,7 @@ def service_env_set(identifiers, envvars, envfiles, redeploy, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
+            service = utils.fetch_remote_service(identifier)
             service.container_envvars = input_envvars
             result = service.save()
             utils.sync_action(service, sync)
@@ -2047,7 +2116,7 @@ def service_env_update(identifiers, envvars, envfiles, redeploy, sync):
         sys.exit(EXCEPTION_EXIT_CODE)
     for identifier in identifiers:
         try:
-            service = tutum.Utils.fetch_remote_service(identifier)
+            service = utils.fetch_remote_service(identifier)
             existing_envvar_keys = [env["key"] for env in service.calculated_envvars]
             new_envvars = []
             for envvar in input_envvars:
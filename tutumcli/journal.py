@@ -0,0 +1,102 @@
+import json
+import os
+import re
+
+from tutumcli import cache
+
+JOURNAL_SEGMENT_SIZE = 16 * 1024 * 1024
+JOURNAL_MAX_SEGMENTS = 8
+SEGMENT_NAME = re.compile(r"^events-(\d{20})\.ndjson$")
+
+
+def get_journal_dir():
+    return cache.get_cache_path("events")
+
+
+class EventJournal(object):
+    """Append-only log of Tutum events, stored as compact JSON lines in size-rotated segment files
+
+    Every event gets an offset, its sequence number in the journal, so that a consumer can replay the events it
+    missed with ``read(offset)``. A segment is named after the offset of its first event and a new one is started
+    once it grows over ``max_segment_size`` bytes; only the last ``max_segments`` segments are kept.
+    """
+
+    def __init__(self, directory, max_segment_size=JOURNAL_SEGMENT_SIZE, max_segments=JOURNAL_MAX_SEGMENTS):
+        self.directory = directory
+        self.max_segment_size = max_segment_size
+        self.max_segments = max_segments
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.next_offset = 0
+        self.file = None
+        segments = self._segments()
+        if segments:
+            first_offset, path = segments[-1]
+            self.next_offset = first_offset + self._recover(path)
+            self.file = open(path, "ab")
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    @staticmethod
+    def _recover(path):
+        # Drop the last line if it was cut short by a crash, and return the number of events left
+        with open(path, "rb+") as f:
+            content = f.read()
+            end = content.rfind("\n") + 1
+            if end < len(content):
+                f.truncate(end)
+        return content.count("\n", 0, end)
+
+    @property
+    def first_offset(self):
+        segments = self._segments()
+        return segments[0][0] if segments else self.next_offset
+
+    def append(self, event):
+        """Write ``event`` to the journal and return its offset"""
+        if self.file is None or os.fstat(self.file.fileno()).st_size >= self.max_segment_size:
+            self._rotate()
+        self.file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.file.flush()
+        offset = self.next_offset
+        self.next_offset += 1
+        return offset
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, "events-%020d.ndjson" % self.next_offset)
+        self.file = open(path, "ab")
+        for _, old_path in self._segments()[:-self.max_segments]:
+            os.unlink(old_path)
+
+    def read(self, offset=0):
+        """Yield the ``(offset, event)`` pairs of the journal, starting at ``offset`` or at the oldest event kept"""
+        segments = self._segments()
+        for i, (first_offset, path) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][0] <= offset:
+                continue
+            with open(path, "rb") as f:
+                for current, line in enumerate(f, first_offset):
+                    if current >= self.next_offset:
+                        return
+                    if current >= offset:
+                        yield current, json.loads(line)
+
+    def load_state(self):
+        """Return the last known state of the resources, as saved by ``save_state()``"""
+        return cache.load(os.path.join(self.directory, "state.json"), float("inf")) or {}
+
+    def save_state(self, state):
+        cache.save(os.path.join(self.directory, "state.json"), state)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -20,8 +20,27 @@ def add_build_parser(subparsers):
 
 def add_event_parser(subparsers):
     # tutum event
-    subparsers.add_parser('event', help='Get real time tutum events',
-                          description='Get real time tutum events')
+    event_parser = subparsers.add_parser('event', help='Get real time tutum events',
+                                         description='Get real time tutum events')
+    event_parser.add_argument('--type', help='show only events about this type of resource, e.g. container or service '
+                                             '(can be used multiple times)', action='append')
+    event_parser.add_argument('--action', help='show only events of this action, e.g. create, update or delete '
+                                               '(can be used multiple times)', action='append')
+    event_parser.add_argument('--state', help='show only events of resources in this state, e.g. Running '
+                                              '(can be used multiple times)', action='append')
+    event_parser.add_argument('--resource', help='show only events about this resource or its children, by UUID '
+                                                 '(either long or short) or name (can be used multiple times)',
+                              action='append')
+    event_parser.add_argument('--tag', help='show only events about the services, nodes or node clusters with this '
+                                            'tag (can be used multiple times)', action='append')
+    event_parser.add_argument('--format', help='print events as JSON objects, one per line', choices=['ndjson'])
+    event_parser.add_argument('--socket', help='also send the events, as JSON lines, to the clients of a local unix '
+                                               'socket at this path')
+    event_parser.add_argument('--journal', help='keep every event in an on-disk journal (in the tutum cache directory '
+                                                'by default), and catch up with the events missed while disconnected',
+                              nargs='?', const='', metavar='DIRECTORY')
+    event_parser.add_argument('--from', help='replay the events of the journal from this offset before the live ones',
+                              dest='offset', type=int, metavar='OFFSET')
 
 
 def add_push_parser(subparsers):
@@ -115,11 +134,17 @@ def add_action_parser(subparsers):
     inspect_parser = action_subparser.add_parser('inspect', help="Get all details from an action",
                                                  description="Get all details from an action")
     inspect_parser.add_argument('identifier', help="action's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum action list
     list_parser = action_subparser.add_parser('list', help='List actions', description='List actions')
     list_parser.add_argument('-q', '--quiet', help='print only action uuid', action='store_true')
     list_parser.add_argument('-l', '--last', help='Output the last number of actions (default:25)', type=int)
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum action logs
     logs_parser = action_subparser.add_parser('logs', help='Get logs from an action',
@@ -133,11 +158,15 @@ def add_action_parser(subparsers):
     inspect_parser = action_subparser.add_parser('cancel', help="Cancel an action in Pending or In progress state",
                                                  description="Cancels an action in Pending or In progress state")
     inspect_parser.add_argument('identifier', help="action's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                type=int, default=1)
 
     # tutum action retry
     inspect_parser = action_subparser.add_parser('retry', help="Retries an action in Success, Failed or Canceled state",
                                                  description="Retries an action in Success, Failed or Canceled state")
     inspect_parser.add_argument('identifier', help="action's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                type=int, default=1)
 
 
 def add_service_parser(subparsers):
@@ -233,6 +262,8 @@ def add_service_parser(subparsers):
     env_list_parser.add_argument('--user', help='show only user defined environment variables', action='store_true')
     env_list_parser.add_argument('--image', help='show only image defined environment variables', action='store_true')
     env_list_parser.add_argument('--tutum', help='show only tutum defined environment variables', action='store_true')
+    env_list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                                 default='table')
 
     # tutum service env remove
     env_remove_parser = env_subparser.add_parser('remove', help='Remove existing environment variables',
@@ -277,11 +308,27 @@ def add_service_parser(subparsers):
     env_update_parser.add_argument('--redeploy', help="redeploy service with new configuration after set command",
                                    action='store_true')
 
+    # tutum service exec
+    exec_parser = service_subparser.add_parser('exec', help='Run a command in all the running containers of a service',
+                                               description='Run a command in all the running containers of a '
+                                                           'service, printing their output prefixed by container name')
+    exec_parser.add_argument('identifier', help="service's UUID (either long or short) or name[.stack_name]")
+    exec_parser.add_argument('--container', help="run the command only in this container of the service, by UUID "
+                                                 "(either long or short) or name (can be used multiple times)",
+                             dest='containers', action='append')
+    exec_parser.add_argument('--parallel', help='number of containers to run the command in concurrently '
+                                                '(default: 10)', type=int, default=10)
+    exec_parser.add_argument('command', help="the command to run", nargs=argparse.REMAINDER)
+
     # tutum service inspect
     inspect_parser = service_subparser.add_parser('inspect', help="Get all details from a service",
                                                   description="Get all details from a service")
     inspect_parser.add_argument('identifier', help="service's UUID (either long or short) or name[.stack_name]",
                                 nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum service logs
     logs_parser = service_subparser.add_parser('logs', help='Get logs from a service',
@@ -298,6 +345,12 @@ def add_service_parser(subparsers):
                            choices=['Init', 'Stopped', 'Starting', 'Running', 'Stopping', 'Terminating', 'Terminated',
                                     'Scaling', 'Partly running', 'Not running', 'Redeploying'])
     ps_parser.add_argument('--stack', help="filter services by stack (UUID either long or short, or name)")
+    ps_parser.add_argument('--filter', help='filter services by key=value, e.g. name__startswith=web or tag=prod '
+                                            '(can be used multiple times)', action='append')
+    ps_parser.add_argument('--watch', help='keep the list up to date with the event stream until interrupted',
+                           action='store_true')
+    ps_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                           default='table')
 
     # tutum service redeploy
     redeploy_parser = service_subparser.add_parser('redeploy', help='Redeploy a running service',
@@ -308,6 +361,8 @@ def add_service_parser(subparsers):
                                  action='store_true')
     redeploy_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                  action='store_true')
+    redeploy_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                 type=int, default=1)
 
     # tutum service run
     run_parser = service_subparser.add_parser('run', help='Create and run a new service',
@@ -371,6 +426,8 @@ def add_service_parser(subparsers):
                               help="target number of containers to scale this service to", type=int)
     scale_parser.add_argument('--sync', help='block the command until the async operation has finished',
                               action='store_true')
+    scale_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                              type=int, default=1)
 
     # tutum service set
     set_parser = service_subparser.add_parser('set', help='Change and replace the existing service properties',
@@ -436,6 +493,8 @@ def add_service_parser(subparsers):
                               nargs='+')
     start_parser.add_argument('--sync', help='block the command until the async operation has finished',
                               action='store_true')
+    start_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                              type=int, default=1)
 
     # tutum service stop
     stop_parser = service_subparser.add_parser('stop', help='Stop a running service',
@@ -443,6 +502,8 @@ def add_service_parser(subparsers):
     stop_parser.add_argument('identifier', help="service's UUID (either long or short) or name[.stack_name]", nargs='+')
     stop_parser.add_argument('--sync', help='block the command until the async operation has finished',
                              action='store_true')
+    stop_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                             type=int, default=1)
 
     # tutum service terminate
     terminate_parser = service_subparser.add_parser('terminate', help='Terminate a service',
@@ -451,6 +512,8 @@ def add_service_parser(subparsers):
                                   nargs='+')
     terminate_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                   action='store_true')
+    terminate_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                  type=int, default=1)
 
 
 def add_container_parser(subparsers):
@@ -459,6 +522,15 @@ def add_container_parser(subparsers):
                                              description='Container-related operations')
     container_subparser = container_parser.add_subparsers(title='tutum container commands', dest='subcmd')
 
+    # tutum container cp
+    cp_parser = container_subparser.add_parser('cp', help='Copy files between a container and the local filesystem',
+                                               description='Copy files between a running container and the local '
+                                                           'filesystem, over the exec stream')
+    cp_parser.add_argument('source', help="CONTAINER:PATH to copy out of a container, or a local PATH to copy into "
+                                          "one (- reads a tar archive from stdin)")
+    cp_parser.add_argument('destination', help="a local directory, or CONTAINER:PATH to copy into a directory of a "
+                                               "container (- writes a tar archive to stdout)")
+
     # tutum container exec
     exec_parser = container_subparser.add_parser('exec', help='Run a command in a running container',
                                                  description='Run a command in a running container')
@@ -470,6 +542,10 @@ def add_container_parser(subparsers):
                                                     description='Inspect a container')
     inspect_parser.add_argument('identifier', help="container's UUID (either long or short) or name[.stack_name]",
                                 nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum container logs
     logs_parser = container_subparser.add_parser('logs', help='Get logs from a container',
@@ -480,6 +556,7 @@ def add_container_parser(subparsers):
     logs_parser.add_argument('-t', '--tail', help='Output the specified number of lines at the end of logs '
                                                   '(defaults: 300)', type=int)
 
+    # tutum container redeploy
     redeploy_parser = container_subparser.add_parser('redeploy', help='Redeploy a running container',
                                                      description='Redeploy a running container')
     redeploy_parser.add_argument('identifier', help="container's UUID (either long or short) or name[.stack_name]",
@@ -488,6 +565,8 @@ def add_container_parser(subparsers):
                                  action='store_true')
     redeploy_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                  action='store_true')
+    redeploy_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                 type=int, default=1)
 
     # tutum container ps
     ps_parser = container_subparser.add_parser('ps', help='List containers', description='List containers')
@@ -496,6 +575,12 @@ def add_container_parser(subparsers):
                            choices=['Init', 'Stopped', 'Starting', 'Running', 'Stopping', 'Terminating', 'Terminated'])
     ps_parser.add_argument('--service', help="filter containers by service (UUID either long or short, or name)")
     ps_parser.add_argument('--no-trunc', help="don't truncate output", action='store_true')
+    ps_parser.add_argument('--filter', help='filter containers by key=value, e.g. name__startswith=web or '
+                                            'node=<UUID> (can be used multiple times)', action='append')
+    ps_parser.add_argument('--watch', help='keep the list up to date with the event stream until interrupted',
+                           action='store_true')
+    ps_parser.add_argument('--format', help='output format, all but table are printed as containers are received',
+                           choices=['table', 'fixed', 'json', 'ndjson', 'csv', 'tsv'], default='table')
 
     # tutum container start
     start_parser = container_subparser.add_parser('start', help='Start a container', description='Start a container')
@@ -503,6 +588,8 @@ def add_container_parser(subparsers):
                               nargs='+')
     start_parser.add_argument('--sync', help='block the command until the async operation has finished',
                               action='store_true')
+    start_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                              type=int, default=1)
 
     # tutum container stop
     stop_parser = container_subparser.add_parser('stop', help='Stop a container', description='Stop a container')
@@ -510,6 +597,8 @@ def add_container_parser(subparsers):
                              nargs='+')
     stop_parser.add_argument('--sync', help='block the command until the async operation has finished',
                              action='store_true')
+    stop_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                             type=int, default=1)
 
     # tutum container terminate
     terminate_parser = container_subparser.add_parser('terminate', help='Terminate a container',
@@ -518,6 +607,8 @@ def add_container_parser(subparsers):
                                   nargs='+')
     terminate_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                   action='store_true')
+    terminate_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                  type=int, default=1)
 
 
 def add_image_parser(subparsers):
@@ -541,11 +632,17 @@ def add_image_parser(subparsers):
                                           action='store_true')
     tag_list_exclusive_group.add_argument('-a', '--all', help='list all images', action='store_true')
     tag_list_parser.add_argument('identifier', help="image name", nargs='*')
+    tag_list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                                 default='table')
 
     # tutum image tag inspect
     tag_inspect_parser = tag_subparser.add_parser('inspect', help="Inspect an image tag",
                                                   description="Inspect an image tag")
     tag_inspect_parser.add_argument('identifier', help="image tag, format: image_name:[tag]", nargs='+')
+    tag_inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                    choices=['json', 'ndjson'])
+    tag_inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                    type=int, default=10)
 
     # tutum image tag build
     tag_build_parser = tag_subparser.add_parser('build', help="Build an image tag", description="Build an image tag")
@@ -556,6 +653,8 @@ def add_image_parser(subparsers):
     # tutum image list
     list_parser = image_subparser.add_parser('list', help="List user's images", description="List user's images")
     list_parser.add_argument('-q', '--quiet', help='print only image names', action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     list_exclusive_group = list_parser.add_mutually_exclusive_group()
     list_exclusive_group.add_argument('-j', '--jumpstarts', help='list jumpstart images only', action='store_true')
@@ -563,10 +662,16 @@ def add_image_parser(subparsers):
     list_exclusive_group.add_argument('-u', '--user', help='list user added images only(default)', action='store_true')
     list_exclusive_group.add_argument('-a', '--all', help='list all images', action='store_true')
     list_parser.add_argument('--no-trunc', help="don't truncate output", action='store_true')
+    list_parser.add_argument('--filter', help='filter images by key=value, e.g. in_use=true or '
+                                              'name__startswith=tutum/ (can be used multiple times)', action='append')
 
     # tutum image inspect
     inspect_parser = image_subparser.add_parser('inspect', help='Inspect a image', description='Inspect a image')
     inspect_parser.add_argument('identifier', help="image name", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum image register
     register_parser = image_subparser.add_parser('register',
@@ -620,16 +725,28 @@ def add_node_parser(subparsers):
     # tutum node inspect
     inspect_parser = node_subparser.add_parser('inspect', help='Inspect a node', description='Inspect a node')
     inspect_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum node list
     list_parser = node_subparser.add_parser('list', help='List nodes', description='List nodes')
     list_parser.add_argument('-q', '--quiet', help='print only node uuid', action='store_true')
+    list_parser.add_argument('--filter', help='filter nodes by key=value, e.g. state=Deployed or tag=prod '
+                                              '(can be used multiple times)', action='append')
+    list_parser.add_argument('--watch', help='keep the list up to date with the event stream until interrupted',
+                             action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum node rm
     rm_parser = node_subparser.add_parser('rm', help='Remove a node', description='Remove a container')
     rm_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
     rm_parser.add_argument('--sync', help='block the command until the async operation has finished',
                            action='store_true')
+    rm_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                           type=int, default=1)
 
     # tutum node upgrade
     upgrade_parser = node_subparser.add_parser('upgrade', help='Upgrade docker daemon on the node',
@@ -637,6 +754,8 @@ def add_node_parser(subparsers):
     upgrade_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
     upgrade_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                 action='store_true')
+    upgrade_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                type=int, default=1)
 
     # tutum node healthcheck
     healthcheck_parser = node_subparser.add_parser('healthcheck', help='Test connectivity between Tutum and the node. '
@@ -676,16 +795,26 @@ def add_nodecluster_parser(subparsers):
     inspect_parser = nodecluster_subparser.add_parser('inspect', help='Inspect a nodecluster',
                                                       description='Inspect a nodecluster')
     inspect_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum nodecluster list
     list_parser = nodecluster_subparser.add_parser('list', help='List node clusters', description='List node clusters')
     list_parser.add_argument('-q', '--quiet', help='print only node uuid', action='store_true')
+    list_parser.add_argument('--refresh', help='ignore the locally cached regions and node types and fetch them again',
+                             action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum nodecluster rm
     rm_parser = nodecluster_subparser.add_parser('rm', help='Remove node clusters', description='Remove node clusters')
     rm_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
     rm_parser.add_argument('--sync', help='block the command until the async operation has finished',
                            action='store_true')
+    rm_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                           type=int, default=1)
 
     # tutum nodecluster scale
     scale_parser = nodecluster_subparser.add_parser('scale', help='Scale a running node cluster',
@@ -695,24 +824,34 @@ def add_nodecluster_parser(subparsers):
                               help="target number of nodes to scale this node cluster to", type=int)
     scale_parser.add_argument('--sync', help='block the command until the async operation has finished',
                               action='store_true')
+    scale_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                              type=int, default=1)
 
     # tutum nodecluster provider
     provider_parser = nodecluster_subparser.add_parser('provider', help='Show all available infrastructure providers',
                                                        description='Show all available infrastructure providers')
     provider_parser.add_argument('-q', '--quiet', help='print only provider name', action='store_true')
+    provider_parser.add_argument('--refresh', help='ignore the locally cached providers and fetch them again',
+                                 action='store_true')
 
     # tutum nodecluster region
     region_parser = nodecluster_subparser.add_parser('region', help='Show all available regions')
     region_parser.add_argument('-p', '--provider', help="filtered by provider name (e.g. digitalocean)")
+    region_parser.add_argument('--refresh', help='ignore the locally cached regions and fetch them again',
+                               action='store_true')
 
     # tutum nodecluster nodetype
     nodetype_parser = nodecluster_subparser.add_parser('nodetype', help='Show all available types')
     nodetype_parser.add_argument('-p', '--provider', help="filtered by provider name (e.g. digitalocean)")
     nodetype_parser.add_argument('-r', '--region', help="filtered by region name (e.g. ams1)")
+    nodetype_parser.add_argument('--refresh', help='ignore the locally cached node types and fetch them again',
+                                 action='store_true')
 
     # tutum nodecluster az
     az_parser = nodecluster_subparser.add_parser('az', help='Show all available availability zones')
     az_parser.add_argument('-q', '--quiet', help='print only avaialbity zone name', action='store_true')
+    az_parser.add_argument('--refresh', help='ignore the locally cached availability zones and fetch them again',
+                           action='store_true')
 
     # tutum nodecluster upgrade
     upgrade_parser = nodecluster_subparser.add_parser('upgrade',
@@ -722,6 +861,8 @@ def add_nodecluster_parser(subparsers):
     upgrade_parser.add_argument('identifier', help="node's UUID (either long or short)", nargs='+')
     upgrade_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                 action='store_true')
+    upgrade_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                type=int, default=1)
 
 
 def add_tag_parser(subparsers):
@@ -734,18 +875,26 @@ def add_tag_parser(subparsers):
                                           description='Add tags to services, nodes or nodeclusters')
     add_parser.add_argument('-t', '--tag', help="name of the tag", action='append', required=True)
     add_parser.add_argument('identifier', help="UUID or name of services, nodes or nodeclusters", nargs='+')
+    add_parser.add_argument('--type', help="type of the resource the identifiers refer to (default: detect it)",
+                            choices=['service', 'nodecluster', 'node'])
 
     # tutum tag list
     list_parser = tag_subparser.add_parser('list', help='List all tags associated with services, nodes or nodeclusters',
                                            description='List all tags associated with services, nodes or nodeclusters')
     list_parser.add_argument('identifier', help="UUID or name of services, nodes or nodeclusters", nargs='+')
     list_parser.add_argument('-q', '--quiet', help='print only tag names', action='store_true')
+    list_parser.add_argument('--type', help="type of the resource the identifiers refer to (default: detect it)",
+                             choices=['service', 'nodecluster', 'node'])
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum tag rm
     rm_parser = tag_subparser.add_parser('rm', help='Remove tags from services, nodes or nodeclusters',
                                          description='Remove tags from services, nodes or nodeclusters')
     rm_parser.add_argument('-t', '--tag', help="name of the tag", action='append', required=True)
     rm_parser.add_argument('identifier', help="UUID or name of services, nodes or nodeclusters", nargs='+')
+    rm_parser.add_argument('--type', help="type of the resource the identifiers refer to (default: detect it)",
+                           choices=['service', 'nodecluster', 'node'])
 
     # tutum tag set
     set_parser = tag_subparser.add_parser('set', help='Set tags from services, nodes or nodeclusters, '
@@ -754,6 +903,8 @@ def add_tag_parser(subparsers):
                                                       'This will remove all the existing tags')
     set_parser.add_argument('-t', '--tag', help="name of the tag", action='append', required=True)
     set_parser.add_argument('identifier', help="UUID or name of services, nodes or nodeclusters", nargs='+')
+    set_parser.add_argument('--type', help="type of the resource the identifiers refer to (default: detect it)",
+                            choices=['service', 'nodecluster', 'node'])
 
 
 def add_volume_parser(subparsers):
@@ -765,10 +916,16 @@ def add_volume_parser(subparsers):
     # tutum volume inspect
     inspect_parser = volume_subparser.add_parser('inspect', help='Inspect a volume', description='Inspect a volume')
     inspect_parser.add_argument('identifier', help="volume's UUID (either long or short)", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum volume list
     list_parser = volume_subparser.add_parser('list', help='List volumes', description='List volumes')
     list_parser.add_argument('-q', '--quiet', help='print only long UUIDs', action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
 
 def add_volumegroup_parser(subparsers):
@@ -781,10 +938,16 @@ def add_volumegroup_parser(subparsers):
     inspect_parser = volumegroup_subparser.add_parser('inspect', help='Inspect a volume group',
                                                       description='Inspect a volume group')
     inspect_parser.add_argument('identifier', help="volume group's UUID (either long or short) or name", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum volumegroup list
     list_parser = volumegroup_subparser.add_parser('list', help='List volume groups', description='List volume groups')
     list_parser.add_argument('-q', '--quiet', help='print only long UUIDs', action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
 
 def add_trigger_parser(subparsers):
@@ -805,6 +968,8 @@ def add_trigger_parser(subparsers):
                                                description='List all triggers associated with services')
     list_parser.add_argument('identifier', help="UUID or name of services")
     list_parser.add_argument('-q', '--quiet', help='print only trigger uuid', action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum trigger delete
     rm_parser = trigger_subparser.add_parser('rm', help='Remove trigger from a service',
@@ -836,10 +1001,16 @@ def add_stack_parser(subparsers):
     # tutum stack inspect
     inspect_parser = stack_subparser.add_parser('inspect', help='Inspect a stack', description='Inspect a stack')
     inspect_parser.add_argument('identifier', help="stack's UUID (either long or short) or name", nargs='+')
+    inspect_parser.add_argument('--format', help='print a single JSON array, or a JSON object per line',
+                                choices=['json', 'ndjson'])
+    inspect_parser.add_argument('--parallel', help='number of identifiers to fetch concurrently (default: 10)',
+                                type=int, default=10)
 
     # tutum stack list
     list_parser = stack_subparser.add_parser('list', help='List stacks', description='List stacks')
     list_parser.add_argument('-q', '--quiet', help='print only long UUIDs', action='store_true')
+    list_parser.add_argument('--format', help='output format', choices=['table', 'json', 'ndjson', 'csv', 'tsv'],
+                             default='table')
 
     # tutum stack redeploy
     redeploy_parser = stack_subparser.add_parser('redeploy', help='Redeploy a running stack',
@@ -849,18 +1020,24 @@ def add_stack_parser(subparsers):
                                  action='store_true')
     redeploy_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                  action='store_true')
+    redeploy_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                 type=int, default=1)
 
     # tutum stack start
     start_parser = stack_subparser.add_parser('start', help='Start a stack', description='Start a stack')
     start_parser.add_argument('identifier', help="stack's UUID (either long or short) or name", nargs='+')
     start_parser.add_argument('--sync', help='block the command until the async operation has finished',
                               action='store_true')
+    start_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                              type=int, default=1)
 
     # tutum stack stop
     stop_parser = stack_subparser.add_parser('stop', help='Stop a stack', description='Stop a stack')
     stop_parser.add_argument('identifier', help="stack's UUID (either long or short) or name", nargs='+')
     stop_parser.add_argument('--sync', help='block the command until the async operation has finished',
                              action='store_true')
+    stop_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                             type=int, default=1)
 
     # tutum stack terminate
     terminate_parser = stack_subparser.add_parser('terminate', help='Terminate a stack',
@@ -868,6 +1045,8 @@ def add_stack_parser(subparsers):
     terminate_parser.add_argument('identifier', help="stack's UUID (either long or short) or name", nargs='+')
     terminate_parser.add_argument('--sync', help='block the command until the async operation has finished',
                                   action='store_true')
+    terminate_parser.add_argument('--parallel', help='number of identifiers to process concurrently (default: 1)',
+                                  type=int, default=1)
 
     # tutum stack up
     up_parser = stack_subparser.add_parser('up', help='Create and deploy a stack',
@@ -1,4 +1,5 @@
 import argparse
+import atexit
 import logging
 import copy
 import sys
@@ -8,6 +9,7 @@ import requests
 from . import __version__
 from tutumcli import parsers
 from tutumcli import commands
+from tutumcli import utils
 from tutumcli.exceptions import InternalError
 
 requests.packages.urllib3.disable_warnings()
@@ -17,6 +19,7 @@ sys.stdout = codecs.getwriter('utf8')(sys.stdout)
 logging.basicConfig()
 
 tutum.user_agent = "tutum-cli/%s" % __version__
+utils.install_shared_session()
 
 
 def initialize_parser():
@@ -66,10 +69,10 @@ def patch_help_option(argv=sys.argv):
     elif len(args) == 3:
         if args[1] == 'action' and args[2] in ['inspect', 'logs', 'cancel', 'retry']:
             args.append('-h')
-        elif args[1] == 'service' and args[2] in ['create', 'env', 'inspect', 'logs', 'redeploy', 'run', 'scale', 'set',
-                                                  'start', 'stop', 'terminate']:
+        elif args[1] == 'service' and args[2] in ['create', 'env', 'exec', 'inspect', 'logs', 'redeploy', 'run',
+                                                  'scale', 'set', 'start', 'stop', 'terminate']:
             args.append('-h')
-        elif args[1] == 'container' and args[2] in ['exec', 'inspect', 'logs', 'redeploy', 'start', 'stop',
+        elif args[1] == 'container' and args[2] in ['cp', 'exec', 'inspect', 'logs', 'redeploy', 'start', 'stop',
                                                     'terminate']:
             args.append('-h')
         elif args[1] == 'image' and args[2] in ['register', 'push', 'rm', 'search', 'tag', 'update', 'inspect']:
@@ -107,23 +110,25 @@ def dispatch_cmds(args):
         requests_log.setLevel(logging.INFO)
         cli_log = logging.getLogger("cli")
         cli_log.setLevel(logging.DEBUG)
+        atexit.register(utils.log_connection_stats)
     if args.cmd == 'login':
         commands.login(args.username, args.password)
     elif args.cmd == 'action':
         if args.subcmd == 'inspect':
-            commands.action_inspect(args.identifier)
+            commands.action_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'list':
-            commands.action_list(args.quiet, args.last)
+            commands.action_list(args.quiet, args.last, args.format)
         elif args.subcmd == 'logs':
             commands.action_logs(args.identifier, args.tail, args.follow)
         elif args.subcmd == 'cancel':
-            commands.action_cancel(args.identifier)
+            commands.action_cancel(args.identifier, args.parallel)
         elif args.subcmd == 'retry':
-            commands.action_retry(args.identifier)
+            commands.action_retry(args.identifier, args.parallel)
     elif args.cmd == 'build':
         commands.build(args.tag, args.directory, args.sock)
     elif args.cmd == 'event':
-        commands.event()
+        commands.event(args.type, args.action, args.state, args.resource, args.tag, args.format, args.socket,
+                       args.journal, args.offset)
     elif args.cmd == 'exec':
         commands.container_exec(args.identifier, args.command)
     elif args.cmd == 'push':
@@ -152,14 +157,16 @@ def dispatch_cmds(args):
                                     sequential=args.sequential, volume=args.volume, volumes_from=args.volumes_from,
                                     deployment_strategy=args.deployment_strategy, sync=args.sync, net=args.net,
                                     pid=args.pid)
+        elif args.subcmd == 'exec':
+            commands.service_exec(args.identifier, args.containers, args.command, args.parallel)
         elif args.subcmd == 'inspect':
-            commands.service_inspect(args.identifier)
+            commands.service_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'logs':
             commands.service_logs(args.identifier, args.tail, args.follow)
         elif args.subcmd == 'ps':
-            commands.service_ps(args.quiet, args.status, args.stack)
+            commands.service_ps(args.quiet, args.status, args.stack, args.filter, args.format, args.watch)
         elif args.subcmd == 'redeploy':
-            commands.service_redeploy(args.identifier, args.not_reuse_volumes, args.sync)
+            commands.service_redeploy(args.identifier, args.not_reuse_volumes, args.sync, args.parallel)
         elif args.subcmd == 'run':
             commands.service_run(image=args.image, name=args.name, cpu_shares=args.cpushares,
                                  memory=args.memory, privileged=args.privileged,
@@ -173,7 +180,7 @@ def dispatch_cmds(args):
                                  deployment_strategy=args.deployment_strategy, sync=args.sync, net=args.net,
                                  pid=args.pid)
         elif args.subcmd == 'scale':
-            commands.service_scale(args.identifier, args.target_num_containers, args.sync)
+            commands.service_scale(args.identifier, args.target_num_containers, args.sync, args.parallel)
         elif args.subcmd == 'set':
             commands.service_set(args.identifier, image=args.image, cpu_shares=args.cpushares,
                                  memory=args.memory, privileged=args.privileged,
@@ -188,17 +195,18 @@ def dispatch_cmds(args):
                                  deployment_strategy=args.deployment_strategy, sync=args.sync, net=args.net,
                                  pid=args.pid)
         elif args.subcmd == 'start':
-            commands.service_start(args.identifier, args.sync)
+            commands.service_start(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'stop':
-            commands.service_stop(args.identifier, args.sync)
+            commands.service_stop(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'terminate':
-            commands.service_terminate(args.identifier, args.sync)
+            commands.service_terminate(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'env':
             if args.envsubcmd == 'add':
                 commands.service_env_add(args.identifier, envvars=args.env, envfiles=args.env_file,
                                          redeploy=args.redeploy, sync=args.sync)
             elif args.envsubcmd == 'list':
-                commands.service_env_list(args.identifier, args.quiet, args.user, args.image, args.tutum)
+                commands.service_env_list(args.identifier, args.quiet, args.user, args.image, args.tutum,
+                                          args.format)
             elif args.envsubcmd == 'remove':
                 commands.service_env_remove(args.identifier, names=args.name, redeploy=args.redeploy, sync=args.sync)
             elif args.envsubcmd == 'set':
@@ -208,25 +216,29 @@ def dispatch_cmds(args):
                 commands.service_env_update(args.identifier, envvars=args.env, envfiles=args.env_file,
                                             redeploy=args.redeploy, sync=args.sync)
     elif args.cmd == 'container':
-        if args.subcmd == 'exec':
+        if args.subcmd == 'cp':
+            commands.container_cp(args.source, args.destination)
+        elif args.subcmd == 'exec':
             commands.container_exec(args.identifier, args.command)
         elif args.subcmd == 'inspect':
-            commands.container_inspect(args.identifier)
+            commands.container_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'logs':
             commands.container_logs(args.identifier, args.tail, args.follow)
         elif args.subcmd == 'redeploy':
-            commands.container_redeploy(args.identifier, args.not_reuse_volumes, args.sync)
+            commands.container_redeploy(args.identifier, args.not_reuse_volumes, args.sync, args.parallel)
         elif args.subcmd == 'ps':
-            commands.container_ps(args.quiet, args.status, args.service, args.no_trunc)
+            commands.container_ps(args.quiet, args.status, args.service, args.no_trunc, args.filter,
+                                  args.format, args.watch)
         elif args.subcmd == 'start':
-            commands.container_start(args.identifier, args.sync)
+            commands.container_start(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'stop':
-            commands.container_stop(args.identifier, args.sync)
+            commands.container_stop(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'terminate':
-            commands.container_terminate(args.identifier, args.sync)
+            commands.container_terminate(args.identifier, args.sync, args.parallel)
     elif args.cmd == 'image':
         if args.subcmd == 'list':
-            commands.image_list(args.quiet, args.jumpstarts, args.private, args.user, args.all, args.no_trunc)
+            commands.image_list(args.quiet, args.jumpstarts, args.private, args.user, args.all, args.no_trunc,
+                                args.filter, args.format)
         elif args.subcmd == 'register':
             commands.image_register(args.image_name, args.description, args.username, args.password, args.sync)
         elif args.subcmd == 'push':
@@ -238,23 +250,24 @@ def dispatch_cmds(args):
         elif args.subcmd == 'update':
             commands.image_update(args.image_name, args.username, args.password, args.description, args.sync)
         elif args.subcmd == 'inspect':
-            commands.image_inspect(args.identifier)
+            commands.image_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'tag':
             if args.imagetagsubcmd == 'list':
-                commands.image_tag_list(args.jumpstarts, args.private, args.user, args.all, args.identifier)
+                commands.image_tag_list(args.jumpstarts, args.private, args.user, args.all, args.identifier,
+                                        args.format)
             elif args.imagetagsubcmd == 'inspect':
-                commands.image_tag_inspect(args.identifier)
+                commands.image_tag_inspect(args.identifier, args.format, args.parallel)
             elif args.imagetagsubcmd == 'build':
                 commands.image_tag_build(args.identifier, args.sync)
     elif args.cmd == 'node':
         if args.subcmd == 'inspect':
-            commands.node_inspect(args.identifier)
+            commands.node_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'list':
-            commands.node_list(args.quiet)
+            commands.node_list(args.quiet, args.filter, args.format, args.watch)
         elif args.subcmd == 'rm':
-            commands.node_rm(args.identifier, args.sync)
+            commands.node_rm(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'upgrade':
-            commands.node_upgrade(args.identifier, args.sync)
+            commands.node_upgrade(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'byo':
             commands.node_byo()
         elif args.subcmd == 'healthcheck':
@@ -265,64 +278,64 @@ def dispatch_cmds(args):
                                         args.sync, args.disk, args.tag, args.aws_vpc_id, args.aws_vpc_subnet,
                                         args.aws_vpc_security_group, args.aws_iam_instance_profile_name)
         elif args.subcmd == 'inspect':
-            commands.nodecluster_inspect(args.identifier)
+            commands.nodecluster_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'list':
-            commands.nodecluster_list(args.quiet)
+            commands.nodecluster_list(args.quiet, args.refresh, args.format)
         elif args.subcmd == 'provider':
-            commands.nodecluster_show_providers(args.quiet)
+            commands.nodecluster_show_providers(args.quiet, args.refresh)
         elif args.subcmd == 'region':
-            commands.nodecluster_show_regions(args.provider)
+            commands.nodecluster_show_regions(args.provider, args.refresh)
         elif args.subcmd == 'nodetype':
-            commands.nodecluster_show_types(args.provider, args.region)
+            commands.nodecluster_show_types(args.provider, args.region, args.refresh)
         elif args.subcmd == 'rm':
-            commands.nodecluster_rm(args.identifier, args.sync)
+            commands.nodecluster_rm(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'az':
-            commands.nodecluster_az(args.quiet)
+            commands.nodecluster_az(args.quiet, args.refresh)
         elif args.subcmd == 'scale':
-            commands.nodecluster_scale(args.identifier, args.target_num_nodes, args.sync)
+            commands.nodecluster_scale(args.identifier, args.target_num_nodes, args.sync, args.parallel)
         elif args.subcmd == 'upgrade':
-            commands.nodecluster_upgrade(args.identifier, args.sync)
+            commands.nodecluster_upgrade(args.identifier, args.sync, args.parallel)
     elif args.cmd == 'tag':
         if args.subcmd == 'add':
-            commands.tag_add(args.identifier, args.tag)
+            commands.tag_add(args.identifier, args.tag, args.type)
         elif args.subcmd == 'list':
-            commands.tag_list(args.identifier, args.quiet)
+            commands.tag_list(args.identifier, args.quiet, args.type, args.format)
         elif args.subcmd == 'rm':
-            commands.tag_rm(args.identifier, args.tag)
+            commands.tag_rm(args.identifier, args.tag, args.type)
         elif args.subcmd == 'set':
-            commands.tag_set(args.identifier, args.tag)
+            commands.tag_set(args.identifier, args.tag, args.type)
     elif args.cmd == 'volume':
         if args.subcmd == 'list':
-            commands.volume_list(args.quiet)
+            commands.volume_list(args.quiet, args.format)
         if args.subcmd == 'inspect':
-            commands.volume_inspect(args.identifier)
+            commands.volume_inspect(args.identifier, args.format, args.parallel)
     elif args.cmd == 'volumegroup':
         if args.subcmd == 'list':
-            commands.volumegroup_list(args.quiet)
+            commands.volumegroup_list(args.quiet, args.format)
         if args.subcmd == 'inspect':
-            commands.volumegroup_inspect(args.identifier)
+            commands.volumegroup_inspect(args.identifier, args.format, args.parallel)
     elif args.cmd == 'trigger':
         if args.subcmd == 'create':
             commands.trigger_create(args.identifier, args.name, args.operation)
         elif args.subcmd == 'list':
-            commands.trigger_list(args.identifier, args.quiet)
+            commands.trigger_list(args.identifier, args.quiet, args.format)
         elif args.subcmd == 'rm':
             commands.trigger_rm(args.identifier, args.trigger)
     elif args.cmd == 'stack':
         if args.subcmd == 'create':
             commands.stack_create(args.name, args.file, args.sync)
         elif args.subcmd == 'inspect':
-            commands.stack_inspect(args.identifier)
+            commands.stack_inspect(args.identifier, args.format, args.parallel)
         elif args.subcmd == 'list':
-            commands.stack_list(args.quiet)
+            commands.stack_list(args.quiet, args.format)
         elif args.subcmd == 'redeploy':
-            commands.stack_redeploy(args.identifier, args.not_reuse_volumes, args.sync)
+            commands.stack_redeploy(args.identifier, args.not_reuse_volumes, args.sync, args.parallel)
         elif args.subcmd == 'start':
-            commands.stack_start(args.identifier, args.sync)
+            commands.stack_start(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'stop':
-            commands.stack_stop(args.identifier, args.sync)
+            commands.stack_stop(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'terminate':
-            commands.stack_terminate(args.identifier, args.sync)
+            commands.stack_terminate(args.identifier, args.sync, args.parallel)
         elif args.subcmd == 'up':
             commands.stack_up(args.name, args.file, args.sync)
         elif args.subcmd == 'update':
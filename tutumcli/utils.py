@@ -1,28 +1,127 @@
 from __future__ import print_function
+import base64
 import datetime
 import json
+import logging
+import urllib
 import urlparse
 import ssl
 import re
 import os
+import pipes
+import posixpath
+import select
+import socket
+import stat
 import codecs
+import collections
 import sys
+import tarfile
+import threading
+import time
+import Queue
 import requests
-import yaml
-import ago
-import docker
 import tutum
-from dateutil import tz
-from tabulate import tabulate
+import websocket
+from requests.adapters import HTTPAdapter
 from tutum import ObjectNotFound
 from exceptions import BadParameter, DockerNotFound, StreamOutputError
 from . import __version__
+from . import cache
+
+cli_log = logging.getLogger("cli")
+
+
+def tabulate(tabular_data, headers=(), **kwargs):
+    # Imported on first use, like the other dependencies only some subcommands need, to keep start-up time low
+    from tabulate import tabulate as _tabulate
+    return _tabulate(tabular_data, headers, **kwargs)
 
 
 def tabulate_result(data_list, headers):
     print(tabulate(data_list, headers, stralign="left", tablefmt="plain"))
 
 
+LIST_FORMATS = ["table", "fixed", "json", "ndjson", "csv", "tsv"]
+
+
+class ListWriter(object):
+    """Write the rows of a list command in ``output_format`` as they are produced
+
+    Each row is given twice: as the values displayed in the table, and as a record of raw values for machine readable
+    formats, which always have the same ``keys`` in the same order. Only ``table`` needs to see every row to size its
+    columns, the other formats start printing with the first row: ``fixed`` pads the columns to ``widths``, ``json``
+    writes an array element by element, ``ndjson`` a JSON object per line and ``csv``/``tsv`` a header of ``keys``
+    followed by a line per record.
+    """
+
+    def __init__(self, headers, keys, output_format="table", widths=None, stream=None):
+        if output_format not in LIST_FORMATS:
+            raise BadParameter("Unknown output format %s, use one of %s" % (output_format, ", ".join(LIST_FORMATS)))
+        self.headers = headers
+        self.keys = keys
+        self.output_format = output_format
+        self.widths = widths or [len(header) for header in headers]
+        self.stream = stream or sys.stdout
+        self.rows = []
+        self.count = 0
+        if output_format == "fixed":
+            self._write_fixed(headers)
+        elif output_format in ["csv", "tsv"]:
+            import csv
+            import StringIO
+            # the csv module only writes UTF-8 bytes, which are written to the stream as unicode, like the other
+            # formats are
+            self.csv_buffer = StringIO.StringIO()
+            self.csv_writer = csv.writer(self.csv_buffer, delimiter="," if output_format == "csv" else "\t",
+                                         lineterminator="\n")
+            self._write_csv(keys)
+
+    def _write_fixed(self, row):
+        columns = [u"" if value is None else unicode(value) for value in row]
+        line = u"  ".join(column.ljust(width) for column, width in zip(columns[:-1], self.widths))
+        print((line + u"  " + columns[-1]).rstrip(), file=self.stream)
+
+    def _write_csv(self, row):
+        self.csv_writer.writerow([self._to_csv_field(value) for value in row])
+        self.stream.write(self.csv_buffer.getvalue().decode("utf-8"))
+        self.csv_buffer.seek(0)
+        self.csv_buffer.truncate()
+
+    @staticmethod
+    def _to_csv_field(value):
+        if value is None:
+            return ""
+        if isinstance(value, unicode):
+            return value.encode("utf-8")
+        if isinstance(value, (str, int, long, float)) and not isinstance(value, bool):
+            return value
+        return json.dumps(value)
+
+    def write(self, row, record):
+        record = collections.OrderedDict((key, record.get(key)) for key in self.keys)
+        if self.output_format == "table":
+            self.rows.append(row)
+            return
+        if self.output_format == "fixed":
+            self._write_fixed(row)
+        elif self.output_format == "json":
+            self.stream.write("[\n  " if self.count == 0 else ",\n  ")
+            self.stream.write(json.dumps(record))
+        elif self.output_format == "ndjson":
+            print(json.dumps(record), file=self.stream)
+        else:
+            self._write_csv(record.values())
+        self.count += 1
+        self.stream.flush()
+
+    def close(self):
+        if self.output_format == "table":
+            tabulate_result(self.rows or [[""] * (len(self.headers) - 1)], self.headers)
+        elif self.output_format == "json":
+            print("[]" if self.count == 0 else "\n]", file=self.stream)
+
+
 def from_utc_string_to_utc_datetime(utc_datetime_string):
     if not utc_datetime_string:
         return None
@@ -32,6 +131,9 @@ def from_utc_string_to_utc_datetime(utc_datetime_string):
 
 
 def get_humanize_local_datetime_from_utc_datetime_string(utc_datetime_string):
+    import ago
+    from dateutil import tz
+
     def get_humanize_local_datetime_from_utc_datetime(utc_target_datetime):
         local_now = datetime.datetime.now(tz.tzlocal())
         if utc_target_datetime:
@@ -66,6 +168,8 @@ def add_unicode_symbol_to_state(state):
 
 
 def get_docker_client():
+    import docker
+
     try:
         DOCKER_TLS_VERIFY = bool(os.environ.get('DOCKER_TLS_VERIFY', False))
 
@@ -95,7 +199,16 @@ def get_docker_client():
         raise DockerNotFound("Cannot connect to docker (is it running?)")
 
 
-def stream_output(output, stream):
+STREAM_OUTPUT_FPS = 10
+
+
+def stream_output(output, stream, callback=None, history=0, fps=STREAM_OUTPUT_FPS):
+    """Render a stream of Docker JSON progress events (e.g. from a pull or a build) on ``stream``
+
+    Only the screen line of every layer is kept, and on a terminal, progress updates of the layers already shown are
+    redrawn at most ``fps`` times a second. ``callback`` is called with every event, and the last ``history`` events
+    are returned, for callers that need more than what is shown.
+    """
     def print_output_event(event, stream, is_terminal):
         if 'errorDetail' in event:
             raise StreamOutputError(event['errorDetail']['message'])
@@ -135,41 +248,516 @@ def stream_output(output, stream):
         else:
             stream.write("%s%s\n" % (status, terminator))
 
-    is_terminal = hasattr(stream, 'fileno') and os.isatty(stream.fileno())
-    stream = codecs.getwriter('utf-8')(stream)
-    all_events = []
-    lines = {}
-    diff = 0
-
-    for chunk in output:
-        event = json.loads(chunk)
-        all_events.append(event)
+    def is_progress_event(event):
+        return 'progress' in event or 'progressDetail' in event
 
-        if 'progress' in event or 'progressDetail' in event:
+    def draw(event):
+        if is_progress_event(event):
             image_id = event.get('id')
-            if not image_id:
-                continue
-
             if image_id in lines:
-                diff = len(lines) - lines[image_id]
+                state["diff"] = len(lines) - lines[image_id]
             else:
                 lines[image_id] = len(lines)
                 stream.write("\n")
-                diff = 0
+                state["diff"] = 0
 
             if is_terminal:
                 # move cursor up `diff` rows
-                stream.write("%c[%dA" % (27, diff))
+                stream.write("%c[%dA" % (27, state["diff"]))
 
         print_output_event(event, stream, is_terminal)
 
         if 'id' in event and is_terminal:
             # move cursor back down
-            stream.write("%c[%dB" % (27, diff))
+            stream.write("%c[%dB" % (27, state["diff"]))
 
+    def draw_pending(*events):
+        for event in pending.values() + list(events):
+            draw(event)
+        pending.clear()
         stream.flush()
+        state["drawn_at"] = time.time()
+
+    is_terminal = hasattr(stream, 'fileno') and os.isatty(stream.fileno())
+    stream = codecs.getwriter('utf-8')(stream)
+    events = collections.deque(maxlen=history)
+    lines = {}
+    # latest progress event of every layer which is not on screen yet
+    pending = collections.OrderedDict()
+    state = {"diff": 0, "drawn_at": 0}
+
+    for chunk in output:
+        event = json.loads(chunk)
+        if callback:
+            callback(event)
+        if history:
+            events.append(event)
+
+        if is_progress_event(event):
+            image_id = event.get('id')
+            if not image_id:
+                continue
+            if is_terminal and image_id in lines:
+                pending[image_id] = event
+                if fps and time.time() - state["drawn_at"] < 1.0 / fps:
+                    continue
+                draw_pending()
+                continue
+
+        draw_pending(event)
+
+    draw_pending()
+    return list(events)
+
+
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 32
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Return the keep-alive ``requests.Session`` shared by all the API requests of this process"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            # pool_maxsize covers the --parallel workers, so that they do not keep opening and dropping connections
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _shared_session = session
+    return _shared_session
+
+
+def install_shared_session():
+    """Make python-tutum send every request through the shared session, instead of a new one (and connection) each"""
+    tutum.api.http.Session = get_shared_session
+
+
+def get_connection_stats():
+    """Return the number of connections opened, and of requests sent, by the shared session so far"""
+    connections = requests_sent = 0
+    if _shared_session is not None:
+        for adapter in set(_shared_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                connections += pools[key].num_connections
+                requests_sent += pools[key].num_requests
+    return connections, requests_sent
+
+
+def log_connection_stats():
+    connections, requests_sent = get_connection_stats()
+    cli_log.debug("HTTP: %d requests sent over %d connections (%d reused)" %
+                  (requests_sent, connections, max(requests_sent - connections, 0)))
+
+
+# Filters known to be accepted by the API as query parameters, by resource type. Any other filter is checked on the
+# objects as they are received. The API compares values case-sensitively, unlike match_filters: states are sent as
+# spelled in FILTER_STATES (and not at all if unknown), and names are never sent.
+FILTER_PUSHDOWN = {
+    "service": ["state", "uuid__startswith"],
+    "container": ["state", "uuid__startswith"],
+    "node": ["uuid__startswith"],
+}
+FILTER_STATES = dict((state.lower(), state) for state in [
+    "Init", "Stopped", "Starting", "Running", "Stopping", "Terminating", "Terminated", "Scaling", "Partly running",
+    "Not running", "Redeploying"])
+FILTER_ALIASES = {"status": "state", "tag": "tags"}
+
+
+def parse_filters(filter_list):
+    """Parse ``key=value`` filters given on the command line into a list of ``(key, value)`` tuples"""
+    filters = []
+    for filter_string in filter_list or []:
+        key, sep, value = filter_string.partition("=")
+        key = key.strip()
+        if not sep or not key:
+            raise BadParameter('Bad filter argument %s. Format: "key=value"' % filter_string)
+        filters.append((FILTER_ALIASES.get(key, key), value))
+    return filters
+
+
+def match_filters(attributes, filters):
+    """Return whether the ``attributes`` of an object match all ``filters``
+
+    A filter matches case-insensitively, or on the start of the value with a ``__startswith`` suffix. Lists (e.g. tags)
+    match if any of their items does, objects in them on their name, and resource uris also on their (short) uuid.
+    """
+    for key, expected in filters:
+        attribute, _, lookup = key.partition("__")
+        values = attributes.get(attribute)
+        if not isinstance(values, list):
+            values = [values]
+        values = [value.get("name") if isinstance(value, dict) else value for value in values]
+        values = [unicode(value) for value in values if value is not None]
+
+        if lookup == "startswith":
+            matched = any(value.startswith(expected) for value in values)
+        else:
+            matched = any(value.lower() == expected.lower() or
+                          (value.startswith("/api/") and value.rstrip("/").split("/")[-1].startswith(expected))
+                          for value in values)
+        if not matched:
+            return False
+    return True
+
+
+class _Prefetch(threading.Thread):
+    """Call ``func(*args)`` in the background, ``result()`` waits for its return value or raises its exception"""
+
+    def __init__(self, func, *args):
+        super(_Prefetch, self).__init__()
+        self.daemon = True
+        self.func = func
+        self.args = args
+        self.value = None
+        self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            self.value = self.func(*self.args)
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _get_page(model, params):
+    return tutum.api.http.send_request("GET", model.endpoint, params=params)
+
+
+def match_query(obj, filters=None, **params):
+    """Return whether ``obj`` belongs in the result of ``iter_list(type(obj), filters=filters, **params)``"""
+    attributes = obj.get_all_attributes()
+    for key, value in params.items():
+        if value is not None and attributes.get(key) != value:
+            return False
+    return match_filters(attributes, filters or [])
+
+
+def event_may_match(event, filters=None, **params):
+    """Return whether the object ``event`` is about may have entered the result of ``iter_list(..., filters, **params)``
+
+    An object only enters it by being created, or by changing state when the result is restricted to some states.
+    The criteria the event tells about (state, uuid and parent resources) are checked, and the others assumed to match.
+    """
+    has_state_filter = params.get("state") is not None or any(key == "state" for key, _ in filters or [])
+    if event.get("action") != "create" and not has_state_filter:
+        return False
+    attributes = dict((key, event.get(key)) for key in ["state", "uuid", "resource_uri"])
+    checked = [(key, value) for key, value in filters or [] if key.partition("__")[0] in attributes]
+    checked.extend((key, value) for key, value in params.items() if key in attributes and value is not None)
+    if not match_filters(attributes, checked):
+        return False
+    parents = event.get("parents")
+    if parents is not None:
+        for key, value in params.items():
+            if isinstance(value, basestring) and value.startswith("/api/") and value not in parents:
+                return False
+    return True
+
+
+def iter_list(model, fields=None, filters=None, prefetch=False, **params):
+    """Iterate over the objects of ``model`` matching the query ``params`` and ``filters``, a page at a time
+
+    ``filters`` (see ``parse_filters``) are sent to the API when it supports them, and checked on every object
+    otherwise. The API returns whole objects, so ``fields``, when set, are the only attributes kept of them. With
+    ``prefetch``, the next page is requested while the objects of the current one are consumed.
+    """
+    resource_type = model.endpoint.strip("/")
+    params = dict((key, value) for key, value in params.items() if value is not None)
+    for key, value in filters or []:
+        if key == "state":
+            value = FILTER_STATES.get(value.lower())
+        if value is not None and key in FILTER_PUSHDOWN.get(resource_type, []):
+            params.setdefault(key, value)
+    if fields:
+        fields = set(fields) | {model._pk_key(), "resource_uri"}
+
+    next_page = None
+    while params is not None:
+        result = next_page.result() if next_page else _get_page(model, params)
+
+        meta = result.get("meta", {})
+        if meta.get("next"):
+            params = dict(params, offset=meta.get("offset", 0) + meta.get("limit", 0), limit=meta.get("limit", 0))
+        else:
+            params = None
+        next_page = _Prefetch(_get_page, model, params) if prefetch and params is not None else None
+
+        for attributes in result.get("objects", []):
+            if filters and not match_filters(attributes, filters):
+                continue
+            if fields:
+                attributes = dict((key, value) for key, value in attributes.items() if key in fields)
+            obj = model()
+            obj._loaddict(attributes)
+            yield obj
+
+
+def get_resource_uri_map(model, attribute="name", **kwargs):
+    """Build a ``{resource_uri: attribute}`` lookup table from a single ``model.list()`` call
+
+    List commands use it to join related resources (clusters, stacks, nodes...) by resource URI
+    instead of fetching each one of them separately.
+    """
+    resource_uri_map = {}
+    for resource in model.list(**kwargs):
+        resource_uri_map[resource.resource_uri] = getattr(resource, attribute, None)
+    return resource_uri_map
+
+
+class LazyResourceUriMap(object):
+    """A ``get_resource_uri_map()`` table fetched in the background, which lookups only wait for when they need it
+
+    Lookups of a None resource uri (e.g. a container without a node) are answered right away.
+    """
+
+    def __init__(self, model, attribute="name"):
+        self._map = _Prefetch(get_resource_uri_map, model, attribute)
+
+    def get(self, resource_uri):
+        if resource_uri is None:
+            return None
+        return self._map.result().get(resource_uri)
+
+
+def _fetch_remote(resource_type, fetch_remote, identifier, raise_exceptions):
+    if not is_uuid4(identifier):
+        resource_uri = cache.lookup_identifier(resource_type, identifier)
+        if resource_uri:
+            try:
+                obj = tutum.Utils.fetch_by_resource_uri(resource_uri)
+            except tutum.TutumApiError:
+                obj = None
+            # the index may be stale, only trust it if the object still answers to the identifier
+            if obj is not None and (obj.uuid.startswith(identifier) or
+                                    getattr(obj, "name", None) == identifier.split(".", 2)[0]):
+                return obj
+            cache.forget_object(resource_type, resource_uri)
+
+    obj = fetch_remote(identifier, raise_exceptions=raise_exceptions)
+    if not isinstance(obj, Exception):
+        cache.index_objects(resource_type, [obj])
+    return obj
+
+
+def fetch_remote_container(identifier, raise_exceptions=True):
+    """Like ``tutum.Utils.fetch_remote_container``, but resolves ``identifier`` from the local index when it can"""
+    return _fetch_remote("container", tutum.Utils.fetch_remote_container, identifier, raise_exceptions)
+
+
+def fetch_remote_service(identifier, raise_exceptions=True):
+    """Like ``tutum.Utils.fetch_remote_service``, but resolves ``identifier`` from the local index when it can"""
+    return _fetch_remote("service", tutum.Utils.fetch_remote_service, identifier, raise_exceptions)
+
+
+def fetch_remote_stack(identifier, raise_exceptions=True):
+    """Like ``tutum.Utils.fetch_remote_stack``, but resolves ``identifier`` from the local index when it can"""
+    return _fetch_remote("stack", tutum.Utils.fetch_remote_stack, identifier, raise_exceptions)
+
+
+def fetch_remote_node(identifier, raise_exceptions=True):
+    """Like ``tutum.Utils.fetch_remote_node``, but resolves ``identifier`` from the local index when it can"""
+    return _fetch_remote("node", tutum.Utils.fetch_remote_node, identifier, raise_exceptions)
+
+
+def fetch_remote_nodecluster(identifier, raise_exceptions=True):
+    """Like ``tutum.Utils.fetch_remote_nodecluster``, but resolves ``identifier`` from the local index when it can"""
+    return _fetch_remote("nodecluster", tutum.Utils.fetch_remote_nodecluster, identifier, raise_exceptions)
 
-    return all_events
+
+def iter_concurrently(func, items, parallel):
+    """Call ``func`` on every item using up to ``parallel`` threads
+
+    Yields ``(item, result, exception)`` tuples in the order of ``items``, as soon as each of them is available.
+    Other exceptions than ``Exception`` (e.g. ``SystemExit``) are raised again in the consuming thread instead.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    finished = [threading.Event() for _ in items]
+    pending = Queue.Queue()
+    for index in range(len(items)):
+        pending.put(index)
+
+    def worker():
+        while True:
+            try:
+                index = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[index] = (func(items[index]), None, None)
+            except Exception as e:
+                results[index] = (None, e, None)
+            except BaseException:
+                results[index] = (None, None, sys.exc_info())
+                return
+            finally:
+                finished[index].set()
+
+    for _ in range(max(1, min(parallel, len(items)))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+
+    for index, item in enumerate(items):
+        # wait with a timeout, so that KeyboardInterrupt is still delivered to the main thread
+        while not finished[index].wait(0.1):
+            pass
+        result, exception, exc_info = results[index]
+        if exc_info:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        yield item, result, exception
+
+
+INSPECT_PARALLEL = 10
+
+
+def inspect_objects(fetch, identifiers, output_format=None, parallel=INSPECT_PARALLEL):
+    """Print the attributes of the object ``fetch(identifier)`` returns, for every identifier
+
+    Objects are fetched by up to ``parallel`` threads and printed in the order of ``identifiers`` as soon as they are
+    available: as an indented JSON document each by default, as a single JSON array with ``json``, or as a JSON object
+    per line with ``ndjson``. Failures are printed to stderr and do not stop the other identifiers.
+
+    :returns: bool -- whether fetching any of the objects failed
+    """
+    has_exception = False
+    count = 0
+    for identifier, obj, exception in iter_concurrently(fetch, identifiers, parallel or 1):
+        if exception is not None:
+            print(exception, file=sys.stderr)
+            has_exception = True
+            continue
+
+        attributes = obj.get_all_attributes()
+        if output_format == "json":
+            sys.stdout.write("[\n" if count == 0 else ",\n")
+            sys.stdout.write(json.dumps(attributes, indent=2))
+        elif output_format == "ndjson":
+            print(json.dumps(attributes))
+        else:
+            print(json.dumps(attributes, indent=2))
+        sys.stdout.flush()
+        count += 1
+    if output_format == "json":
+        print("[]" if count == 0 else "\n]")
+    return has_exception
+
+
+def fetch_remote_taggable(identifier, resource_type=None):
+    """Find the service, node cluster or node that ``identifier`` refers to, returning ``(obj, obj_type)``
+
+    Unless ``resource_type`` narrows it down, the three types are looked up concurrently. As with looking them up one
+    after the other, a matching service wins over a node cluster, which wins over a node.
+    """
+    fetchers = [("Service", fetch_remote_service),
+                ("NodeCluster", fetch_remote_nodecluster),
+                ("Node", fetch_remote_node)]
+    if resource_type:
+        fetchers = [(obj_type, fetch) for obj_type, fetch in fetchers if obj_type.lower() == resource_type.lower()]
+
+    def _fetch(fetcher):
+        return fetcher[1](identifier, raise_exceptions=False)
+
+    for (obj_type, _), obj, exception in iter_concurrently(_fetch, fetchers, len(fetchers)):
+        obj = exception or obj
+        if isinstance(obj, ObjectNotFound):
+            continue
+        if isinstance(obj, Exception):
+            raise obj
+        return obj, obj_type
+    raise ObjectNotFound("Identifier '%s' does not match any %s" %
+                         (identifier, resource_type or "service, node or nodecluster"))
+
+
+class _BufferedOutput(object):
+    """Stream proxy which buffers writes done by threads that registered a buffer in ``local``"""
+
+    def __init__(self, stream, local):
+        self._stream = stream
+        self._local = local
+
+    def write(self, data):
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            self._stream.write(data)
+        else:
+            buf.append((self._stream, data))
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def run_for_each(func, identifiers, parallel):
+    """Run ``func(identifier)`` for every identifier, printing the exceptions raised to stderr
+
+    When ``parallel`` is greater than 1, up to ``parallel`` identifiers are processed concurrently. The output of
+    each call is buffered and written in the order of ``identifiers``, so it looks the same as a sequential run.
+
+    :returns: bool -- whether any of the calls raised an exception
+    """
+    return map_for_each(func, identifiers, parallel)[1]
+
+
+def map_for_each(func, identifiers, parallel):
+    """Like ``run_for_each``, but also return the values of the calls that succeeded, in the order of ``identifiers``
+
+    :returns: tuple -- ``(values, has_exception)``
+    """
+    values = []
+    has_exception = False
+    if not parallel or parallel <= 1 or len(identifiers) <= 1:
+        for identifier in identifiers:
+            try:
+                values.append(func(identifier))
+            except Exception as e:
+                print(e, file=sys.stderr)
+                has_exception = True
+        return values, has_exception
+
+    local = threading.local()
+
+    def buffered_func(identifier):
+        local.buffer = buf = []
+        value, failed = None, False
+        try:
+            value = func(identifier)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            failed = True
+        finally:
+            local.buffer = None
+        return buf, value, failed
+
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _BufferedOutput(stdout, local), _BufferedOutput(stderr, local)
+    try:
+        for identifier, result, exception in iter_concurrently(buffered_func, identifiers, parallel):
+            buf, value, failed = result
+            for stream, data in buf:
+                stream.write(data)
+            stdout.flush()
+            stderr.flush()
+            if not failed:
+                values.append(value)
+            has_exception = has_exception or failed
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    return values, has_exception
 
 
 def get_uuids_of_trigger(trigger, identifiers):
@@ -323,13 +911,15 @@ def parse_volumes_from(volumes_from):
 
     for identifier in volumes_from:
         binding = {}
-        service = tutum.Utils.fetch_remote_service(identifier)
+        service = fetch_remote_service(identifier)
         binding["volumes_from"] = service.resource_uri
         bindings.append(binding)
     return bindings
 
 
 def load_stack_file(name, stackfile, stack=None):
+    import yaml
+
     if not stack:
         stack = tutum.Stack.create()
     else:
@@ -397,33 +987,977 @@ def inject_env_var(services):
 #         action = tutum.Utils.fetch_by_resource_uri(action_uri)
 #         action.logs(tail=None, follow=True, log_handler=action_log_handler)
 
-def sync_action(obj, sync):
-    import time
+ACTION_FINAL_STATES = ["success", "failed", "canceled"]
+SYNC_EVENT_TIMEOUT = 4
+SYNC_RECHECK_INTERVAL = 60
+SYNC_POLLING_MIN_INTERVAL = 0.5
+SYNC_POLLING_MAX_INTERVAL = 8
+SYNC_FETCH_PARALLEL = 10
 
-    action_uri = getattr(obj, "tutum_action_uri", "")
-    if sync and action_uri:
-        last_state = None
+
+def open_event_stream(timeout=None):
+    """Open a blocking websocket connection to the Tutum event stream"""
+    events = tutum.TutumEvents()
+    return websocket.create_connection(events.url, timeout=timeout, header=events.header)
+
+
+def read_event(stream):
+    """Return the next event from ``stream``, or None for control messages (e.g. the auth handshake)"""
+    try:
+        event = json.loads(stream.recv())
+    except ValueError:
+        return None
+    if event.get("type") == "error" and event.get("data", {}).get("errorMessage") == "UNAUTHORIZED":
+        raise tutum.TutumAuthError("Not authorized")
+    if event.get("type") == "auth":
+        return None
+    cache.apply_event(event)
+    return event
+
+
+class EventFilter(object):
+    """Select Tutum events by resource type, action and state, and by the resources they are about
+
+    ``resource_uris`` keeps only the events about those resources or their children (e.g. the containers of a
+    service), and ``uuids`` those whose resource, or one of its parents, has a uuid starting with one of them.
+    Criteria left to None match everything.
+    """
+
+    def __init__(self, types=None, actions=None, states=None, resource_uris=None, uuids=None):
+        self.types = set(types or [])
+        self.actions = set(action.lower() for action in actions or [])
+        self.states = set(state.lower() for state in states or [])
+        self.by_resource = resource_uris is not None or uuids is not None
+        self.resource_uris = set(resource_uris or [])
+        self.uuids = [uuid.lower() for uuid in uuids or []]
+
+    def match(self, event):
+        if self.types and event.get("type") not in self.types:
+            return False
+        if self.actions and (event.get("action") or "").lower() not in self.actions:
+            return False
+        if self.states and (event.get("state") or "").lower() not in self.states:
+            return False
+        if self.by_resource:
+            uris = [event.get("resource_uri")] + (event.get("parents") or [])
+            uris = [uri for uri in uris if uri]
+            if not any(uri in self.resource_uris for uri in uris) and \
+                    not any(uri.rstrip("/").split("/")[-1].lower().startswith(uuid)
+                            for uri in uris for uuid in self.uuids):
+                return False
+        return True
+
+
+# shorter hexadecimal identifiers (e.g. "db", "cafe" or "beef") are only taken as uuid prefixes when no name matches
+EVENT_UUID_PREFIX_MIN_LENGTH = 8
+
+
+def resolve_event_resources(identifiers, tags):
+    """Find the resources whose events ``tutum event --resource/--tag`` selects
+
+    ``identifiers`` are names of containers, services, stacks and node clusters (or ``name.stack``), matched exactly
+    first. Those that look like a uuid are kept as uuid prefixes, which also match resources created later on, when
+    they are at least ``EVENT_UUID_PREFIX_MIN_LENGTH`` characters long or match no name. ``tags`` select the services,
+    nodes and node clusters tagged with any of them when the command starts.
+
+    :returns: tuple -- ``(resource_uris, uuids)`` for ``EventFilter``
+    """
+    resource_uris = set()
+    uuids = []
+    named_models = [tutum.Container, tutum.Service, tutum.Stack, tutum.NodeCluster]
+    for identifier in identifiers:
+        if "." in identifier:
+            fetchers = [fetch_remote_container, fetch_remote_service]
+            results = iter_concurrently(lambda fetch: [fetch(identifier, raise_exceptions=False)], fetchers,
+                                        len(fetchers))
+        else:
+            results = iter_concurrently(lambda model: list(iter_list(model, fields=["name"], name=identifier)),
+                                        named_models, len(named_models))
+        found = False
+        for _, objs, exception in results:
+            for obj in objs or []:
+                if obj is not None and not isinstance(obj, Exception):
+                    resource_uris.add(obj.resource_uri)
+                    found = True
+
+        is_uuid_prefix = re.match(r"^[0-9a-fA-F-]+$", identifier) is not None and \
+            (not found or len(identifier) >= EVENT_UUID_PREFIX_MIN_LENGTH)
+        if is_uuid_prefix:
+            uuids.append(identifier)
+        elif not found:
+            raise ObjectNotFound("Identifier '%s' does not match any resource" % identifier)
+
+    for tag in tags:
+        for model in [tutum.Service, tutum.Node, tutum.NodeCluster]:
+            for obj in iter_list(model, fields=["tags"], filters=[("tags", tag)]):
+                resource_uris.add(obj.resource_uri)
+    return resource_uris, uuids
+
+
+EVENT_SOCKET_MAX_PENDING = 1000
+
+
+class EventSocketServer(object):
+    """Send lines of text to every client connected to a local Unix socket
+
+    Every client has its own queue, emptied by its own thread, so that one slow client never holds up the event
+    stream or the other clients: a client more than ``max_pending`` lines behind is disconnected.
+    """
+
+    def __init__(self, path, max_pending=EVENT_SOCKET_MAX_PENDING):
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise BadParameter("%s exists and is not a socket" % path)
+            # left over by a previous run
+            os.unlink(path)
+        self.path = path
+        self.max_pending = max_pending
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(16)
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
         while True:
             try:
-                action = tutum.Utils.fetch_by_resource_uri(action_uri)
-                if last_state != action.state:
-                    if last_state:
-                        sys.stdout.write('\n')
-                    sys.stdout.write(action.state)
-                    last_state = action.state
+                conn, _ = self.server.accept()
+            except IOError:
+                return
+            pending = Queue.Queue(self.max_pending)
+            with self.lock:
+                self.clients[conn] = pending
+            thread = threading.Thread(target=self._serve, args=(conn, pending))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, conn, pending):
+        try:
+            while True:
+                line = pending.get()
+                if line is None:
+                    break
+                conn.sendall(line)
+        except IOError:
+            pass
+        finally:
+            with self.lock:
+                self.clients.pop(conn, None)
+            conn.close()
+
+    def broadcast(self, line):
+        if isinstance(line, unicode):
+            line = line.encode("utf-8")
+        with self.lock:
+            clients = list(self.clients.items())
+        for conn, pending in clients:
+            try:
+                pending.put_nowait(line)
+            except Queue.Full:
+                cli_log.debug("Disconnecting a client of %s that is %d events behind" % (self.path, self.max_pending))
+                with self.lock:
+                    self.clients.pop(conn, None)
+                self._shutdown(conn)
+
+    @staticmethod
+    def _shutdown(conn):
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except IOError:
+            pass
+
+    def close(self):
+        with self.lock:
+            clients = list(self.clients.items())
+        for conn, pending in clients:
+            try:
+                pending.put_nowait(None)
+            except Queue.Full:
+                self._shutdown(conn)
+        # unblocks the accept() of the other thread
+        self._shutdown(self.server)
+        self.server.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+EVENT_RECONNECT_MIN_DELAY = 1
+EVENT_RECONNECT_MAX_DELAY = 60
+EVENT_RESOURCE_MODELS = collections.OrderedDict([("stack", tutum.Stack),
+                                                 ("service", tutum.Service),
+                                                 ("container", tutum.Container),
+                                                 ("node", tutum.Node),
+                                                 ("nodecluster", tutum.NodeCluster)])
+
+
+def follow_events(on_event, on_connect=None):
+    """Call ``on_event`` for every Tutum event until interrupted, reconnecting when the stream breaks
+
+    Reconnection attempts back off exponentially from ``EVENT_RECONNECT_MIN_DELAY`` to ``EVENT_RECONNECT_MAX_DELAY``
+    seconds, and the delay is reset once events flow again. ``on_connect(reconnected)`` is called every time the
+    stream is opened, before any event is read from it.
+    """
+    delay = EVENT_RECONNECT_MIN_DELAY
+    reconnected = False
+    while True:
+        try:
+            stream = open_event_stream()
+        except (websocket.WebSocketException, IOError) as e:
+            cli_log.debug("Cannot connect to the event stream, retrying in %ds: %s" % (delay, e))
+            time.sleep(delay)
+            delay = min(delay * 2, EVENT_RECONNECT_MAX_DELAY)
+            continue
+
+        try:
+            if on_connect:
+                on_connect(reconnected)
+            while True:
+                event = read_event(stream)
+                delay = EVENT_RECONNECT_MIN_DELAY
+                if event:
+                    on_event(event)
+        except (websocket.WebSocketException, IOError) as e:
+            cli_log.debug("Event stream interrupted, reconnecting in %ds: %s" % (delay, e))
+        finally:
+            stream.close()
+        reconnected = True
+        time.sleep(delay)
+        delay = min(delay * 2, EVENT_RECONNECT_MAX_DELAY)
+
+
+class EventReconciler(object):
+    """Work out the events missed while the event stream was down, by listing resources again
+
+    ``state`` maps each followed resource type to the last known state of its resources, by resource uri, and is kept
+    up to date by ``track()``. Only followed types are listed again: the ``types`` given, those of the saved ``state``
+    and those seen in events since.
+    """
+
+    def __init__(self, types=None, state=None):
+        self.types = [t for t in types or [] if t in EVENT_RESOURCE_MODELS]
+        self.state = state if state is not None else {}
+
+    def follows(self, resource_type):
+        return resource_type in self.state
+
+    def track(self, event):
+        resources = self.state.get(event.get("type"))
+        if resources is None or not event.get("resource_uri"):
+            return
+        if event.get("action") == "delete":
+            resources.pop(event.get("resource_uri"), None)
+        else:
+            resources[event.get("resource_uri")] = event.get("state")
+
+    def reconcile(self, types=None):
+        """List ``types`` (by default, every followed type) and return the events explaining what changed since
+
+        A type that was not followed yet is listed to learn the current state of its resources, with no event.
+        """
+        if types is None:
+            types = self.types + [t for t in self.state if t not in self.types]
+        events = []
+        for resource_type in types:
+            try:
+                objects = iter_list(EVENT_RESOURCE_MODELS[resource_type], fields=["resource_uri", "state"])
+                resources = dict((obj.resource_uri, getattr(obj, "state", None)) for obj in objects)
+            except Exception as e:
+                print("Cannot reconcile the %s events: %s" % (resource_type, e), file=sys.stderr)
+                continue
+
+            known = self.state.get(resource_type)
+            self.state[resource_type] = resources
+            if known is None:
+                continue
+            for resource_uri, state in resources.items():
+                if resource_uri not in known:
+                    events.append(self._event(resource_type, "create", state, resource_uri))
+                elif known[resource_uri] != state:
+                    events.append(self._event(resource_type, "update", state, resource_uri))
+            for resource_uri, state in known.items():
+                if resource_uri not in resources:
+                    events.append(self._event(resource_type, "delete", state, resource_uri))
+        return events
+
+    @staticmethod
+    def _event(resource_type, action, state, resource_uri):
+        return {"type": resource_type, "action": action, "state": state, "resource_uri": resource_uri,
+                "parents": [], "reconciled": True}
+
+
+EXEC_INPUT_FRAME_SIZE = 64 * 1024
+EXEC_INPUT_LATENCY = 0.01
+
+
+def read_input(fd, max_size=EXEC_INPUT_FRAME_SIZE, latency=EXEC_INPUT_LATENCY):
+    """Read what is available on ``fd``, an empty string meaning the end of the input
+
+    Input arriving within ``latency`` seconds is read along, up to ``max_size`` bytes, so that pasted text or a piped
+    file is sent to ``tutum exec`` in a few large frames rather than in one frame per keystroke or pipe write.
+    """
+    data = os.read(fd, max_size)
+    deadline = time.time() + latency
+    while data and len(data) < max_size:
+        timeout = deadline - time.time()
+        if timeout <= 0 or not select.select([fd], [], [], timeout)[0]:
+            break
+        more = os.read(fd, max_size - len(data))
+        if not more:
+            # the end of the input is read again by the next call
+            break
+        data += more
+    return data
+
+
+def parse_exec_frame(data):
+    """Return the stream (``stdout`` or ``stderr``) and the bytes of a frame of the ``tutum exec`` output
+
+    Frames are JSON messages, but for raw output that is passed through as is on stdout. The stream is None for
+    messages carrying no output.
+    """
+    if isinstance(data, unicode):
+        data = data.encode("utf-8")
+    message = None
+    if data.startswith("{"):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            pass
+    if not isinstance(message, dict):
+        return "stdout", data
+
+    if message.get("type") == "error":
+        if message.get("data", {}).get("errorMessage") == "UNAUTHORIZED":
+            raise tutum.TutumAuthError("Not authorized")
+        raise tutum.TutumApiError(message)
+    stream_type = message.get("streamType")
+    if stream_type not in ["stdout", "stderr"]:
+        return None, ""
+    output = message.get("output") or ""
+    if isinstance(output, unicode):
+        output = output.encode("utf-8")
+    return stream_type, output
+
+
+def write_fd(fd, data):
+    """Write all of ``data`` to the file descriptor ``fd``, bypassing the buffering of ``sys.stdout``"""
+    while data:
+        data = data[os.write(fd, data):]
+
+
+EXEC_PARALLEL = 10
+
+
+def get_exec_url(uuid, command):
+    endpoint = "container/%s/exec/?" % uuid
+    if command:
+        escaped_cmd = []
+        for c in command:
+            if r'"' in c:
+                c = c.replace(r'"', r'\"')
+            if " " in c:
+                c = '"%s"' % c
+            escaped_cmd.append(c)
+
+        escaped_cmd = " ".join(escaped_cmd)
+        cli_log.debug("escaped command: %s" % escaped_cmd)
+        endpoint = "%s&command=%s" % (endpoint, urllib.quote_plus(escaped_cmd))
+    return "/".join([tutum.stream_url.rstrip("/"), endpoint.lstrip('/')])
+
+
+def get_exec_header():
+    header = {'User-Agent': tutum.user_agent}
+    header.update(tutum.auth.get_auth_header())
+    return [": ".join([key, value]) for key, value in header.items()]
+
+
+def run_exec(container, command, output_handler, input_chunks=None):
+    """Run ``command`` in ``container`` until it exits, sending it ``input_chunks`` (if any) as its input
+
+    ``output_handler(stream, data)`` is called with the output of the command, ``stream`` being stdout or stderr. The
+    input is sent from another thread while the output is read, as the command (or the terminal echoing the input)
+    stops reading its input once its unread output fills the connection.
+    """
+    url = get_exec_url(container.uuid, command)
+    cli_log.info("websocket: %s" % url)
+    # the input and the answers to pings are sent from two threads
+    shell = websocket.create_connection(url, timeout=10, header=get_exec_header(), enable_multithread=True)
+    try:
+        # the command may run for long without any output
+        shell.settimeout(None)
+
+        def _send():
+            try:
+                for chunk in input_chunks or []:
+                    shell.send(chunk)
+                shell.send(u"\u0004")
+            except Exception:
+                # or the command would wait for the rest of its input, and the output be read forever
+                shell.abort()
+                raise
+
+        sender = _Prefetch(_send)
+        while True:
+            try:
+                data = shell.recv()
+            except websocket.WebSocketConnectionClosedException:
+                break
+            except socket.error:
+                # aborted as reading the input failed, which is raised below
+                sender.join()
+                if sender.error is None:
+                    raise
+                break
+            if data:
+                stream_type, output = parse_exec_frame(data)
+                if stream_type:
+                    output_handler(stream_type, output)
+    finally:
+        shell.close()
+    try:
+        sender.result()
+    except (socket.error, websocket.WebSocketConnectionClosedException):
+        # the command exited before reading all of its input
+        pass
+
+
+class PrefixedOutput(object):
+    """Print the output of a command run in many containers at once, a line at a time prefixed by ``name``
+
+    Partial lines are held until they are complete, and ``lock`` is shared by all the outputs printed together. The
+    output arrives as UTF-8 bytes, and is printed as unicode, once a line is complete and can no longer end in the
+    middle of a character.
+    """
+
+    def __init__(self, name, lock):
+        self.name = name if isinstance(name, unicode) else name.decode("utf-8", "replace")
+        self.lock = lock
+        self.pending = {"stdout": "", "stderr": ""}
+
+    def write(self, stream_type, data):
+        lines = (self.pending[stream_type] + data).split("\n")
+        self.pending[stream_type] = lines.pop()
+        self._print(stream_type, lines)
+
+    def close(self):
+        for stream_type, line in self.pending.items():
+            if line:
+                self._print(stream_type, [line])
+            self.pending[stream_type] = ""
+
+    def _print(self, stream_type, lines):
+        if not lines:
+            return
+        out = sys.stderr if stream_type == "stderr" else sys.stdout
+        with self.lock:
+            for line in lines:
+                line = u" | ".join([self.name, line.decode("utf-8", "replace")])
+                if out.isatty():
+                    line = AnsiColor.color_it(line, self.name)
+                out.write(line + u"\n")
+            out.flush()
+
+
+# a multiple of 57 bytes, so that every chunk is encoded in base64 on its own, in whole lines of 76 characters
+EXEC_COPY_CHUNK_SIZE = 57 * 1024
+# a line of base64 sent to the container, echoed back by its terminal
+ECHOED_BASE64_LINE = re.compile(r"^[A-Za-z0-9+/=]*\r?$")
+
+
+class Base64StreamDecoder(object):
+    """Decode base64 text that arrives in arbitrary pieces, e.g. split across ``tutum exec`` frames"""
+
+    def __init__(self):
+        self.pending = ""
+
+    def decode(self, data):
+        data = self.pending + "".join(data.split())
+        end = len(data) - len(data) % 4
+        self.pending = data[end:]
+        return base64.b64decode(data[:end])
+
+
+def parse_copy_path(arg):
+    """Split a ``tutum container cp`` argument into a container identifier (None for a local path) and a path"""
+    if arg != "-" and ":" in arg:
+        identifier, path = arg.split(":", 1)
+        if identifier and "/" not in identifier:
+            return identifier, path
+    return None, arg
+
+
+def _is_safe_member(member, destination):
+    """Return whether extracting ``member`` into ``destination`` writes inside of it, whatever links it goes through
+
+    Links extracted by earlier members, or already there, are followed, and links may only point inside too.
+    """
+    root = os.path.realpath(destination)
+
+    def _inside(path):
+        path = os.path.realpath(path)
+        return path == root or path.startswith(root + os.sep)
+
+    target = os.path.join(root, member.name)
+    if not _inside(target):
+        return False
+    if member.issym():
+        return _inside(os.path.join(os.path.dirname(target), member.linkname))
+    if member.islnk():
+        return _inside(os.path.join(root, member.linkname))
+    return True
+
+
+def copy_from_container(container, path, destination):
+    """Copy ``path`` out of ``container`` into the local ``destination`` directory, or as a tar archive to stdout
+
+    The exec stream only carries text, so the files are packed with tar and encoded in base64 in the container. They
+    are decoded and unpacked as they arrive, in constant memory whatever their size.
+    """
+    directory, name = posixpath.split(path.rstrip("/") or "/")
+    command = ["sh", "-c", "tar cf - -C %s %s | base64" % (pipes.quote(directory or "/"), pipes.quote(name or "."))]
+    reader, writer = os.pipe()
+    decoder = Base64StreamDecoder()
+
+    def _output(stream_type, data):
+        if stream_type == "stderr":
+            write_fd(sys.stderr.fileno(), data)
+        else:
+            write_fd(writer, decoder.decode(data))
+
+    def _exec():
+        try:
+            run_exec(container, command, _output)
+        finally:
+            os.close(writer)
+
+    session = _Prefetch(_exec)
+    try:
+        with os.fdopen(reader, "rb") as archive:
+            if destination == "-":
+                while True:
+                    chunk = archive.read(EXEC_COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    write_fd(sys.stdout.fileno(), chunk)
+            else:
+                tar = tarfile.open(fileobj=archive, mode="r|")
+                for member in tar:
+                    if not (member.isfile() or member.isdir() or member.issym() or member.islnk()):
+                        print("Skipping %s, which is not a file, a directory or a link" % member.name,
+                              file=sys.stderr)
+                    elif not _is_safe_member(member, destination):
+                        print("Skipping %s, which is outside of %s" % (member.name, destination), file=sys.stderr)
+                    else:
+                        tar.extract(member, destination)
+                tar.close()
+    except Exception:
+        # a broken archive is better explained by a failed exec session, unless that was only the pipe being closed
+        session.join()
+        if session.error is not None and not isinstance(session.error, (IOError, OSError)):
+            raise session.error
+        raise
+    session.result()
+
+
+def copy_to_container(container, source, path):
+    """Copy the local file or directory ``source``, or a tar archive read from stdin, into ``path`` in ``container``
+
+    The files are packed with tar and sent in base64 chunks of ``EXEC_COPY_CHUNK_SIZE`` bytes while they are read, in
+    constant memory whatever their size, and unpacked in the container.
+
+    The input of exec sessions goes through a terminal in canonical mode: it is read a line at a time, lines longer
+    than 4095 bytes are cut, the input is echoed back, and ^D at the start of a line is the end of the input. So the
+    base64 is wrapped at 76 characters, and the echoed lines are dropped from the output.
+    """
+    path = pipes.quote(path or "/")
+    command = ["sh", "-c", "mkdir -p %s && base64 -d | tar xf - -C %s" % (path, path)]
+    packer = None
+    if source == "-":
+        archive = sys.stdin
+    else:
+        if not os.path.exists(source):
+            raise BadParameter("%s does not exist" % source)
+        reader, writer = os.pipe()
+
+        def _pack():
+            with os.fdopen(writer, "wb") as f:
+                tar = tarfile.open(fileobj=f, mode="w|")
+                tar.add(source, arcname=os.path.basename(os.path.normpath(os.path.abspath(source))))
+                tar.close()
+
+        packer = _Prefetch(_pack)
+        archive = os.fdopen(reader, "rb")
+
+    def _chunks():
+        while True:
+            chunk = archive.read(EXEC_COPY_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield base64.encodestring(chunk)
+
+    pending = {"stdout": "", "stderr": ""}
+
+    def _print(stream_type, lines):
+        if stream_type == "stderr":
+            write_fd(sys.stderr.fileno(), "".join("%s\n" % line for line in lines))
+        else:
+            write_fd(sys.stdout.fileno(),
+                     "".join("%s\n" % line for line in lines if not ECHOED_BASE64_LINE.match(line)))
+
+    def _output(stream_type, data):
+        lines = (pending[stream_type] + data).split("\n")
+        pending[stream_type] = lines.pop()
+        _print(stream_type, lines)
+
+    try:
+        run_exec(container, command, _output, _chunks())
+    finally:
+        if packer:
+            archive.close()
+        for stream_type, line in pending.items():
+            if line:
+                _print(stream_type, [line])
+    if packer:
+        packer.result()
+
+
+def is_final_action_state(state):
+    return (state or "").lower() in ACTION_FINAL_STATES
+
+
+def _print_action_state(state, last_state):
+    if last_state != state:
+        if last_state:
+            sys.stdout.write('\n')
+        sys.stdout.write(state)
+    else:
+        sys.stdout.write('.')
+    if is_final_action_state(state):
+        sys.stdout.write('\n')
+    sys.stdout.flush()
+    return state
+
+
+def _wait_action_with_events(action_uri, stream, progress):
+    # The action is fetched once after subscribing, so a transition that happened before the stream was
+    # open is not missed. From then on the state is only fetched again if the stream stays quiet for long.
+    state = tutum.Utils.fetch_by_resource_uri(action_uri).state
+    last_check = time.time()
+    while True:
+        progress["state"] = _print_action_state(state, progress["state"])
+        if is_final_action_state(state):
+            return
+        state = None
+        while state is None:
+            try:
+                event = read_event(stream)
+            except websocket.WebSocketTimeoutException:
+                if time.time() - last_check >= SYNC_RECHECK_INTERVAL:
+                    state = tutum.Utils.fetch_by_resource_uri(action_uri).state
+                    last_check = time.time()
                 else:
                     sys.stdout.write('.')
-                if action.state.lower() == "success" or action.state.lower() == "failed":
-                    sys.stdout.write('\n')
-                    break
-                sys.stdout.flush()
-                time.sleep(4)
-            except tutum.TutumApiError as e:
-                print(e, file=sys.stderr)
+                    sys.stdout.flush()
                 continue
+            if event and event.get("resource_uri") == action_uri and event.get("state"):
+                state = event.get("state")
+
+
+def _wait_action_with_polling(action_uri, last_state):
+    interval = SYNC_POLLING_MIN_INTERVAL
+    while True:
+        try:
+            action = tutum.Utils.fetch_by_resource_uri(action_uri)
+            last_state = _print_action_state(action.state, last_state)
+            if is_final_action_state(action.state):
+                break
+        except tutum.TutumApiError as e:
+            print(e, file=sys.stderr)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            break
+        time.sleep(interval)
+        interval = min(interval * 2, SYNC_POLLING_MAX_INTERVAL)
+
+
+def sync_action(obj, sync):
+    action_uri = getattr(obj, "tutum_action_uri", "")
+    if sync and action_uri:
+        progress = {"state": None}
+        try:
+            stream = open_event_stream(timeout=SYNC_EVENT_TIMEOUT)
+        except Exception as e:
+            cli_log.debug("Cannot open the event stream, polling the action instead: %s" % e)
+        else:
+            try:
+                _wait_action_with_events(action_uri, stream, progress)
+                return
+            except tutum.TutumAuthError as e:
+                print(e, file=sys.stderr)
+                return
+            except websocket.WebSocketException as e:
+                cli_log.debug("Event stream interrupted, polling the action instead: %s" % e)
             except Exception as e:
+                # e.g. a temporary API error, which polling retries
                 print(e, file=sys.stderr)
-                break
+            finally:
+                stream.close()
+        _wait_action_with_polling(action_uri, progress["state"])
+
+
+class _ActionsProgress(object):
+    """Track the state of several actions and render them as a single progress line"""
+
+    def __init__(self, actions):
+        self.actions = actions
+        self.states = dict((action_uri, None) for _, action_uri in actions)
+        self.errors = {}
+        self.last_line = None
+
+    def update(self, action_uri, state):
+        if action_uri in self.states and state:
+            self.states[action_uri] = state
+
+    def fail(self, action_uri, error):
+        self.errors[action_uri] = error
+
+    def pending(self):
+        return [action_uri for _, action_uri in self.actions
+                if action_uri not in self.errors and not is_final_action_state(self.states[action_uri])]
+
+    def render(self):
+        counts = collections.Counter("Error" if action_uri in self.errors else state or "Pending"
+                                     for action_uri, state in self.states.items())
+        line = "Waiting for %d actions: %s" % (len(self.actions),
+                                               ", ".join("%d %s" % (counts[state], state) for state in sorted(counts)))
+        if line != self.last_line:
+            if sys.stdout.isatty():
+                sys.stdout.write("\r\033[K%s" % line)
+            else:
+                sys.stdout.write("%s\n" % line)
+            sys.stdout.flush()
+            self.last_line = line
+
+    def finish(self):
+        if sys.stdout.isatty():
+            sys.stdout.write('\n')
+        data_list = []
+        for resource, action_uri in self.actions:
+            state = "Error" if action_uri in self.errors else self.states[action_uri]
+            data_list.append([action_uri.rstrip("/").split("/")[-1], resource, add_unicode_symbol_to_state(state)])
+        tabulate_result(data_list, ["ACTION", "RESOURCE", "STATE"])
+
+
+def _refresh_actions(progress, action_uris):
+    for action_uri, action, e in iter_concurrently(tutum.Utils.fetch_by_resource_uri, action_uris,
+                                                   SYNC_FETCH_PARALLEL):
+        if e is None:
+            progress.update(action_uri, action.state)
+        elif not isinstance(e, tutum.TutumApiError):
+            print(e, file=sys.stderr)
+            progress.fail(action_uri, e)
+
+
+def _wait_actions_with_events(progress, stream):
+    _refresh_actions(progress, progress.pending())
+    last_check = time.time()
+    while progress.pending():
+        progress.render()
+        try:
+            event = read_event(stream)
+        except websocket.WebSocketTimeoutException:
+            if time.time() - last_check >= SYNC_RECHECK_INTERVAL:
+                _refresh_actions(progress, progress.pending())
+                last_check = time.time()
+            continue
+        if event and event.get("type") == "action":
+            progress.update(event.get("resource_uri"), event.get("state"))
+
+
+def _wait_actions_with_polling(progress):
+    interval = SYNC_POLLING_MIN_INTERVAL
+    while True:
+        _refresh_actions(progress, progress.pending())
+        if not progress.pending():
+            break
+        progress.render()
+        time.sleep(interval)
+        interval = min(interval * 2, SYNC_POLLING_MAX_INTERVAL)
+
+
+def sync_actions(objs, sync):
+    """Wait until the actions triggered on all of ``objs`` are finished, and print a summary of their states
+
+    A single action is reported exactly like ``sync_action`` does.
+    """
+    objs = [obj for obj in objs if getattr(obj, "tutum_action_uri", "")]
+    if not sync or not objs:
+        return
+    if len(objs) == 1:
+        sync_action(objs[0], sync)
+        return
+
+    actions = [(getattr(obj, "uuid", None) or getattr(obj, "name", ""), obj.tutum_action_uri) for obj in objs]
+    progress = _ActionsProgress(actions)
+    try:
+        try:
+            stream = open_event_stream(timeout=SYNC_EVENT_TIMEOUT)
+        except Exception as e:
+            cli_log.debug("Cannot open the event stream, polling the actions instead: %s" % e)
+        else:
+            try:
+                _wait_actions_with_events(progress, stream)
+            except tutum.TutumAuthError as e:
+                print(e, file=sys.stderr)
+                return
+            except websocket.WebSocketException as e:
+                cli_log.debug("Event stream interrupted, polling the actions instead: %s" % e)
+            except Exception as e:
+                # e.g. a temporary API error, which polling retries
+                print(e, file=sys.stderr)
+            finally:
+                stream.close()
+        if progress.pending():
+            _wait_actions_with_polling(progress)
+        progress.render()
+    finally:
+        progress.finish()
+
+
+WATCH_EVENT_TIMEOUT = 1
+WATCH_RECONCILE_INTERVAL = 60
+
+
+class _TableScreen(object):
+    """Draw a table, and redraw it on a terminal by rewriting only the lines that changed since the previous draw
+
+    Elsewhere (e.g. when piped to a file) the whole table is printed again after a blank line.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.is_terminal = hasattr(stream, "isatty") and stream.isatty()
+        self.lines = None
+
+    def draw(self, lines):
+        if lines == self.lines:
+            return
+        if not self.is_terminal or self.lines is None:
+            if self.lines is not None:
+                self.stream.write(u"\n")
+            self.stream.write(u"".join(u"%s\n" % line for line in lines))
+        else:
+            self.stream.write(u"\x1b[%dA" % len(self.lines))
+            for index, line in enumerate(lines):
+                if index < len(self.lines) and self.lines[index] == line:
+                    self.stream.write(u"\x1b[1B")
+                else:
+                    self.stream.write(u"\r\x1b[K%s\n" % line)
+            if len(lines) < len(self.lines):
+                self.stream.write(u"\x1b[J")
+        self.stream.flush()
+        self.lines = lines
+
+
+def _render_table(rows, headers):
+    data_list = list(rows.values()) or [[""] * (len(headers) - 1)]
+    return tabulate(data_list, headers, stralign="left", tablefmt="plain").splitlines()
+
+
+def watch_table(headers, resource_type, list_rows, fetch_row, may_match=None,
+                reconcile_interval=WATCH_RECONCILE_INTERVAL):
+    """Keep a table of ``resource_type`` objects up to date on screen, until interrupted
+
+    ``list_rows()`` returns the ``(resource_uri, row)`` pairs of the whole table. It is called once to draw it, and
+    then every ``reconcile_interval`` seconds or after the event stream was interrupted, to catch up with changes
+    events may have missed. In between, ``fetch_row(resource_uri)`` is called for the events about the objects of
+    the table, and for those about other ``resource_type`` objects that ``may_match(event)`` (by default, when
+    they are created). It returns the current row of the object, or None if it does not belong in the table.
+    """
+    if may_match is None:
+        may_match = lambda event: event.get("action") == "create"
+    screen = _TableScreen(sys.stdout)
+    rows = collections.OrderedDict(list_rows())
+    last_reconcile = time.time()
+    screen.draw(_render_table(rows, headers))
+    stream = None
+    try:
+        while True:
+            if stream is None:
+                try:
+                    stream = open_event_stream(WATCH_EVENT_TIMEOUT)
+                except (websocket.WebSocketException, IOError) as e:
+                    cli_log.debug("Cannot connect to the event stream: %s" % e)
+                    time.sleep(WATCH_EVENT_TIMEOUT)
+
+            event = None
+            if stream is not None:
+                try:
+                    event = read_event(stream)
+                except websocket.WebSocketTimeoutException:
+                    pass
+                except (websocket.WebSocketException, IOError) as e:
+                    cli_log.debug("Event stream interrupted: %s" % e)
+                    stream.close()
+                    stream = None
+                    last_reconcile = 0
+
+            if event and event.get("type") == resource_type and event.get("resource_uri") and \
+                    (event.get("resource_uri") in rows or may_match(event)):
+                resource_uri = event.get("resource_uri")
+                try:
+                    row = fetch_row(resource_uri)
+                except Exception as e:
+                    cli_log.debug("Cannot refresh %s: %s" % (resource_uri, e))
+                else:
+                    if row is None:
+                        rows.pop(resource_uri, None)
+                    else:
+                        rows[resource_uri] = row
+
+            if time.time() - last_reconcile >= reconcile_interval:
+                rows = collections.OrderedDict(list_rows())
+                last_reconcile = time.time()
+            screen.draw(_render_table(rows, headers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def stream_logs(objs, tail, follow, log_handler):
+    """Stream the logs of all ``objs`` (services or containers) to ``log_handler``, returning whether any failed
+
+    When following, the streams are all open at the same time and their lines are merged as they arrive, and the
+    failure of any stream is reported as soon as it happens. Otherwise the logs are printed one object after the other.
+    """
+    lock = threading.Lock()
+
+    def _log_handler(message):
+        # one line at a time, and AnsiColor is not thread safe
+        with lock:
+            log_handler(message)
+
+    def _logs(obj):
+        # reported from the stream's own thread, rather than once the streams before it have ended
+        try:
+            obj.logs(tail, follow, _log_handler)
+        except Exception as e:
+            with lock:
+                print(e, file=sys.stderr)
+            return True
+        return False
+
+    has_exception = False
+    for obj, failed, _ in iter_concurrently(_logs, objs, len(objs) if follow else 1):
+        has_exception = has_exception or failed
+    return has_exception
 
 
 def container_service_log_handler(message):